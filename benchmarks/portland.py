@@ -0,0 +1,292 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""Time each stage of converting synthetic Portland crime data.
+
+    python -m benchmarks.portland --rows 10000 --rows 100000 --bad-rate 0.01 -o results.json
+    python -m benchmarks.portland --rows 100000 --baseline results.json
+
+Each stage is timed separately over the same rows and reported in rows per second, with the peak
+memory Python allocated during the stage (measured in a second, traced run). With ``--baseline``,
+the results are compared to an earlier run and the command exits with an error if any stage got
+slower by more than ``--tolerance``.
+"""
+import argparse
+import csv
+import json
+import logging
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import geojson
+
+from crimetools.converters.features import FeatureSerializer
+from crimetools.converters.portland import ConversionError, Portland
+
+from benchmarks.synthetic import SyntheticCrimes
+
+
+# Rows are read from the generated file and fed to each stage this many at a time, so only one
+# chunk of the synthetic data is held in memory at once.
+CHUNK_SIZE = 1000
+
+
+def read_chunks(filename):
+    """Return a converter for the CSV file ``filename`` and a generator of its rows in lists of up
+    to `CHUNK_SIZE`."""
+    f = open(filename, 'r', newline='')
+    rows = csv.reader(f)
+    converter = Portland([], column_labels=next(rows))
+
+    def chunks():
+        with f:
+            chunk = []
+            for row in rows:
+                chunk.append(row)
+                if len(chunk) >= CHUNK_SIZE:
+                    yield chunk
+                    chunk = []
+            if chunk:
+                yield chunk
+
+    return converter, chunks()
+
+
+def converted_chunks(filename):
+    """Yield the (row, point) tuples, GeoJSON Features and `Crime` records converted from each
+    chunk of rows in ``filename``."""
+    converter, chunks = read_chunks(filename)
+    for chunk in chunks:
+        points = list(converter.wgs84_points(chunk))
+        features = []
+        crimes = []
+        for row, point in points:
+            try:
+                features.append(converter.to_geojson_feature(row, point))
+                crimes.append(converter.to_crime(row, point))
+            except ConversionError:
+                pass
+        yield converter, points, features, crimes
+
+
+# Each stage takes the name of the generated file and returns the number of rows it processed and
+# the seconds it spent on them, not counting the time spent preparing its input.
+
+def stage_read(filename):
+    """Read rows from the CSV file the way `Command` does."""
+    count = 0
+    start = time.perf_counter()
+    with open(filename, 'r') as f:
+        for _ in csv.reader(f):
+            count += 1
+    return count, time.perf_counter() - start
+
+
+def stage_get_wgs84_point(filename):
+    converter, chunks = read_chunks(filename)
+    count = 0
+    seconds = 0.0
+    for chunk in chunks:
+        start = time.perf_counter()
+        for row in chunk:
+            try:
+                converter.get_wgs84_point(row)
+            except ConversionError:
+                pass
+        seconds += time.perf_counter() - start
+        count += len(chunk)
+    return count, seconds
+
+
+def stage_wgs84_points(filename):
+    converter, chunks = read_chunks(filename)
+    count = 0
+    seconds = 0.0
+    for chunk in chunks:
+        start = time.perf_counter()
+        for _ in converter.wgs84_points(chunk):
+            pass
+        seconds += time.perf_counter() - start
+        count += len(chunk)
+    return count, seconds
+
+
+def stage_parse_date(filename):
+    converter, chunks = read_chunks(filename)
+    count = 0
+    seconds = 0.0
+    for chunk in chunks:
+        start = time.perf_counter()
+        for row in chunk:
+            try:
+                converter.parse_date(row)
+            except ConversionError:
+                pass
+        seconds += time.perf_counter() - start
+        count += len(chunk)
+    return count, seconds
+
+
+def stage_to_geojson_feature(filename):
+    count = 0
+    seconds = 0.0
+    for converter, points, _, _ in converted_chunks(filename):
+        start = time.perf_counter()
+        for row, point in points:
+            try:
+                converter.to_geojson_feature(row, point)
+            except ConversionError:
+                pass
+        seconds += time.perf_counter() - start
+        count += len(points)
+    return count, seconds
+
+
+def stage_geojson_dumps(filename):
+    count = 0
+    seconds = 0.0
+    for _, _, features, _ in converted_chunks(filename):
+        start = time.perf_counter()
+        for feature in features:
+            geojson.dumps(feature, sort_keys=True)
+        seconds += time.perf_counter() - start
+        count += len(features)
+    return count, seconds
+
+
+def stage_serialize(filename):
+    serialize = FeatureSerializer().serialize
+    count = 0
+    seconds = 0.0
+    for _, _, _, crimes in converted_chunks(filename):
+        start = time.perf_counter()
+        for crime in crimes:
+            serialize(crime)
+        seconds += time.perf_counter() - start
+        count += len(crimes)
+    return count, seconds
+
+
+def stage_to_csv(filename):
+    """Convert the whole file to CSV with WGS84 coordinates, streaming it as `Command` does."""
+    start = time.perf_counter()
+    with open(filename, 'r', newline='') as in_file, open(os.devnull, 'w', newline='') as out_file:
+        converter = Portland(csv.reader(in_file), normalize_to_wgs84=True)
+        _, total, skipped = converter.to_csv(out_file)
+    return total + skipped, time.perf_counter() - start
+
+
+def measure(stage, filename):
+    """Return the seconds ``stage`` takes, the number of rows it processed and its peak memory."""
+    count, seconds = stage(filename)
+
+    tracemalloc.start()
+    stage(filename)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'rows': count,
+        'seconds': seconds,
+        'rows_per_second': count / seconds if seconds else None,
+        'peak_memory_bytes': peak
+    }
+
+
+STAGES = [
+    ('read', stage_read),
+    ('get_wgs84_point', stage_get_wgs84_point),
+    ('wgs84_points', stage_wgs84_points),
+    ('parse_date', stage_parse_date),
+    ('to_geojson_feature', stage_to_geojson_feature),
+    ('geojson.dumps', stage_geojson_dumps),
+    ('serialize', stage_serialize),
+    ('to_csv', stage_to_csv),
+]
+
+
+def run(size, bad_rate, seed):
+    """Generate ``size`` rows of synthetic data and time each stage over them.
+
+    The rows are written to a temporary file and every stage streams them from it, so memory use
+    doesn't grow with ``size``.
+    """
+    fd, filename = tempfile.mkstemp(suffix='.csv')
+    try:
+        with open(fd, 'w', newline='') as f:
+            SyntheticCrimes(seed=seed, bad_rate=bad_rate).write(f, size)
+
+        return {
+            'rows': size,
+            'bad_rate': bad_rate,
+            'stages': dict((name, measure(stage, filename)) for name, stage in STAGES)
+        }
+    finally:
+        os.unlink(filename)
+
+
+def compare(results, baseline, tolerance):
+    """Return a list of descriptions of stages that are slower than in ``baseline``."""
+    regressions = []
+    previous = dict((result['rows'], result) for result in baseline['results'])
+    for result in results['results']:
+        if result['rows'] not in previous:
+            continue
+        for name, stage in result['stages'].items():
+            before = previous[result['rows']]['stages'].get(name, {}).get('rows_per_second')
+            after = stage['rows_per_second']
+            if before and after and after < before * (1 - tolerance):
+                regressions.append('{} ({} rows): {:.0f} rows/sec, was {:.0f}'.format(
+                    name, result['rows'], after, before))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark converting Portland crime data')
+    parser.add_argument('--rows', action='append', type=int, dest='sizes',
+                        help='The number of rows to benchmark with; may be given more than once (default: 10000)')
+    parser.add_argument('--bad-rate', action='store', type=float, dest='bad_rate', default=0.01,
+                        help='The fraction of rows with bad data')
+    parser.add_argument('--seed', action='store', type=int, dest='seed', default=0, help='The random seed')
+    parser.add_argument('-o', action='store', dest='out_filename', help='The path to write JSON results to')
+    parser.add_argument('--baseline', action='store', dest='baseline_filename',
+                        help='The path to JSON results of an earlier run to compare with')
+    parser.add_argument('--tolerance', action='store', type=float, dest='tolerance', default=0.1,
+                        help='The fraction a stage may slow down by before it is reported as a regression')
+
+    options = parser.parse_args()
+
+    # Bad rows are expected; don't time logging them.
+    logging.getLogger('crimetools').setLevel(logging.CRITICAL)
+
+    results = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': [run(size, options.bad_rate, options.seed) for size in options.sizes or [10000]]
+    }
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS.
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    results['max_rss_bytes'] = max_rss if sys.platform == 'darwin' else max_rss * 1024
+
+    output = json.dumps(results, indent=2, sort_keys=True)
+    if options.out_filename:
+        with open(options.out_filename, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+    if options.baseline_filename:
+        with open(options.baseline_filename) as f:
+            regressions = compare(results, json.load(f), options.tolerance)
+        for regression in regressions:
+            print('Regression: {}'.format(regression), file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
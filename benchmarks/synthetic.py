@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""Generate synthetic City of Portland crime data for benchmarks.
+
+    python -m benchmarks.synthetic -n 100000 --bad-rate 0.01 -o crimes.csv
+"""
+import argparse
+import csv
+import datetime
+import random
+
+
+COLUMN_LABELS = [
+    "Record ID", "Report Date", "Report Time", "Major Offense Type", "Address",
+    "Neighborhood", "Police Precinct", "Police District", "X Coordinate",
+    "Y Coordinate"
+]
+
+# Offense types with rough relative frequencies.
+OFFENSES = [
+    ("Larceny", 30), ("Vandalism", 10), ("Motor Vehicle Theft", 8), ("Burglary", 8),
+    ("Liquor Laws", 6), ("Assault, Simple", 6), ("Drugs", 5), ("Disorderly Conduct", 5),
+    ("Fraud", 4), ("Trespass", 4), ("Aggravated Assault", 3), ("Robbery", 2), ("Prostitution", 1),
+    ("Stolen Property", 1), ("Weapons", 1), ("Runaway", 1), ("Kidnap", 1), ("Homicide", 1),
+]
+
+NEIGHBORHOODS = [
+    "LLOYD", "ELIOT", "PEARL", "DOWNTOWN", "OLD TOWN/CHINATOWN", "BUCKMAN", "HOSFORD-ABERNETHY",
+    "KERNS", "RICHMOND", "MONTAVILLA", "HAZELWOOD", "LENTS", "ST. JOHNS", "PIEDMONT", "KENTON",
+    "CULLY", "SELLWOOD-MORELAND", "BROOKLYN", "GOOSE HOLLOW", "NORTHWEST",
+]
+
+PRECINCTS = ["PORTLAND PREC NO", "PORTLAND PREC EA", "PORTLAND PREC CE"]
+
+STREETS = ["NE WEIDLER ST", "NE BROADWAY", "SE HAWTHORNE BLVD", "SE DIVISION ST", "N LOMBARD ST",
+           "NE SANDY BLVD", "SW 5TH AVE", "NW 23RD AVE", "SE 82ND AVE", "NE MLK JR BLVD"]
+
+# The rough extent of Portland in State Plane (Oregon North) feet.
+X_RANGE = (7610000.0, 7720000.0)
+Y_RANGE = (650000.0, 730000.0)
+
+# The ways a row can be bad.
+CORRUPTIONS = ('coordinates', 'date', 'time')
+
+
+class SyntheticCrimes(object):
+    """Generate rows of crime data with the Portland column labels.
+
+    Crimes cluster on a fixed set of ``locations`` (block addresses and intersections), as they
+    do in the real data, so the same coordinates and addresses repeat. A fraction ``bad_rate`` of
+    rows have unparseable coordinates, dates or times.
+    """
+    def __init__(self, seed=0, bad_rate=0.0, locations=5000, year=2011):
+        self.random = random.Random(seed)
+        self.bad_rate = bad_rate
+        self.start = datetime.date(year, 1, 1)
+        self.offenses = [offense for offense, _ in OFFENSES]
+        self.offense_weights = [weight for _, weight in OFFENSES]
+        self.locations = [self.location(i) for i in range(locations)]
+
+    def location(self, i):
+        rand = self.random
+        number = rand.randint(1, 99) * 100
+        street = rand.choice(STREETS)
+        if rand.random() < 0.5:
+            address = "{} block of {}, PORTLAND, OR 972{:02d}".format(number, street, rand.randint(1, 99))
+        else:
+            address = "{} and {}, PORTLAND, OR 972{:02d}".format(street, rand.choice(STREETS), rand.randint(1, 99))
+        neighborhood = NEIGHBORHOODS[i % len(NEIGHBORHOODS)]
+        precinct = PRECINCTS[i % len(PRECINCTS)]
+        district = str(rand.randint(1, 99) * 10)
+        x = repr(round(rand.uniform(*X_RANGE), 5))
+        y = repr(round(rand.uniform(*Y_RANGE), 5))
+        return address, neighborhood, precinct, district, x, y
+
+    def rows(self, count):
+        """Yield ``count`` rows, without column labels."""
+        rand = self.random
+        record_id = 13000000
+        for _ in range(count):
+            record_id += rand.randint(1, 5)
+            address, neighborhood, precinct, district, x, y = rand.choice(self.locations)
+            date = self.start + datetime.timedelta(days=rand.randint(0, 364))
+            row = [
+                str(record_id),
+                date.strftime('%m/%d/%Y'),
+                '{:02d}:{:02d}:00'.format(rand.randint(0, 23), rand.randint(0, 59)),
+                rand.choices(self.offenses, self.offense_weights)[0],
+                address, neighborhood, precinct, district, x, y
+            ]
+            if self.bad_rate and rand.random() < self.bad_rate:
+                self.corrupt(row)
+            yield row
+
+    def corrupt(self, row):
+        corruption = self.random.choice(CORRUPTIONS)
+        if corruption == 'coordinates':
+            row[8] = row[9] = ''
+        elif corruption == 'date':
+            row[1] = 'Bad Date'
+        else:
+            row[2] = 'Bad Time'
+
+    def write(self, file, count):
+        """Write column labels and ``count`` rows to ``file`` as CSV."""
+        writer = csv.writer(file)
+        writer.writerow(COLUMN_LABELS)
+        writer.writerows(self.rows(count))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate synthetic Portland crime data')
+    parser.add_argument('-n', action='store', type=int, dest='rows', required=True, help='The number of rows')
+    parser.add_argument('-o', action='store', dest='out_filename', required=True, help='The path to write to')
+    parser.add_argument('--bad-rate', action='store', type=float, dest='bad_rate', default=0.0,
+                        help='The fraction of rows with bad data')
+    parser.add_argument('--seed', action='store', type=int, dest='seed', default=0, help='The random seed')
+
+    options = parser.parse_args()
+
+    with open(options.out_filename, 'w', newline='') as f:
+        SyntheticCrimes(seed=options.seed, bad_rate=options.bad_rate).write(f, options.rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,163 @@
+#!/usr/bin/env python
+# encoding: utf-8
+import argparse
+import contextlib
+import glob
+import io
+import multiprocessing
+import os
+import time
+
+from crimetools import compression
+from crimetools.converters import cache
+from crimetools.converters.portland import NAD83_EPSG, WGS84_EPSG
+
+
+# The file extension of each output format, for output file name templates.
+EXTENSIONS = {
+    'csv': 'csv',
+    'geojson': 'json',
+    'geojsonl': 'jsonl',
+    'binary': 'bin',
+    'tiles': 'tiles'
+}
+
+# Output files are named so they can't be mistaken for their input files, e.g. with -f csv.
+DEFAULT_TEMPLATE = '{dir}/{name}.converted.{ext}'
+
+# The transform cache shared by every file a worker process converts.
+_transform_cache = None
+
+
+def find_inputs(paths):
+    """Return the input files named by ``paths``, each a file, a glob pattern or a directory,
+    in which case every CSV file in the directory is included, compressed or not."""
+    inputs = []
+    for path in paths:
+        if os.path.isdir(path):
+            matches = glob.glob(os.path.join(path, '*.csv'))
+            for extension in compression.EXTENSIONS:
+                matches.extend(glob.glob(os.path.join(path, '*.csv' + extension)))
+        else:
+            matches = glob.glob(path)
+        for match in sorted(matches):
+            if os.path.isfile(match) and match not in inputs:
+                inputs.append(match)
+    return inputs
+
+
+def output_filename(template, in_filename, out_format, output_compression=None):
+    """Return the output file name for ``in_filename`` from ``template``.
+
+    The template may use ``{dir}``, the input file's directory, ``{name}``, its name without
+    its extension or compression extension, and ``{ext}``, the usual extension of ``out_format``
+    followed by the extension of ``output_compression``, if any.
+    """
+    directory, filename = os.path.split(in_filename)
+    extension = EXTENSIONS[out_format]
+    if output_compression:
+        extension += compression.OUTPUT_COMPRESSIONS[output_compression]
+    return template.format(dir=directory or '.',
+                           name=os.path.splitext(compression.strip_extension(filename))[0],
+                           ext=extension)
+
+
+def is_same_file(in_filename, out_filename):
+    """Return True if ``out_filename`` names the file ``in_filename``."""
+    if os.path.exists(out_filename):
+        return os.path.samefile(in_filename, out_filename)
+    return os.path.abspath(in_filename) == os.path.abspath(out_filename)
+
+
+def init_worker(cache_size, cache_filename):
+    """Set up the state shared by every file converted in this worker process."""
+    global _transform_cache
+    from crimetools import serve
+
+    serve.warm()
+    _transform_cache = cache.TransformCache(NAD83_EPSG, WGS84_EPSG, size=cache_size,
+                                            filename=cache_filename, read_only=True)
+
+
+def convert_file(options):
+    """Convert one file with the `Command` options ``options``.
+
+    Runs in a worker process. Anything the conversion prints is discarded, and errors are
+    reported in the result rather than raised, so one bad file can't stop the others. A file whose
+    output file name is its own name fails without being touched.
+
+    Returns a dictionary of the input and output file names, the number of rows converted and
+    skipped, the number skipped for each reason, the number of duplicates dropped and rows
+    filtered out, the time taken, the error if the conversion failed, and the points newly
+    transformed for the persistent transform cache.
+    """
+    from crimetools.command import Command
+
+    result = {
+        'input': options.in_filename,
+        'output': options.out_filename,
+        'total': 0,
+        'skipped': 0,
+        'skips': {},
+        'duplicates': 0,
+        'filtered': 0,
+        'error': None
+    }
+    start = time.perf_counter()
+    try:
+        if is_same_file(options.in_filename, options.out_filename):
+            raise ValueError('The output file is the input file: {}'.format(options.out_filename))
+        with contextlib.redirect_stdout(io.StringIO()):
+            command = Command(options, transform_cache=_transform_cache)
+            converted = command.run()
+        if converted is None:
+            result['error'] = 'Format not supported: {}'.format(options.format)
+        else:
+            result['total'], result['skipped'] = converted
+        result['skips'] = dict(command.metrics.skips)
+        result['duplicates'] = command.metrics.counters['duplicates']
+        result['filtered'] = command.metrics.counters['filtered']
+    except Exception as e:
+        result['error'] = '{}: {}'.format(type(e).__name__, e)
+    result['seconds'] = time.perf_counter() - start
+
+    result['pending'] = _transform_cache.pending
+    _transform_cache.pending = []
+    return result
+
+
+def convert(inputs, template, options, workers):
+    """Convert each file in ``inputs`` on a pool of ``workers`` processes.
+
+    Every file is converted with the `Command` options ``options`` and written to a file named by
+    ``template``. Each worker process keeps one transform cache for all the files it converts.
+    Points newly transformed by the workers are saved to the persistent transform cache, if any,
+    once they are done.
+
+    Yields the result of each file, as returned by `convert_file`, as soon as it is done.
+    """
+    jobs = []
+    for in_filename in inputs:
+        job = argparse.Namespace(**vars(options))
+        job.in_filename = in_filename
+        job.out_filename = output_filename(template, in_filename, options.format,
+                                           options.compression)
+        jobs.append(job)
+
+    pending = []
+    pool = multiprocessing.Pool(max(1, min(workers, len(jobs))), initializer=init_worker,
+                                initargs=(options.transform_cache_size,
+                                          options.transform_cache_filename))
+    try:
+        for result in pool.imap_unordered(convert_file, jobs):
+            pending.extend(result.pop('pending'))
+            yield result
+    finally:
+        pool.terminate()
+        pool.join()
+
+    if options.transform_cache_filename and pending:
+        transform_cache = cache.TransformCache(NAD83_EPSG, WGS84_EPSG, size=0,
+                                               filename=options.transform_cache_filename)
+        transform_cache.update(pending)
+        transform_cache.close()
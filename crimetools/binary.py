@@ -0,0 +1,277 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""A fixed-layout binary format for converted crime data that can be memory-mapped.
+
+A file starts with a header:
+
+    magic           8 bytes, b'CRIMEBN1'
+    count           uint64, the number of records
+    sections        for each of `SECTIONS`, a uint64 offset and uint64 length in bytes
+
+followed by the sections, each starting on an 8 byte boundary. All values are little-endian.
+
+    lng, lat            float64 per record, WGS84 coordinates
+    record_id           int64 per record
+    timestamp           int64 per record, the report time in seconds since the epoch, with the
+                        (local) report time treated as if it were UTC
+    district            int32 per record
+    offense,            uint32 per record, a code into the matching string table
+    neighborhood,
+    precinct
+    address_offsets     uint64 per record plus one, the offsets of each address in address_data
+    address_data        UTF-8 encoded addresses
+    offense_table,      a string table: a uint64 count of strings, uint64 offsets of each
+    neighborhood_table, string plus one, then the UTF-8 encoded strings
+    precinct_table
+"""
+import array
+import calendar
+import datetime
+import mmap
+import shutil
+import struct
+import sys
+import tempfile
+
+
+MAGIC = b'CRIMEBN1'
+
+SECTIONS = ('lng', 'lat', 'record_id', 'timestamp', 'district', 'offense', 'neighborhood',
+            'precinct', 'address_offsets', 'address_data', 'offense_table',
+            'neighborhood_table', 'precinct_table')
+
+# The array typecode of each fixed-width column.
+COLUMN_TYPES = {
+    'lng': 'd',
+    'lat': 'd',
+    'record_id': 'q',
+    'timestamp': 'q',
+    'district': 'i',
+    'offense': 'I',
+    'neighborhood': 'I',
+    'precinct': 'I',
+    'address_offsets': 'Q'
+}
+
+# Dictionary-encoded columns and the sections their string tables are stored in.
+ENCODED_COLUMNS = (('offense', 'offense_table'), ('neighborhood', 'neighborhood_table'),
+                   ('precinct', 'precinct_table'))
+
+HEADER_SIZE = len(MAGIC) + 8 + len(SECTIONS) * 16
+
+# The number of records to buffer in memory before spilling columns to temporary files.
+FLUSH_SIZE = 65536
+
+
+def _check_byteorder():
+    if sys.byteorder != 'little':
+        raise RuntimeError('The binary crime data format is only supported on little-endian systems')
+
+
+def _padding(offset):
+    return -offset % 8
+
+
+def _encode_table(values):
+    data = [value.encode('utf8') for value in values]
+    offsets = array.array('Q', [0])
+    for value in data:
+        offsets.append(offsets[-1] + len(value))
+    return struct.pack('<Q', len(data)) + offsets.tobytes() + b''.join(data)
+
+
+def _decode_table(buffer):
+    count, = struct.unpack_from('<Q', buffer, 0)
+    offsets = array.array('Q')
+    offsets.frombytes(bytes(buffer[8:8 + (count + 1) * 8]))
+    data = bytes(buffer[8 + (count + 1) * 8:])
+    return [data[offsets[i]:offsets[i + 1]].decode('utf8') for i in range(count)]
+
+
+class BinaryWriter(object):
+    """Write records of crime data to a file in the binary format.
+
+    Records are added one at a time with `add`. Columns are buffered in memory and spilled to
+    temporary files, so memory use stays flat regardless of the number of records; the file is
+    assembled when the writer is closed.
+    """
+    def __init__(self, file):
+        _check_byteorder()
+        self.file = file
+        self.count = 0
+
+        self._buffers = dict((name, array.array(typecode)) for name, typecode in COLUMN_TYPES.items())
+        self._spills = dict((name, tempfile.TemporaryFile()) for name in COLUMN_TYPES)
+        self._address_data = tempfile.TemporaryFile()
+        self._address_offset = 0
+        self._buffers['address_offsets'].append(0)
+        self._tables = dict((name, ([], {})) for name, _ in ENCODED_COLUMNS)
+
+    def add(self, crime):
+        """Add a `Crime` record."""
+        buffers = self._buffers
+        buffers['lng'].append(crime.lng)
+        buffers['lat'].append(crime.lat)
+        buffers['record_id'].append(crime.record_id)
+        buffers['timestamp'].append(calendar.timegm(crime.report_time.timetuple()))
+        buffers['district'].append(crime.district)
+
+        for name, _ in ENCODED_COLUMNS:
+            values, codes = self._tables[name]
+            value = getattr(crime, name)
+            code = codes.get(value)
+            if code is None:
+                code = codes[value] = len(values)
+                values.append(value)
+            buffers[name].append(code)
+
+        address = crime.address.encode('utf8')
+        self._address_data.write(address)
+        self._address_offset += len(address)
+        buffers['address_offsets'].append(self._address_offset)
+
+        self.count += 1
+        if len(buffers['lng']) >= FLUSH_SIZE:
+            self._flush()
+
+    def close(self):
+        """Assemble the binary file from the spilled columns."""
+        self._flush()
+
+        sections = []
+        tables = dict((table, _encode_table(self._tables[name][0])) for name, table in ENCODED_COLUMNS)
+        offset = HEADER_SIZE
+        for name in SECTIONS:
+            if name in self._spills:
+                length = self._spills[name].tell()
+            elif name == 'address_data':
+                length = self._address_offset
+            else:
+                length = len(tables[name])
+            offset += _padding(offset)
+            sections.append((offset, length))
+            offset += length
+
+        self.file.write(MAGIC)
+        self.file.write(struct.pack('<Q', self.count))
+        for section_offset, length in sections:
+            self.file.write(struct.pack('<QQ', section_offset, length))
+
+        position = HEADER_SIZE
+        for name, (section_offset, length) in zip(SECTIONS, sections):
+            self.file.write(b'\0' * (section_offset - position))
+            if name in tables:
+                self.file.write(tables[name])
+            else:
+                spill = self._address_data if name == 'address_data' else self._spills[name]
+                spill.seek(0)
+                shutil.copyfileobj(spill, self.file)
+                spill.close()
+            position = section_offset + length
+
+    def _flush(self):
+        for name, buffer in self._buffers.items():
+            buffer.tofile(self._spills[name])
+            del buffer[:]
+
+
+class CrimeDataset(object):
+    """Read crime data from a file in the binary format.
+
+    The file is memory-mapped and each column is exposed as a zero-copy memoryview of the file
+    contents, e.g.:
+
+        dataset = CrimeDataset('crimes.bin')
+        dataset.lng[0], dataset.lat[0]
+        dataset.offense_types[dataset.offense[0]]
+
+    Columns can be wrapped in NumPy arrays without copying with ``numpy.frombuffer``. Column views
+    are only valid until the dataset is closed.
+    """
+    def __init__(self, filename):
+        _check_byteorder()
+        self.filename = filename
+        self._file = open(filename, 'rb')
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._buffer = memoryview(self._mmap)
+
+        if self._buffer[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError('Not a binary crime data file: {}'.format(filename))
+
+        self.count, = struct.unpack_from('<Q', self._buffer, len(MAGIC))
+        self._sections = {}
+        for i, name in enumerate(SECTIONS):
+            offset, length = struct.unpack_from('<QQ', self._buffer, len(MAGIC) + 8 + i * 16)
+            self._sections[name] = self._buffer[offset:offset + length]
+
+        self.lng = self._column('lng')
+        self.lat = self._column('lat')
+        self.record_id = self._column('record_id')
+        self.timestamp = self._column('timestamp')
+        self.district = self._column('district')
+        self.offense = self._column('offense')
+        self.neighborhood = self._column('neighborhood')
+        self.precinct = self._column('precinct')
+        self.address_offsets = self._column('address_offsets')
+        self.address_data = self._sections['address_data']
+
+        self.offense_types = _decode_table(self._sections['offense_table'])
+        self.neighborhoods = _decode_table(self._sections['neighborhood_table'])
+        self.precincts = _decode_table(self._sections['precinct_table'])
+
+    def __len__(self):
+        return self.count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def address(self, index):
+        """Return the address of the record at ``index``."""
+        start = self.address_offsets[index]
+        end = self.address_offsets[index + 1]
+        return bytes(self.address_data[start:end]).decode('utf8')
+
+    def report_time(self, index):
+        """Return the report time of the record at ``index`` as a datetime."""
+        return datetime.datetime(1970, 1, 1) + datetime.timedelta(seconds=self.timestamp[index])
+
+    def feature(self, index):
+        """Return the record at ``index`` as a GeoJSON Feature dictionary, in the same form as
+        `Portland.to_geojson_feature`."""
+        return {
+            'geometry': {
+                'coordinates': [self.lng[index], self.lat[index]],
+                'type': 'Point'
+            },
+            'id': self.record_id[index],
+            'properties': {
+                'crimeType': self.offense_types[self.offense[index]],
+                'address': self.address(index),
+                'neighborhood': self.neighborhoods[self.neighborhood[index]],
+                'policePrecinct': self.precincts[self.precinct[index]],
+                'policeDistrict': self.district[index],
+                'reportTime': self.report_time(index).isoformat()
+            },
+            'type': 'Feature'
+        }
+
+    def close(self):
+        """Release the column views and unmap the file."""
+        for name in list(COLUMN_TYPES) + ['address_data']:
+            view = self.__dict__.pop(name, None)
+            if view is not None:
+                view.release()
+        for view in self.__dict__.pop('_sections', {}).values():
+            view.release()
+        if getattr(self, '_buffer', None) is not None:
+            self._buffer.release()
+            self._buffer = None
+            self._mmap.close()
+            self._file.close()
+
+    def _column(self, name):
+        return self._sections[name].cast(COLUMN_TYPES[name])
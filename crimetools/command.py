@@ -1,86 +1,693 @@
 #!/usr/bin/env python
 # encoding: utf-8
 import argparse
+import calendar
+import cProfile
 import csv
+import datetime
+import json
+import multiprocessing
 import os
+import sys
+import tempfile
 
-from crimetools.converters.portland import Portland
+from crimetools import batch, compression, dedupe, incremental, parallel, serve, sort, stats, tiles
+from crimetools.binary import CrimeDataset
+from crimetools.index import SpatialIndex, build_index, index_filename
+from crimetools.metrics import Metrics
+from crimetools.converters.cache import DEFAULT_CACHE_SIZE, TransformCache
+from crimetools.converters.filters import RowFilter
+from crimetools.converters.portland import (DEFAULT_CHUNK_SIZE, DEFAULT_ENGINE, ENGINES, NAD83_EPSG,
+                                            WGS84_EPSG, Portland)
 
 
 class Command(object):
-    def __init__(self, opts):
+    """Convert a file of crime data.
+
+    If a `TransformCache` is given as ``transform_cache`` it is used instead of a new one, e.g. to
+    share transformed points between several conversions in the same process.
+    """
+    def __init__(self, opts, transform_cache=None):
         self.options = opts
+        self.out_filename = opts.out_filename
+        # Stages are only timed when their times are going to be written out.
+        self.metrics = Metrics(timing=bool(opts.metrics_filename))
+
+        # Output is compressed as the --compress option or the output file's extension says.
+        self.compression = opts.compression or compression.compression_of(opts.out_filename)
+        if self.compression and self.compression not in compression.OUTPUT_COMPRESSIONS:
+            raise ValueError("Output can not be compressed as {}".format(self.compression))
+        if self.compression and opts.format not in ('csv', 'geojson', 'geojsonl'):
+            raise ValueError("Compression is not supported for {} output".format(opts.format))
+        if self.compression and opts.manifest_filename:
+            raise ValueError("Incremental conversion is not supported for compressed output")
+        if opts.sort and opts.format not in ('csv', 'geojson', 'geojsonl'):
+            raise ValueError("Sorting is not supported for {} output".format(opts.format))
+        if opts.sort and opts.manifest_filename:
+            raise ValueError("Incremental conversion is not supported for sorted output")
+        if opts.format == 'tiles' and not 0 <= opts.min_zoom <= opts.max_zoom:
+            raise ValueError("Bad zoom levels: {} to {}".format(opts.min_zoom, opts.max_zoom))
+
+        # Rows are read lazily from the open file as the converter consumes them. Compressed
+        # files are decompressed as they are read.
+        self.in_file = compression.open_input(opts.in_filename)
+        self.rows = csv.reader(self.in_file)
+
+        # Duplicate records are dropped before anything else sees them. Keeping the last copy of
+        # each needs a first pass over the input, made just before converting.
+        self.deduplicator = None
+        if opts.dedupe:
+            self.deduplicator = dedupe.Deduplicator(opts.dedupe)
+            self.rows = self.deduplicator.filter_rows(self.rows)
 
-        with open(opts.in_filename, 'r') as f:
-            self.rows = [row for row in csv.reader(f)]
+        # In incremental mode, only rows that are new or changed since the last run are converted.
+        self.manifest = None
+        if opts.manifest_filename:
+            if opts.format not in ('csv', 'geojson', 'geojsonl'):
+                self.in_file.close()
+                raise ValueError("Incremental conversion is not supported for {} output".format(opts.format))
+            self.manifest = incremental.Manifest(opts.manifest_filename)
+            # Without the output of earlier runs to merge into, every row is converted again.
+            if not os.path.exists(opts.out_filename):
+                self.manifest.clear()
+            self.rows = self.manifest.filter_rows(self.rows)
+
+        # Rows that don't match the filter options are dropped before any conversion work.
+        self.row_filter = RowFilter(offenses=opts.offenses, precincts=opts.precincts,
+                                    neighborhoods=opts.neighborhoods,
+                                    since=opts.since, until=opts.until,
+                                    bbox=opts.bbox)
 
         # This script only handles Portland data for now
         if opts.location == 'portland':
-            self.converter = Portland(self.rows, normalize_to_wgs84=self.options.use_wgs84)
+            if transform_cache is None:
+                transform_cache = TransformCache(NAD83_EPSG, WGS84_EPSG,
+                                                 size=self.options.transform_cache_size,
+                                                 filename=self.options.transform_cache_filename)
+            self.transform_cache = transform_cache
+            self.converter = Portland(self.rows, normalize_to_wgs84=self.options.use_wgs84,
+                                      chunk_size=self.options.chunk_size,
+                                      transform_cache=self.transform_cache,
+                                      metrics=self.metrics,
+                                      precision=self.options.precision,
+                                      engine=self.options.engine,
+                                      row_filter=self.row_filter,
+                                      sort=self.options.sort,
+                                      sort_by_time=self.options.sort_by_time,
+                                      sort_buffer_size=self.options.sort_buffer_size)
         else:
+            self.in_file.close()
             raise ValueError("No location handler for {}".format(opts.location))
 
-    def report_empty_result(self):
+    def report_empty_result(self, skipped=None):
         """Report that no results were converted from the input file."""
         print('Could not find any valid data in the file.')
-        skipped = len(self.rows)
+        if skipped is None:
+            skipped = self.converter.original_row_count
         total = 0
         return total, skipped
 
+    def convert_parallel(self):
+        is_new_file = os.path.exists(self.out_filename)
+
+        total, skipped = parallel.convert(self.options.in_filename, self.out_filename,
+                                          self.options.format, self.options.workers,
+                                          use_wgs84=self.options.use_wgs84,
+                                          chunk_size=self.options.chunk_size,
+                                          transform_cache=self.transform_cache,
+                                          metrics=self.metrics,
+                                          precision=self.options.precision,
+                                          compression=self.compression,
+                                          engine=self.options.engine,
+                                          dedupe=self.options.dedupe,
+                                          row_filter=self.row_filter)
+
+        if not total:
+            # An empty CSV result is removed, as `convert_csv` removes it.
+            if self.options.format == 'csv' and is_new_file:
+                os.unlink(self.out_filename)
+            return self.report_empty_result(skipped)
+
+        return total, skipped
+
     def convert_json(self):
-        result, total, skipped = self.converter.to_geojson()
+        with compression.open_output(self.out_filename, self.compression) as out_file:
+            total, skipped = self.converter.write_geojson(out_file)
 
-        if not result:
+        if not total:
             return self.report_empty_result()
 
-        with open(self.options.out_filename, 'w') as out_file:
-            out_file.write(result)
-            return total, skipped
+        return total, skipped
+
+    def convert_json_lines(self):
+        with compression.open_output(self.out_filename, self.compression) as out_file:
+            total, skipped = self.converter.write_geojson_lines(out_file)
+
+        if not total:
+            return self.report_empty_result()
+
+        return total, skipped
+
+    def convert_binary(self):
+        with open(self.out_filename, 'wb') as out_file:
+            total, skipped = self.converter.write_binary(out_file)
+
+        if self.options.build_index:
+            with CrimeDataset(self.out_filename) as dataset:
+                build_index(dataset, index_filename(self.out_filename))
+
+        if not total:
+            return self.report_empty_result()
+
+        return total, skipped
+
+    def convert_tiles(self):
+        """Bin crimes into a heatmap tile pyramid, written to a directory or, if the output file
+        name ends in ".tiles", a single packed archive."""
+        pyramid = tiles.TilePyramid(self.options.min_zoom, self.options.max_zoom)
+        for crime in self.converter.crimes():
+            pyramid.add(crime.lng, crime.lat, crime.offense)
+
+        total = pyramid.count
+        skipped = self.converter.original_row_count - total
+
+        if not total:
+            return self.report_empty_result()
+
+        if self.out_filename.endswith('.tiles'):
+            with open(self.out_filename, 'wb') as out_file:
+                count = pyramid.write_archive(out_file)
+        else:
+            count = pyramid.write_directory(self.out_filename)
+
+        print('\t{} tiles written'.format(count))
+        return total, skipped
 
     def convert_csv(self):
-        is_new_file = os.path.exists(self.options.out_filename)
+        is_new_file = os.path.exists(self.out_filename)
 
-        with open(self.options.out_filename, 'w', encoding='UTF8', newline='') as out_file:
+        with compression.open_output(self.out_filename, self.compression,
+                                     encoding='UTF8', newline='') as out_file:
             result, total, skipped = self.converter.to_csv(out_file)
 
             if not total:
                 out_file.close()
                 if is_new_file:
-                    os.unlink(out_file.name)
+                    os.unlink(self.out_filename)
                 return self.report_empty_result()
 
             return total, skipped
 
-    def run(self):
-        """Convert a CSV file of crime data from ``in_filename`` to a file in ``out_format`` named
-        ``out_filename``.
+    def convert_incremental(self):
+        """Convert only new and changed rows and merge them into the existing output, if any.
 
-        Returns the number of rows skipped.
+        Only the rows that were written to the output are added to the manifest, so rows that fail
+        to convert are tried again in the next run.
         """
+        record_ids = set()
+        if not os.path.exists(self.out_filename):
+            result = self.convert()
+            if result is not None:
+                record_ids = incremental.output_record_ids(self.out_filename, self.options.format)
+        else:
+            out_dir = os.path.dirname(os.path.abspath(self.out_filename))
+            fd, self.out_filename = tempfile.mkstemp(dir=out_dir)
+            os.close(fd)
+            try:
+                result = self.convert()
+                if result is not None:
+                    record_ids = incremental.output_record_ids(self.out_filename, self.options.format)
+                    incremental.merge_output(self.options.out_filename, self.out_filename,
+                                             self.options.format, self.manifest.changed_ids)
+            finally:
+                if os.path.exists(self.out_filename):
+                    os.unlink(self.out_filename)
+                self.out_filename = self.options.out_filename
+
+        if result is not None:
+            self.manifest.save(record_ids)
+        return result
+
+    def scan_duplicates(self):
+        """Find the duplicate records in the input file to drop, in a pass of its own."""
+        with compression.open_input(self.options.in_filename) as in_file:
+            self.deduplicator.scan(csv.reader(in_file))
+
+    def convert(self):
+        """Convert the input file to ``self.out_filename`` in the chosen format.
+
+        Returns the number of rows converted and skipped, or None if the format is not supported.
+        """
+        # Parallel conversion reads byte ranges of the input file itself, so it can't be used with
+        # a manifest or a compressed input file. Its output is always in input order.
+        if self.options.workers > 1 and self.manifest is None and not self.options.sort \
+                and not compression.compression_of(self.options.in_filename) \
+                and self.options.format in ('csv', 'geojson', 'geojsonl'):
+            return self.convert_parallel()
+
+        if self.deduplicator is not None and self.deduplicator.keep == 'last':
+            self.scan_duplicates()
+
         if self.options.format == 'geojson':
-            total, skipped = self.convert_json()
+            return self.convert_json()
+        elif self.options.format == 'geojsonl':
+            return self.convert_json_lines()
         elif self.options.format == 'csv':
-            total, skipped = self.convert_csv()
+            return self.convert_csv()
+        elif self.options.format == 'binary':
+            return self.convert_binary()
+        elif self.options.format == 'tiles':
+            return self.convert_tiles()
         else:
             "Format not supported: {}".format(self.options.format)
+            return None
+
+    def run(self):
+        """Convert a CSV file of crime data from ``in_filename`` to a file in ``out_format`` named
+        ``out_filename``.
+
+        Returns the number of rows converted and skipped, or None if the format is not supported.
+        """
+        try:
+            if self.manifest is not None:
+                result = self.convert_incremental()
+            else:
+                result = self.convert()
+        finally:
+            self.in_file.close()
+            self.transform_cache.close()
+
+        if result is None:
             return
 
+        total, skipped = result
+
         print('\t{} records converted'.format(total))
 
+        if self.manifest is not None:
+            print('\t{} records unchanged since the last run'.format(self.manifest.unchanged))
+
+        # Parallel conversion counts the duplicates its workers drop in the metrics.
+        if self.deduplicator is not None and self.deduplicator.duplicates:
+            self.metrics.count('duplicates', self.deduplicator.duplicates)
+        if self.metrics.counters['duplicates']:
+            print('\t{} duplicate records dropped'.format(self.metrics.counters['duplicates']))
+
+        if self.metrics.counters['filtered']:
+            print('\t{} records filtered out'.format(self.metrics.counters['filtered']))
+
+        if skipped:
+            print('\t{} records skipped due to bad data'.format(skipped))
+            for reason, count in sorted(self.metrics.skips.items()):
+                print('\t\t{} {}'.format(count, reason.replace('_', ' ')))
+
+        cache_stats = self.transform_cache.stats()
+        if cache_stats['hits'] or cache_stats['persistent_hits'] or cache_stats['misses']:
+            print('\t{hits} transform cache hits ({persistent_hits} from disk), '
+                  '{misses} misses'.format(**cache_stats))
+
+        self.metrics.count('converted', total)
+        self.metrics.count('skipped', skipped)
+        if self.options.metrics_filename:
+            self.write_metrics(cache_stats)
+        self.metrics.publish()
+        return total, skipped
+
+    def write_metrics(self, cache_stats):
+        """Write the metrics of the conversion to the ``--metrics-out`` file as JSON."""
+        report = self.metrics.report()
+        report['transform_cache'] = cache_stats
+        with open(self.options.metrics_filename, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+            f.write('\n')
+
+
+class QueryCommand(object):
+    """Look up crimes in a binary dataset written with ``-f binary`` using its spatial index.
+
+    The index is built next to the dataset if it is missing or older than the dataset.
+    """
+    def __init__(self, opts):
+        self.options = opts
+
+    def load_index(self, dataset):
+        filename = index_filename(self.options.dataset_filename)
+        if not os.path.exists(filename) or \
+                os.path.getmtime(filename) < os.path.getmtime(self.options.dataset_filename):
+            build_index(dataset, filename)
+        return SpatialIndex(dataset, filename)
+
+    def query(self, index):
+        filters = {
+            'offenses': self.options.offenses,
+            'since': timestamp(self.options.since),
+            'until': timestamp(self.options.until)
+        }
+
+        if self.options.bbox:
+            return index.bbox(*self.options.bbox, **filters)
+        elif self.options.radius:
+            return index.radius(*self.options.radius, **filters)
+        else:
+            lng, lat, k = self.options.nearest
+            return index.nearest(lng, lat, int(k), **filters)
+
+    def run(self):
+        """Write the matching crimes as GeoJSON Features, one per line."""
+        out_file = open(self.options.out_filename, 'w') if self.options.out_filename else sys.stdout
+
+        try:
+            with CrimeDataset(self.options.dataset_filename) as dataset:
+                with self.load_index(dataset) as index:
+                    positions = self.query(index)
+                    for position in positions:
+                        out_file.write(json.dumps(dataset.feature(position), sort_keys=True))
+                        out_file.write('\n')
+        finally:
+            if out_file is not sys.stdout:
+                out_file.close()
+
+        print('\t{} records found'.format(len(positions)), file=sys.stderr)
+
+
+def parse_datetime(value, end_of_day=False):
+    """Parse a date ("2011-12-01") or ISO date and time ("2011-12-01T01:00:00") into a datetime.
+    A date alone means the start of the day, or the end of the day if ``end_of_day`` is True."""
+    if value is None:
+        return None
+    try:
+        date = datetime.datetime.strptime(value, '%Y-%m-%dT%H:%M:%S')
+    except ValueError:
+        date = datetime.datetime.strptime(value, '%Y-%m-%d')
+        if end_of_day:
+            date += datetime.timedelta(days=1, seconds=-1)
+    return date
+
+
+def timestamp(date):
+    """Return the datetime ``date`` in seconds since the epoch, with the same convention as the
+    binary format, or None if it is None."""
+    if date is None:
+        return None
+    return calendar.timegm(date.timetuple())
+
+
+def datetimes(end_of_day=False):
+    """Return an argparse type that parses a date or ISO date and time with `parse_datetime`."""
+    def parse(value):
+        try:
+            return parse_datetime(value, end_of_day)
+        except ValueError:
+            raise argparse.ArgumentTypeError('expected a date (YYYY-MM-DD) or a date and time '
+                                             '(YYYY-MM-DDTHH:MM:SS)')
+    return parse
+
+
+def query_main(argv):
+    parser = argparse.ArgumentParser(prog='crimes query')
+    parser.add_argument('-d', action='store', dest='dataset_filename', required=True,
+                        help='The path to a binary dataset written with -f binary')
+    parser.add_argument('-o', action='store', dest='out_filename',
+                        help='The path to the file to write matching crimes to (default: standard output)')
+    lookup = parser.add_mutually_exclusive_group(required=True)
+    # Coordinates are separate values, so argparse accepts negative longitudes.
+    lookup.add_argument('--bbox', action='store', type=float, nargs=4, dest='bbox',
+                        metavar=('MIN_LNG', 'MIN_LAT', 'MAX_LNG', 'MAX_LAT'),
+                        help='Find crimes within a bounding box')
+    lookup.add_argument('--radius', action='store', type=float, nargs=3, dest='radius',
+                        metavar=('LNG', 'LAT', 'METRES'), help='Find crimes within a distance of a point')
+    lookup.add_argument('--nearest', action='store', type=float, nargs=3, dest='nearest',
+                        metavar=('LNG', 'LAT', 'K'), help='Find the K crimes nearest to a point')
+    parser.add_argument('--offense', action='append', dest='offenses', help='Only find crimes of this offense type')
+    parser.add_argument('--since', action='store', type=datetimes(), dest='since',
+                        help='Only find crimes reported on or after this date')
+    parser.add_argument('--until', action='store', type=datetimes(end_of_day=True), dest='until',
+                        help='Only find crimes reported on or before this date')
+
+    options = parser.parse_args(argv)
+
+    command = QueryCommand(options)
+    command.run()
+
+
+class StatsCommand(object):
+    """Count crimes in one or more CSV files by neighborhood, precinct, offense type, hour of day
+    and week, optionally merging counts previously saved as JSON."""
+    def __init__(self, opts):
+        self.options = opts
+
+    def collect(self):
+        result = stats.CrimeStats()
+
+        in_filenames = self.options.in_filenames or []
+        if self.options.workers > 1 and len(in_filenames) > 1:
+            pool = multiprocessing.Pool(min(self.options.workers, len(in_filenames)))
+            try:
+                partials = pool.map(stats.collect, in_filenames)
+            finally:
+                pool.terminate()
+                pool.join()
+        else:
+            partials = map(stats.collect, in_filenames)
+
+        for partial in partials:
+            result.merge(stats.CrimeStats.from_dict(partial))
+
+        for filename in self.options.merge_filenames or []:
+            with open(filename, 'r') as f:
+                result.merge(stats.CrimeStats.from_dict(json.load(f)))
+
+        return result
+
+    def run(self):
+        result = self.collect()
+
+        with open(self.options.out_filename, 'w', encoding='UTF8', newline='') as out_file:
+            if self.options.format == 'csv':
+                result.write_csv(out_file)
+            else:
+                result.write_json(out_file)
+
+        print('\t{} records counted'.format(result.total))
+
+        if result.skipped:
+            print('\t{} records skipped due to bad data'.format(result.skipped))
+
+
+def stats_main(argv):
+    parser = argparse.ArgumentParser(prog='crimes stats')
+    parser.add_argument('-i', action='append', dest='in_filenames', help='The path to a file to read data from')
+    parser.add_argument('-o', action='store', dest='out_filename', required=True, help='The path to the file to write counts to')
+    parser.add_argument('-f', action='store', choices=['json', 'csv'], dest='format', default='json',
+                        help='The format to write counts in; only JSON counts can be merged later')
+    parser.add_argument('--merge', action='append', dest='merge_filenames',
+                        help='The path to JSON counts from an earlier run to add to the counts')
+    parser.add_argument('--workers', action='store', type=int, dest='workers', default=1,
+                        help='The number of processes to count input files with')
+
+    options = parser.parse_args(argv)
+    if not options.in_filenames and not options.merge_filenames:
+        parser.error('at least one of -i or --merge is required')
+
+    command = StatsCommand(options)
+    command.run()
+
+
+def serve_main(argv):
+    parser = argparse.ArgumentParser(prog='crimes serve')
+    parser.add_argument('--socket', action='store', dest='socket_path', required=True,
+                        help='The path of the Unix socket to listen for jobs on')
+
+    options = parser.parse_args(argv)
+
+    serve.serve(options.socket_path)
+
+
+class BatchCommand(object):
+    """Convert many files at once on a pool of worker processes, naming each output file from a
+    template, and report the results of each file and in total.
+
+    A file that fails to convert is reported and the others carry on.
+    """
+    def __init__(self, opts):
+        self.options = opts
+
+    def run(self):
+        """Returns the number of files that failed to convert."""
+        inputs = batch.find_inputs(self.options.inputs)
+        if not inputs:
+            print('No input files found.')
+            return 0
+
+        options = argparse.Namespace(**vars(self.options))
+        options.manifest_filename = None
+        options.metrics_filename = None
+        options.workers = 1
+
+        results = []
+        for result in batch.convert(inputs, self.options.template, options, self.options.workers):
+            results.append(result)
+            if result['error']:
+                print('\t[{}/{}] {}: failed: {}'.format(len(results), len(inputs), result['input'],
+                                                       result['error']))
+            else:
+                print('\t[{}/{}] {}: {} records converted, {} skipped'.format(
+                    len(results), len(inputs), result['input'], result['total'], result['skipped']))
+
+        failed = [result for result in results if result['error']]
+        print('\t{} files converted, {} failed'.format(len(results) - len(failed), len(failed)))
+        print('\t{} records converted'.format(sum(result['total'] for result in results)))
+
+        skipped = sum(result['skipped'] for result in results)
         if skipped:
             print('\t{} records skipped due to bad data'.format(skipped))
 
+        duplicates = sum(result['duplicates'] for result in results)
+        if duplicates:
+            print('\t{} duplicate records dropped'.format(duplicates))
+
+        filtered = sum(result['filtered'] for result in results)
+        if filtered:
+            print('\t{} records filtered out'.format(filtered))
+
+        if self.options.report_filename:
+            results.sort(key=lambda result: inputs.index(result['input']))
+            with open(self.options.report_filename, 'w') as f:
+                json.dump({'files': results}, f, indent=2, sort_keys=True)
+                f.write('\n')
+
+        return len(failed)
+
+
+def batch_main(argv):
+    parser = argparse.ArgumentParser(prog='crimes batch')
+    parser.add_argument('inputs', nargs='+', metavar='INPUT',
+                        help='A file, a glob pattern or a directory of CSV files to convert')
+    parser.add_argument('-o', action='store', dest='template', default=batch.DEFAULT_TEMPLATE,
+                        help='The template of output file names, using {dir}, {name} and {ext} for the input '
+                             'file\'s directory, its name without its extension and the output format\'s extension '
+                             '(default: %(default)s)')
+    add_conversion_arguments(parser)
+    parser.add_argument('--workers', action='store', type=int, dest='workers', default=multiprocessing.cpu_count(),
+                        help='The number of files to convert at a time (default: the number of CPUs)')
+    parser.add_argument('--report', action='store', dest='report_filename',
+                        help='The path to a file to write the results of each file to, as JSON')
+
+    options = parser.parse_args(argv)
+
+    command = BatchCommand(options)
+    if command.run():
+        sys.exit(1)
+
+
+def add_conversion_arguments(parser):
+    """Add the options that control how each file is converted to ``parser``."""
+    parser.add_argument('-l', action='store', choices=['portland'], dest='location', required=True, help='The location converter to use')
+    parser.add_argument('-f', action='store', choices=['csv', 'geojson', 'geojsonl', 'binary', 'tiles'],
+                        dest='format', required=True,
+                        help='The format to use for output data (geojsonl writes one GeoJSON Feature per line, binary '
+                             'a memory-mappable file read by crimetools.binary, tiles a heatmap tile pyramid)')
+    parser.add_argument('--wgs84', action='store_true', dest='use_wgs84', help='Normalize to WGS84 coordinates')
+    parser.add_argument('--chunk-size', action='store', type=int, dest='chunk_size', default=DEFAULT_CHUNK_SIZE,
+                        help='The number of rows to transform to WGS84 at a time')
+    parser.add_argument('--transform-cache', action='store', dest='transform_cache_filename',
+                        help='The path to a file to cache transformed coordinates in across runs')
+    parser.add_argument('--transform-cache-size', action='store', type=int, dest='transform_cache_size',
+                        default=DEFAULT_CACHE_SIZE, help='The number of transformed coordinates to cache in memory')
+    parser.add_argument('--engine', action='store', choices=ENGINES, dest='engine', default=DEFAULT_ENGINE,
+                        help='The projection engine to transform coordinates with (default: %(default)s); gdal needs '
+                             'the GDAL package, installed with the gdal extra, and numpy needs NumPy, installed '
+                             'with the numpy extra')
+    parser.add_argument('--precision', action='store', type=int, dest='precision',
+                        help='The number of decimal places to round GeoJSON coordinates to (default: full precision)')
+    parser.add_argument('--index', action='store_true', dest='build_index',
+                        help='Build a spatial index for crimes query next to a binary output file')
+    parser.add_argument('--min-zoom', action='store', type=int, dest='min_zoom', default=tiles.DEFAULT_MIN_ZOOM,
+                        help='The lowest zoom level of tiles to write')
+    parser.add_argument('--max-zoom', action='store', type=int, dest='max_zoom', default=tiles.DEFAULT_MAX_ZOOM,
+                        help='The highest zoom level of tiles to write')
+    parser.add_argument('--dedupe', action='store', choices=dedupe.KEEP, dest='dedupe',
+                        help='Drop records with the same record ID as another record, keeping the first or last copy')
+    parser.add_argument('--offense', action='append', dest='offenses', help='Only convert crimes of this offense type')
+    parser.add_argument('--precinct', action='append', dest='precincts', help='Only convert crimes in this police precinct')
+    parser.add_argument('--neighborhood', action='append', dest='neighborhoods',
+                        help='Only convert crimes in this neighborhood')
+    parser.add_argument('--since', action='store', type=datetimes(), dest='since',
+                        help='Only convert crimes reported on or after this date')
+    parser.add_argument('--until', action='store', type=datetimes(end_of_day=True), dest='until',
+                        help='Only convert crimes reported on or before this date')
+    # Separate values, unlike comma-separated ones, may start with a minus sign, as every longitude
+    # in Portland does.
+    parser.add_argument('--bbox', action='store', type=float, nargs=4, dest='bbox',
+                        metavar=('MIN_LNG', 'MIN_LAT', 'MAX_LNG', 'MAX_LAT'),
+                        help='Only convert crimes within a bounding box')
+    parser.add_argument('--sort', action='store', choices=sort.CURVES, dest='sort',
+                        help='Sort the output along a space-filling curve, so nearby crimes are written together; '
+                             'only for csv, geojson and geojsonl output, converted by a single process')
+    parser.add_argument('--sort-by-time', action='store_true', dest='sort_by_time',
+                        help='Sort crimes in the same place by report time')
+    parser.add_argument('--sort-buffer-size', action='store', type=int, dest='sort_buffer_size',
+                        default=sort.DEFAULT_BUFFER_SIZE,
+                        help='The number of records to sort in memory before spilling them to a temporary file')
+    parser.add_argument('--compress', action='store', choices=sorted(compression.OUTPUT_COMPRESSIONS),
+                        dest='compression',
+                        help='Compress the output (default: compress it if the output file name ends in .gz, .bz2 '
+                             'or .xz); input files ending in .gz, .bz2, .xz or .zip are always decompressed')
+
+
+# Subcommands of the crimes command. Without one, the crimes command converts a file.
+SUBCOMMANDS = {
+    'batch': batch_main,
+    'query': query_main,
+    'serve': serve_main,
+    'stats': stats_main
+}
+
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
+
+    if argv and argv[0] in SUBCOMMANDS:
+        return SUBCOMMANDS[argv[0]](argv[1:])
 
-def main():
     parser = argparse.ArgumentParser()
     parser.add_argument('-i', action='store', dest='in_filename', required=True, help='The path to the file to read data from')
     parser.add_argument('-o', action='store', dest='out_filename', required=True, help='The path to the file to write data to')
-    parser.add_argument('-l', action='store', choices=['portland'], dest='location', required=True, help='The location converter to use')
-    parser.add_argument('-f', action='store', choices=['csv', 'geojson'], dest='format', required=True, help='The format to use for output data')
-    parser.add_argument('--wgs84', action='store_true', dest='use_wgs84', help='Normalize to WGS84 coordinates')
+    add_conversion_arguments(parser)
+    parser.add_argument('--incremental', action='store', dest='manifest_filename',
+                        help='The path to a manifest of converted records; only new and changed records are '
+                             'converted and merged into the existing output file')
+    parser.add_argument('--workers', action='store', type=int, dest='workers', default=1,
+                        help='The number of processes to convert with')
+    parser.add_argument('--metrics-out', action='store', dest='metrics_filename',
+                        help='The path to a file to write the time spent in each stage and the reasons records '
+                             'were skipped to, as JSON')
+    parser.add_argument('--profile', action='store', dest='profile_filename',
+                        help='The path to a file to write cProfile stats of the conversion to')
+    parser.add_argument('--server', action='store', dest='server_socket',
+                        help='The path of the Unix socket of a crimes serve process to run the conversion in')
     parser.add_argument('--version', action='version', version='%(prog)s 0.1')
 
-    options = parser.parse_args()
+    options = parser.parse_args(argv)
 
-    command = Command(options)
-    command.run()
+    if options.server_socket:
+        status, output = serve.submit(options.server_socket, serve.strip_option(argv, '--server'))
+        sys.stdout.write(output)
+        if status:
+            sys.exit(status)
+        return
+
+    # Options that can't be used together are reported like any other bad argument.
+    try:
+        command = Command(options)
+    except ValueError as e:
+        parser.error(str(e))
+    if options.profile_filename:
+        profile = cProfile.Profile()
+        try:
+            profile.runcall(command.run)
+        finally:
+            profile.dump_stats(options.profile_filename)
+    else:
+        command.run()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+# encoding: utf-8
+import bz2
+import gzip
+import io
+import lzma
+import os
+import zipfile
+
+
+# The size of the buffers compressed files are read and written through.
+BUFFER_SIZE = 1024 * 1024
+
+# The compression formats recognized by file extension.
+EXTENSIONS = {
+    '.gz': 'gzip',
+    '.bz2': 'bz2',
+    '.xz': 'xz',
+    '.zip': 'zip'
+}
+
+# The formats output can be compressed in, and their file extensions.
+OUTPUT_COMPRESSIONS = {
+    'gzip': '.gz',
+    'bz2': '.bz2',
+    'xz': '.xz'
+}
+
+# A moderate gzip level, which compresses nearly as well as the default of 9 in much less time.
+GZIP_LEVEL = 6
+
+
+def compression_of(filename):
+    """Return the compression format of ``filename`` from its extension, or None."""
+    return EXTENSIONS.get(os.path.splitext(filename)[1].lower())
+
+
+def strip_extension(filename):
+    """Return ``filename`` without its compression extension, if it has one."""
+    if compression_of(filename):
+        return os.path.splitext(filename)[0]
+    return filename
+
+
+def _open_compressed(filename, mode, compression):
+    if compression == 'gzip':
+        return gzip.open(filename, mode, compresslevel=GZIP_LEVEL)
+    elif compression == 'bz2':
+        return bz2.open(filename, mode)
+    elif compression == 'xz':
+        return lzma.open(filename, mode)
+    else:
+        raise ValueError('Unknown compression: {}'.format(compression))
+
+
+def _open_zip_member(filename):
+    archive = zipfile.ZipFile(filename)
+    try:
+        members = [info for info in archive.infolist() if not info.is_dir()]
+        if len(members) != 1:
+            raise ValueError('Expected a single file in {}, found {}'.format(filename, len(members)))
+        # The archive's file stays open until the member is closed.
+        return archive.open(members[0])
+    finally:
+        archive.close()
+
+
+def open_input(filename, mode='r', encoding=None, newline=None):
+    """Open ``filename`` for reading, decompressing it on the fly if it ends in ".gz", ".bz2",
+    ".xz" or ".zip". A zip file must hold a single file.
+
+    Files are read through a large buffer. ``mode`` is "r" for text or "rb" for bytes.
+    """
+    compression = compression_of(filename)
+    if compression is None:
+        if 'b' in mode:
+            return open(filename, mode, buffering=BUFFER_SIZE)
+        return open(filename, mode, buffering=BUFFER_SIZE, encoding=encoding, newline=newline)
+
+    if compression == 'zip':
+        raw = _open_zip_member(filename)
+    else:
+        raw = _open_compressed(filename, 'rb', compression)
+    f = io.BufferedReader(raw, BUFFER_SIZE)
+    if 'b' in mode:
+        return f
+    return io.TextIOWrapper(f, encoding=encoding, newline=newline)
+
+
+def open_output(filename, compression=None, mode='w', encoding=None, newline=None):
+    """Open ``filename`` for writing, compressing it on the fly in the format ``compression``,
+    or if that is None, the format given by the extension of ``filename``, if any.
+
+    Files are written through a large buffer. ``mode`` is "w" for text or "wb" for bytes.
+    """
+    compression = compression or compression_of(filename)
+    if compression is None:
+        if 'b' in mode:
+            return open(filename, mode, buffering=BUFFER_SIZE)
+        return open(filename, mode, buffering=BUFFER_SIZE, encoding=encoding, newline=newline)
+
+    if compression not in OUTPUT_COMPRESSIONS:
+        raise ValueError('Output can not be compressed as {}'.format(compression))
+    f = io.BufferedWriter(_open_compressed(filename, 'wb', compression), BUFFER_SIZE)
+    if 'b' in mode:
+        return f
+    return io.TextIOWrapper(f, encoding=encoding, newline=newline)
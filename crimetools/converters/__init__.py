@@ -1 +1,3 @@
-from crimetools.converters.portland import *
\ No newline at end of file
+from crimetools.converters.portland import *
+from crimetools.converters.cache import TransformCache
+from crimetools.converters.store import RecordStore
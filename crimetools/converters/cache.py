@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+# encoding: utf-8
+import collections
+import shelve
+
+
+# The number of transformed points to keep in memory.
+DEFAULT_CACHE_SIZE = 100000
+
+
+class TransformCache(object):
+    """Cache the results of transforming points from one coordinate system to another.
+
+    Crime reports cluster heavily on the same intersections and block addresses, so the same
+    source coordinates are transformed over and over. The cache has two tiers:
+
+        - An in-memory least-recently-used tier of up to ``size`` points.
+        - An optional persistent tier in the file ``filename``, which is reused across runs. Its
+          keys include the EPSG codes of both coordinate systems, so one file can be shared by
+          different transformations. The file is opened the first time it is needed.
+
+    If ``read_only`` is True the persistent tier is only read from, which allows several
+    processes to share it at once. Points transformed in the meantime are collected in
+    ``pending`` so the process that owns the persistent tier can save them with `update`.
+    """
+    def __init__(self, source_epsg, target_epsg, size=DEFAULT_CACHE_SIZE, filename=None,
+                 read_only=False):
+        self.source_epsg = source_epsg
+        self.target_epsg = target_epsg
+        self.size = size
+        self.filename = filename
+        self.read_only = read_only
+        self.pending = []
+        self.hits = 0
+        self.persistent_hits = 0
+        self.misses = 0
+
+        self._points = collections.OrderedDict()
+        self._prefix = '{}:{}:'.format(source_epsg, target_epsg)
+        self._store = None
+        self._missing = False
+
+    def get(self, point):
+        """Return the transformed (x, y) tuple for ``point``, or None if it is not cached."""
+        value = self._points.get(point)
+        if value is not None:
+            self._points.move_to_end(point)
+            self.hits += 1
+            return value
+
+        store = self._open()
+        if store is not None:
+            value = store.get(self.key(point))
+            if value is not None:
+                self.persistent_hits += 1
+                self._remember(point, value)
+                return value
+
+        self.misses += 1
+        return None
+
+    def set(self, point, value):
+        """Cache ``value`` as the transformed (x, y) tuple for ``point``."""
+        self._remember(point, value)
+
+        if not self.filename:
+            return
+
+        if self.read_only:
+            self.pending.append((point, value))
+        else:
+            self._open()[self.key(point)] = value
+
+    def update(self, items):
+        """Cache each (point, value) tuple in ``items``."""
+        for point, value in items:
+            self.set(point, value)
+
+    def key(self, point):
+        """Return the persistent tier key for ``point``."""
+        return '{}{!r}:{!r}'.format(self._prefix, point[0], point[1])
+
+    def stats(self):
+        """Return a dictionary of the cache's hit and miss counts."""
+        return {
+            'hits': self.hits,
+            'persistent_hits': self.persistent_hits,
+            'misses': self.misses
+        }
+
+    def merge_stats(self, stats):
+        """Add the hit and miss counts in ``stats``, e.g. from another process, to this cache's."""
+        self.hits += stats['hits']
+        self.persistent_hits += stats['persistent_hits']
+        self.misses += stats['misses']
+
+    def close(self):
+        """Close the persistent tier, if it is open."""
+        if self._store is not None:
+            self._store.close()
+            self._store = None
+
+    def _open(self):
+        if self._store is None and self.filename and not self._missing:
+            try:
+                self._store = shelve.open(self.filename, flag='r' if self.read_only else 'c')
+            except Exception:
+                if not self.read_only:
+                    raise
+                # There is nothing to read from a persistent tier that doesn't exist yet, but
+                # points are still collected in ``pending`` so the owner can create it.
+                self._missing = True
+        return self._store
+
+    def _remember(self, point, value):
+        if self.size <= 0:
+            return
+        self._points[point] = value
+        if len(self._points) > self.size:
+            self._points.popitem(last=False)
@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+# encoding: utf-8
+import collections
+import datetime
+
+
+DATE_FORMAT = '%m/%d/%Y'
+DATETIME_FORMAT = '%m/%d/%Y %H:%M:%S'
+
+# The number of distinct dates to remember. A year of crime data has only 365.
+DEFAULT_CACHE_SIZE = 4096
+
+_DIGITS = frozenset('0123456789')
+
+
+class ReportDateParser(object):
+    """Parse the "Report Date" and "Report Time" columns of crime data into datetimes.
+
+    Equivalent to:
+
+        datetime.datetime.strptime('{} {}'.format(date, time), '%m/%d/%Y %H:%M:%S')
+
+    but much faster on real data. Parsed dates are remembered in a least-recently-used cache of up
+    to ``cache_size`` entries, and times in the usual fixed-width "HH:MM:SS" form are parsed
+    without strptime. Any value that doesn't fit the fast path falls back to strptime, so exactly
+    the same values are accepted and rejected.
+    """
+    def __init__(self, cache_size=DEFAULT_CACHE_SIZE):
+        self.cache_size = cache_size
+        self._dates = collections.OrderedDict()
+
+    def parse(self, date_string, time_string):
+        """Parse a datetime from ``date_string`` and ``time_string``.
+
+        Raises ValueError.
+        """
+        date = self.parse_date(date_string)
+        time = self.parse_time(time_string)
+
+        if date is None or time is None:
+            return datetime.datetime.strptime('{} {}'.format(date_string, time_string),
+                                              DATETIME_FORMAT)
+
+        return datetime.datetime(date.year, date.month, date.day, *time)
+
+    def parse_many(self, values):
+        """Parse a list of (date_string, time_string) tuples.
+
+        Returns a list of datetimes in the same order, with None for each value that could not be
+        parsed.
+        """
+        dates = []
+        for date_string, time_string in values:
+            try:
+                dates.append(self.parse(date_string, time_string))
+            except ValueError:
+                dates.append(None)
+        return dates
+
+    def parse_date(self, date_string):
+        """Parse a date from ``date_string``, or return None if it needs a closer look."""
+        if not isinstance(date_string, str):
+            return None
+
+        dates = self._dates
+        try:
+            date = dates[date_string]
+        except KeyError:
+            try:
+                date = datetime.datetime.strptime(date_string, DATE_FORMAT).date()
+            except ValueError:
+                date = None
+            dates[date_string] = date
+            if len(dates) > self.cache_size:
+                dates.popitem(last=False)
+        else:
+            dates.move_to_end(date_string)
+
+        return date
+
+    def parse_time(self, time_string):
+        """Parse an (hour, minute, second) tuple from a fixed-width "HH:MM:SS" ``time_string``.
+
+        Returns None if ``time_string`` is not in that form.
+        """
+        if not isinstance(time_string, str) or len(time_string) != 8 \
+                or time_string[2] != ':' or time_string[5] != ':':
+            return None
+
+        hour, minute, second = time_string[0:2], time_string[3:5], time_string[6:8]
+        if not _DIGITS.issuperset(hour + minute + second):
+            return None
+
+        hour, minute, second = int(hour), int(minute), int(second)
+        if hour > 23 or minute > 59 or second > 59:
+            return None
+
+        return hour, minute, second
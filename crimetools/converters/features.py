@@ -0,0 +1,48 @@
+#!/usr/bin/env python
+# encoding: utf-8
+import json
+import math
+
+from json.encoder import encode_basestring_ascii
+
+
+# A Portland crime serialized as a GeoJSON Feature, with its keys in sorted order. This is the same
+# shape `geojson.dumps(feature, sort_keys=True)` writes for `Portland.to_geojson_feature`.
+FEATURE_TEMPLATE = ('{{"geometry": {{"coordinates": [{lng}, {lat}], "type": "Point"}}, '
+                    '"id": {record_id}, '
+                    '"properties": {{"address": {address}, "crimeType": {offense}, '
+                    '"neighborhood": {neighborhood}, "policeDistrict": {district}, '
+                    '"policePrecinct": {precinct}, "reportTime": "{report_time}"}}, '
+                    '"type": "Feature"}}')
+
+
+class FeatureSerializer(object):
+    """Serialize `Crime` records as GeoJSON Features by filling in a template.
+
+    Portland features always have the same shape, so instead of building a `geojson.Feature` and
+    serializing it with the generic JSON encoder, each value is formatted directly. With the
+    default ``precision`` of None, coordinates are written in full and the output is byte for byte
+    the same as ``geojson.dumps(feature, sort_keys=True)``. Otherwise coordinates are rounded to
+    ``precision`` decimal places; 6 places is about 10 cm, and makes for much smaller files.
+    """
+    def __init__(self, precision=None):
+        self.precision = precision
+
+    def coordinate(self, value):
+        if self.precision is not None:
+            value = round(value, self.precision)
+        if math.isinf(value) or math.isnan(value):
+            return json.dumps(value)
+        return float.__repr__(value)
+
+    def serialize(self, crime):
+        """Return ``crime`` serialized as a GeoJSON Feature."""
+        return FEATURE_TEMPLATE.format(lng=self.coordinate(crime.lng),
+                                       lat=self.coordinate(crime.lat),
+                                       record_id=int.__repr__(crime.record_id),
+                                       address=encode_basestring_ascii(crime.address),
+                                       offense=encode_basestring_ascii(crime.offense),
+                                       neighborhood=encode_basestring_ascii(crime.neighborhood),
+                                       district=int.__repr__(crime.district),
+                                       precinct=encode_basestring_ascii(crime.precinct),
+                                       report_time=crime.report_time.isoformat())
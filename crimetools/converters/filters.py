@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+
+# The number of points along each edge of a bounding box that are projected to find its envelopes.
+BBOX_EDGE_POINTS = 64
+
+# The envelopes of a projected bounding box are widened or narrowed by this many projected units,
+# to allow for the curve of its edges between the projected points.
+BBOX_MARGIN = 1.0
+
+
+class RowFilter(object):
+    """Criteria for the rows of crime data to convert.
+
+    A row matches if its "Major Offense Type" is one of ``offenses``, its "Police Precinct" one of
+    ``precincts``, its "Neighborhood" one of ``neighborhoods``, it was reported between the
+    datetimes ``since`` and ``until``, inclusive, and its coordinates are in ``bbox``, a
+    (min_lng, min_lat, max_lng, max_lat) tuple in WGS84. Criteria left as None match every row.
+
+    Rows are filtered by `Portland.filter_rows`.
+    """
+    def __init__(self, offenses=None, precincts=None, neighborhoods=None, since=None, until=None,
+                 bbox=None):
+        self.offenses = frozenset(offenses) if offenses else None
+        self.precincts = frozenset(precincts) if precincts else None
+        self.neighborhoods = frozenset(neighborhoods) if neighborhoods else None
+        self.since = since
+        self.until = until
+        self.bbox = tuple(bbox) if bbox else None
+
+    def __bool__(self):
+        return any(criterion is not None for criterion in (
+            self.offenses, self.precincts, self.neighborhoods, self.since, self.until, self.bbox))
+
+    __nonzero__ = __bool__
+
+    def project_bbox(self, transformation):
+        """Project ``self.bbox`` with ``transformation``, from WGS84 to a projected system.
+
+        The edges of the bounding box are generally curves once projected. Returns two
+        (min_x, min_y, max_x, max_y) envelopes: an outer one that every point in the bounding box
+        is inside, and an inner one, which may be empty, that only holds points in the bounding
+        box. Points between the two need to be transformed back to WGS84 to tell.
+        """
+        min_lng, min_lat, max_lng, max_lat = self.bbox
+        steps = [i / (BBOX_EDGE_POINTS - 1.0) for i in range(BBOX_EDGE_POINTS)]
+        edges = {
+            'west': [(min_lng, min_lat + (max_lat - min_lat) * step) for step in steps],
+            'east': [(max_lng, min_lat + (max_lat - min_lat) * step) for step in steps],
+            'south': [(min_lng + (max_lng - min_lng) * step, min_lat) for step in steps],
+            'north': [(min_lng + (max_lng - min_lng) * step, max_lat) for step in steps]
+        }
+        projected = dict((edge, [(coord[0], coord[1]) for coord in transformation.TransformPoints(points)])
+                         for edge, points in edges.items())
+
+        xs = [x for points in projected.values() for x, _ in points]
+        ys = [y for points in projected.values() for _, y in points]
+        outer = (min(xs) - BBOX_MARGIN, min(ys) - BBOX_MARGIN,
+                 max(xs) + BBOX_MARGIN, max(ys) + BBOX_MARGIN)
+        inner = (max(x for x, _ in projected['west']) + BBOX_MARGIN,
+                 max(y for _, y in projected['south']) + BBOX_MARGIN,
+                 min(x for x, _ in projected['east']) - BBOX_MARGIN,
+                 min(y for _, y in projected['north']) - BBOX_MARGIN)
+        return outer, inner
+
+    def contains(self, lng, lat):
+        """Return True if the WGS84 point (``lng``, ``lat``) is in ``self.bbox``."""
+        min_lng, min_lat, max_lng, max_lat = self.bbox
+        return min_lng <= lng <= max_lng and min_lat <= lat <= max_lat
@@ -1,21 +1,77 @@
 #!/usr/bin/env python
 # encoding: utf-8
+import collections
 import csv
 import logging
-import datetime
+import time
 
-import geojson
-import ogr
+from crimetools.binary import BinaryWriter
+from crimetools.metrics import Metrics
+from crimetools.sort import (DEFAULT_BUFFER_SIZE, GEOGRAPHIC_BOUNDS, PROJECTED_BOUNDS, CurveKey,
+                             ExternalSorter, time_key)
+from crimetools.converters.dates import ReportDateParser
+from crimetools.converters.features import FeatureSerializer
+from crimetools.converters.store import RecordStore
 
 
 log = logging.getLogger(__name__)
 
+# State Plane Coordinate System (Oregon North - EPSG:2269, alt: EPSG:2913).
+NAD83_EPSG = 2269
+
+# Latitude/longitude (WGS84 - EPSG:4326)
+WGS84_EPSG = 4326
+
+# The number of rows whose coordinates are transformed together in a single call to GDAL.
+DEFAULT_CHUNK_SIZE = 1000
+
+# The engines coordinates can be transformed with: GDAL, or the NumPy implementation in
+# `crimetools.converters.projection`, which doesn't need GDAL.
+ENGINES = ('gdal', 'numpy')
+DEFAULT_ENGINE = 'gdal'
+
+# Coordinate transformations created in this process, by source and target EPSG code and engine.
+_transformations = {}
+
+
+# A converted crime report, with WGS84 coordinates and a parsed report time.
+Crime = collections.namedtuple('Crime', ['record_id', 'lng', 'lat', 'report_time', 'offense',
+                                         'address', 'neighborhood', 'precinct', 'district'])
+
 
 class ConversionError(Exception):
     """An error occurred trying to convert a row."""
     pass
 
 
+def get_transformation(source_epsg, target_epsg, engine=DEFAULT_ENGINE):
+    """Return a transformation from ``source_epsg`` to ``target_epsg`` using ``engine``.
+
+    The engine is imported and each transformation is created the first time it is needed, then
+    reused for the life of the process.
+    """
+    transformation = _transformations.get((source_epsg, target_epsg, engine))
+    if transformation is None and engine == 'numpy':
+        from crimetools.converters import projection
+
+        transformation = projection.Transformation(source_epsg, target_epsg)
+        _transformations[(source_epsg, target_epsg, engine)] = transformation
+    elif transformation is None:
+        if engine != 'gdal':
+            raise ValueError('Unknown projection engine: {}'.format(engine))
+        import ogr
+
+        source = ogr.osr.SpatialReference()
+        source.ImportFromEPSG(source_epsg)
+
+        target = ogr.osr.SpatialReference()
+        target.ImportFromEPSG(target_epsg)
+
+        transformation = ogr.osr.CoordinateTransformation(source, target)
+        _transformations[(source_epsg, target_epsg, engine)] = transformation
+    return transformation
+
+
 class Portland(object):
     """Convert crime data from the City of Portland data to GeoJSON.
 
@@ -27,44 +83,196 @@ class Portland(object):
         "Y Coordinate"
 
     The intended public interface of this class is its `to_csv` and `to_geojson` methods, which
-    each return the original data restructured into either output format.
+    each return the original data restructured into either output format. For large inputs, the
+    `write_geojson` and `write_geojson_lines` methods stream features to a file one at a time
+    instead of building the whole FeatureCollection in memory, and `write_binary` writes a
+    memory-mappable binary file.
 
     In the case of `to_csv` this can be used with the ``normalize_to_wgs84`` option to the
     constructor to normalize the coordinate data in the original CSV file and retain the same CSV
     format, but with WGS84 coordinates.
+
+    Coordinates are transformed in chunks of ``chunk_size`` rows, each chunk in a single call to
+    GDAL. Larger chunks are faster but hold more rows in memory at once.
+
+    If a `TransformCache` is given as ``transform_cache``, points are looked up in it first and
+    only points that have not been seen before are transformed by GDAL.
+
+    ``rows`` may also be a `RecordStore`, a compact columnar alternative to a list of rows for
+    data that has to stay in memory.
+
+    Serialized GeoJSON is written by a `FeatureSerializer`. Coordinates are written in full unless
+    ``precision`` is given, in which case they are rounded to that many decimal places.
+
+    Time spent in each stage of the conversion and the reasons rows are skipped are collected in
+    ``metrics``, a `Metrics` object. Rows are only timed one at a time if its ``timing`` is on.
+    Skipped rows are only logged at the debug level.
+
+    Coordinates are transformed with GDAL, or with NumPy if ``engine`` is "numpy". The
+    transformation is shared by every converter in the process, and the engine isn't imported
+    until coordinates are first transformed.
+
+    If a `RowFilter` is given as ``row_filter``, only the rows that match it are converted; see
+    `filter_rows`.
+
+    CSV and GeoJSON output is written in input order, unless ``sort`` is "hilbert" or "zorder", in
+    which case it is sorted along that space-filling curve, and then by report time if
+    ``sort_by_time`` is True. Up to ``sort_buffer_size`` rows are held in memory at once; see
+    `sorted_values`.
     """
-    def __init__(self, rows, column_labels=None, normalize_to_wgs84=False):
-        if not column_labels:
-            self.column_labels = rows.pop(0)
+    def __init__(self, rows, column_labels=None, normalize_to_wgs84=False,
+                 chunk_size=DEFAULT_CHUNK_SIZE, date_parser=None, transform_cache=None,
+                 metrics=None, precision=None, engine=DEFAULT_ENGINE, row_filter=None, sort=None,
+                 sort_by_time=False, sort_buffer_size=DEFAULT_BUFFER_SIZE):
+        if isinstance(rows, RecordStore) and not column_labels:
+            column_labels = rows.column_labels
 
-        self._rows = rows
-        self.original_row_count = len(self._rows)
+        rows = iter(rows)
+        self.chunk_size = max(1, chunk_size)
 
+        if not column_labels:
+            column_labels = next(rows, [])
+
+        self.column_labels = column_labels
+        self.column_indexes = dict((label, i) for i, label in enumerate(column_labels))
+        self.date_parser = date_parser or ReportDateParser()
+        self.transform_cache = transform_cache
+        self.metrics = metrics or Metrics()
+        self.serializer = FeatureSerializer(precision)
+        self.original_row_count = 0
+        self.filtered = 0
+        self.row_filter = row_filter
+        self._rows = self.count_rows(rows)
+        if row_filter:
+            self._rows = self.filter_rows(self._rows)
+
+        self.normalize_to_wgs84 = normalize_to_wgs84
         if normalize_to_wgs84:
             self.rows = self.wgs84_rows()
         else:
             self.rows = self._rows
 
-         # State Plane Coordinate System (Oregon North - EPSG:2269, alt: EPSG:2913).
-        nad83 = ogr.osr.SpatialReference()
-        nad83.ImportFromEPSG(2269)
+        self.sort = sort
+        self.sort_by_time = sort_by_time
+        self.sort_buffer_size = sort_buffer_size
+        self.engine = engine
+        self._transformation = None
+
+    @property
+    def transformation(self):
+        if self._transformation is None:
+            self._transformation = get_transformation(NAD83_EPSG, WGS84_EPSG, self.engine)
+        return self._transformation
+
+    @transformation.setter
+    def transformation(self, transformation):
+        self._transformation = transformation
+
+    def count_rows(self, rows):
+        """Yield each row in ``rows``, counting them in ``self.original_row_count``.
+
+        Rows are counted as they are consumed, so the count is only complete once the rows have
+        been fully iterated. This lets the converter stream rows from a file without loading them
+        all into memory.
+        """
+        rows = iter(rows)
+        if not self.metrics.timing:
+            for row in rows:
+                self.original_row_count += 1
+                yield row
+            return
+
+        add_time = self.metrics.add_time
+        while True:
+            start = time.perf_counter()
+            row = next(rows, None)
+            if row is None:
+                add_time('read', time.perf_counter() - start, 0)
+                return
+            add_time('read', time.perf_counter() - start)
+            self.original_row_count += 1
+            yield row
+
+    def filter_rows(self, rows):
+        """Yield each row in ``rows`` that matches ``self.row_filter``.
 
-        # Latitude/longitude (WGS84 - EPSG:4326)
-        wgs84 = ogr.osr.SpatialReference()
-        wgs84.ImportFromEPSG(4326)
+        Criteria are checked from cheapest to dearest, so a row is rejected as early as possible:
+        first the offense type, precinct and neighborhood, then the report date, then the
+        coordinates. The bounding box is projected into the State Plane system up front, so most
+        rows are placed inside or outside it without transforming their coordinates. Only rows
+        near its edges are transformed to check them exactly.
+
+        Rows that don't match are counted in ``self.filtered`` and the "filtered" metrics counter
+        rather than ``self.original_row_count``, so they aren't counted as skipped. Rows with a
+        bad date or bad coordinates are passed through, to be skipped later as bad data.
+        """
+        row_filter = self.row_filter
+        columns = [(self.column_indexes[label], values) for label, values in (
+            ('Major Offense Type', row_filter.offenses),
+            ('Police Precinct', row_filter.precincts),
+            ('Neighborhood', row_filter.neighborhoods)) if values]
+        since, until = row_filter.since, row_filter.until
+        has_dates = since is not None or until is not None
+        date_index = self.column_indexes['Report Date']
+        time_index = self.column_indexes['Report Time']
+        x_index = self.column_indexes['X Coordinate']
+        y_index = self.column_indexes['Y Coordinate']
+
+        outer = inner = None
+        if row_filter.bbox:
+            outer, inner = row_filter.project_bbox(
+                get_transformation(WGS84_EPSG, NAD83_EPSG, self.engine))
+
+        timing = self.metrics.timing
+        add_time = self.metrics.add_time
+        for row in rows:
+            if timing:
+                start = time.perf_counter()
+            matches = self._matches(row, columns, has_dates, since, until, date_index, time_index,
+                                    outer, inner, x_index, y_index)
+            if timing:
+                add_time('filter', time.perf_counter() - start)
+            if matches:
+                yield row
+            else:
+                self.original_row_count -= 1
+                self.filtered += 1
+                self.metrics.count('filtered')
+
+    def _matches(self, row, columns, has_dates, since, until, date_index, time_index, outer, inner,
+                 x_index, y_index):
+        for index, values in columns:
+            if row[index] not in values:
+                return False
+
+        if has_dates:
+            try:
+                date = self.date_parser.parse(row[date_index], row[time_index])
+            except ValueError:
+                return True
+            if since is not None and date < since or until is not None and date > until:
+                return False
 
-        self.transformation = ogr.osr.CoordinateTransformation(nad83, wgs84)
+        if outer is not None:
+            try:
+                x = float(row[x_index])
+                y = float(row[y_index])
+            except (ValueError, TypeError):
+                return True
+            if not (outer[0] <= x <= outer[2] and outer[1] <= y <= outer[3]):
+                return False
+            if not (inner[0] <= x <= inner[2] and inner[1] <= y <= inner[3]):
+                lng, lat = self.transform_points([(x, y)])[0]
+                return self.row_filter.contains(lng, lat)
+
+        return True
 
     def wgs84_rows(self):
         """Normalize all X and Y coordinates to WGS84 (latitude and longitude)
 
         Replaces ``self.rows`` with a generator that yields a row with WGS84 coordinates.
         """
-        for row in self._rows:
-            try:
-                x, y = self.get_wgs84_point(row)
-            except ConversionError:
-                continue
+        for row, (x, y) in self.wgs84_points(self._rows):
             self.set_csv_column(row, 'X Coordinate', x)
             self.set_csv_column(row, 'Y Coordinate', y)
             yield row
@@ -75,7 +283,7 @@ class Portland(object):
         E.g.:
             get(row, 'Record ID')
         """
-        return row[self.column_labels.index(header)]
+        return row[self.column_indexes[header]]
 
     def set_csv_column(self, row, header, value):
         """A helper to set a CSV column index by its name.
@@ -83,10 +291,21 @@ class Portland(object):
         E.g.:
             set(row, 'Record ID', 1)
         """
-        row[self.column_labels.index(header)] = value
-
-    def get_wgs84_point(self, row):
-        """Transform coordinates in ``row`` to the WGS84 system.
+        row[self.column_indexes[header]] = value
+
+    def chunks(self, rows):
+        """Yield lists of up to ``self.chunk_size`` rows from ``rows``."""
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= self.chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def get_point(self, row):
+        """Parse the original X and Y coordinates in ``row`` as floats.
 
         Raises ConversionError.
         """
@@ -94,10 +313,72 @@ class Portland(object):
             x = float(self.get_csv_column(row, 'X Coordinate'))
             y = float(self.get_csv_column(row, 'Y Coordinate'))
         except (ValueError, TypeError):
-            log.error('Bad coordinates for row: {}'.format(row))
+            self.metrics.skip('bad_coordinates', row)
+            log.debug('Bad coordinates for row: %s', row)
             raise ConversionError
+        return x, y
+
+    def transform_points(self, points):
+        """Transform a list of (x, y) points to the WGS84 system in a single call.
+
+        Returns a list of (lng, lat) tuples in the same order as ``points``.
+        """
+        if not points:
+            return []
+
+        with self.metrics.timer('transform', len(points)):
+            return self._transform_points(points)
+
+    def _transform_points(self, points):
+        cache = self.transform_cache
+        if cache is None:
+            return [(coord[0], coord[1]) for coord in self.transformation.TransformPoints(points)]
+
+        results = [cache.get(point) for point in points]
+        missing = [i for i, result in enumerate(results) if result is None]
+
+        if missing:
+            coords = self.transformation.TransformPoints([points[i] for i in missing])
+            for i, coord in zip(missing, coords):
+                results[i] = (coord[0], coord[1])
+                cache.set(points[i], results[i])
+
+        return results
+
+    def wgs84_points(self, rows):
+        """Yield a (row, (lng, lat)) tuple for each row in ``rows`` with valid coordinates.
+
+        Rows are read in chunks of ``self.chunk_size`` and the coordinates of each chunk are
+        transformed together. Rows with bad coordinates are skipped.
+        """
+        for chunk in self.chunks(rows):
+            valid_rows = []
+            points = []
+            for row in chunk:
+                try:
+                    points.append(self.get_point(row))
+                except ConversionError:
+                    continue
+                valid_rows.append(row)
+
+            for row, point in zip(valid_rows, self.transform_points(points)):
+                yield row, point
+
+    def get_wgs84_point(self, row):
+        """Transform coordinates in ``row`` to the WGS84 system.
+
+        Raises ConversionError.
+        """
+        point = self.get_point(row)
+
+        if self.transform_cache is not None:
+            return self.transform_points([point])[0]
 
-        coord = self.transformation.TransformPoint(x, y)
+        if self.metrics.timing:
+            with self.metrics.timer('transform'):
+                coord = self.transformation.TransformPoint(*point)
+        else:
+            coord = self.transformation.TransformPoint(*point)
 
         lng = coord[0]
         lat = coord[1]
@@ -108,19 +389,34 @@ class Portland(object):
 
         Raises ConversionError.
         """
-        date_string = '{} {}'.format(self.get_csv_column(row, 'Report Date'),
-                                     self.get_csv_column(row, 'Report Time'))
+        if not self.metrics.timing:
+            return self._parse_date(row)
+
+        start = time.perf_counter()
+        try:
+            return self._parse_date(row)
+        finally:
+            self.metrics.add_time('parse_date', time.perf_counter() - start)
 
+    def _parse_date(self, row):
         try:
-            date = datetime.datetime.strptime(date_string, '%m/%d/%Y %H:%M:%S')
+            return self.date_parser.parse(self.get_csv_column(row, 'Report Date'),
+                                          self.get_csv_column(row, 'Report Time'))
         except ValueError:
-            log.error('Could not parse date for row: {}'.format(row))
+            self.metrics.skip('bad_date', row)
+            log.debug('Could not parse date for row: %s', row)
             raise ConversionError
-        return date
 
-    def to_geojson_feature(self, row):
-        """Convert a row of CSV data into a GeoJSON Feature"""
-        point = geojson.Point(self.get_wgs84_point(row))
+    def to_geojson_feature(self, row, point=None):
+        """Convert a row of CSV data into a GeoJSON Feature
+
+        If ``point`` is given it is used as the row's already-transformed (lng, lat) coordinates.
+        """
+        import geojson
+
+        if point is None:
+            point = self.get_wgs84_point(row)
+        point = geojson.Point(point)
         date = self.parse_date(row)
         feature = geojson.Feature(geometry=point,
                                   id=int(self.get_csv_column(row, 'Record ID')),
@@ -134,16 +430,140 @@ class Portland(object):
                                   })
         return feature
 
-    def to_geojson_feature_collection(self):
-        """Convert a list of rows of CSV crime data to GeoJSON FeatureCollection"""
-        features = []
+    def to_crime(self, row, point=None):
+        """Convert a row of CSV data into a `Crime` record.
+
+        If ``point`` is given it is used as the row's already-transformed (lng, lat) coordinates.
+
+        Raises ConversionError.
+        """
+        if point is None:
+            point = self.get_wgs84_point(row)
+        date = self.parse_date(row)
+
+        try:
+            record_id = int(self.get_csv_column(row, 'Record ID'))
+            district = int(self.get_csv_column(row, 'Police District'))
+        except (ValueError, TypeError):
+            self.metrics.skip('bad_record_id_or_district', row)
+            log.debug('Bad record ID or police district for row: %s', row)
+            raise ConversionError
+
+        return Crime(record_id=record_id,
+                     lng=point[0],
+                     lat=point[1],
+                     report_time=date,
+                     offense=self.get_csv_column(row, 'Major Offense Type'),
+                     address=self.get_csv_column(row, 'Address'),
+                     neighborhood=self.get_csv_column(row, 'Neighborhood'),
+                     precinct=self.get_csv_column(row, 'Police Precinct'),
+                     district=district)
+
+    def crimes(self):
+        """Yield a `Crime` record for each valid row, skipping rows that fail to convert."""
+        for row, point in self.wgs84_points(self.rows):
+            try:
+                yield self.to_crime(row, point)
+            except ConversionError:
+                continue
 
-        for row in self.rows:
+    def geojson_features(self):
+        """Yield a GeoJSON Feature for each valid row, skipping rows that fail to convert."""
+        for row, point in self.wgs84_points(self.rows):
             try:
-                features.append(self.to_geojson_feature(row))
+                yield self.to_geojson_feature(row, point)
             except ConversionError:
                 continue
 
+    def serialized_geojson_features(self):
+        """Return an iterator of each valid row serialized as a GeoJSON Feature string.
+
+        Features are written directly from `Crime` records by ``self.serializer``, without building
+        `geojson.Feature` objects. They are in input order unless ``self.sort`` is set.
+        """
+        features = self._serialized_geojson_features()
+        if self.sort:
+            return self.sorted_values(features, GEOGRAPHIC_BOUNDS)
+        return (feature for _, _, _, feature in features)
+
+    def _serialized_geojson_features(self):
+        serialize = self.serializer.serialize
+        if not self.metrics.timing:
+            for crime in self.crimes():
+                yield crime.lng, crime.lat, crime.report_time, serialize(crime)
+            return
+
+        add_time = self.metrics.add_time
+        for crime in self.crimes():
+            start = time.perf_counter()
+            serialized = serialize(crime)
+            add_time('serialize', time.perf_counter() - start)
+            yield crime.lng, crime.lat, crime.report_time, serialized
+
+    def sortable_rows(self, rows):
+        """Yield an (x, y, report_time, row) tuple for each row in ``rows``, for `sorted_values`.
+
+        The coordinates are NaN if they are bad, and the report time is only parsed if
+        ``self.sort_by_time`` is True and otherwise None.
+        """
+        for row in rows:
+            try:
+                x = float(self.get_csv_column(row, 'X Coordinate'))
+                y = float(self.get_csv_column(row, 'Y Coordinate'))
+            except (ValueError, TypeError):
+                x = y = float('nan')
+            report_time = None
+            if self.sort_by_time:
+                try:
+                    report_time = self.date_parser.parse(self.get_csv_column(row, 'Report Date'),
+                                                         self.get_csv_column(row, 'Report Time'))
+                except ValueError:
+                    pass
+            yield x, y, report_time, row
+
+    def sorted_values(self, items, bounds):
+        """Yield the values in ``items``, a sequence of (x, y, report_time, value) tuples, in
+        order along the ``self.sort`` space-filling curve over a grid covering ``bounds``, then by
+        report time if ``self.sort_by_time`` is True.
+
+        The values are sorted by an `ExternalSorter`, so no more than ``self.sort_buffer_size`` of
+        them are held in memory at once. Values without valid coordinates or report time come last.
+        """
+        curve_key = CurveKey(self.sort, bounds)
+        sorter = ExternalSorter(self.sort_buffer_size)
+        timing = self.metrics.timing
+        add_time = self.metrics.add_time
+        for x, y, report_time, value in items:
+            if timing:
+                start = time.perf_counter()
+            key = curve_key(x, y)
+            if self.sort_by_time:
+                key = (key, time_key(report_time))
+            sorter.add(key, value)
+            if timing:
+                add_time('sort', time.perf_counter() - start)
+
+        values = iter(sorter)
+        if not timing:
+            for value in values:
+                yield value
+            return
+
+        while True:
+            start = time.perf_counter()
+            value = next(values, None)
+            if value is None:
+                add_time('sort', time.perf_counter() - start, 0)
+                return
+            add_time('sort', time.perf_counter() - start, 0)
+            yield value
+
+    def to_geojson_feature_collection(self):
+        """Convert a list of rows of CSV crime data to GeoJSON FeatureCollection"""
+        import geojson
+
+        features = list(self.geojson_features())
+
         if not features:
             log.error("No valid Features found in data")
 
@@ -152,18 +572,108 @@ class Portland(object):
 
     def to_geojson(self):
         """Convert rows of CSV crime data into a serialized GeoJSON FeatureCollection"""
-        collection = self.to_geojson_feature_collection()
-        total = len(collection['features'])
+        features = list(self.serialized_geojson_features())
+
+        if not features:
+            log.error("No valid Features found in data")
+
+        total = len(features)
+        skipped = self.original_row_count - total
+        return '{"features": [' + ', '.join(features) + '], "type": "FeatureCollection"}', total, skipped
+
+    def write_geojson(self, file):
+        """Stream rows of CSV crime data into ``file`` as a serialized GeoJSON FeatureCollection.
+
+        Features are converted and written one at a time, so memory use stays flat regardless of
+        the size of the input. The output is identical to the string returned by `to_geojson`.
+
+        Returns the number of features written and the number of rows skipped.
+        """
+        total = 0
+        timing = self.metrics.timing
+        add_time = self.metrics.add_time
+        file.write('{"features": [')
+        for feature in self.serialized_geojson_features():
+            if timing:
+                start = time.perf_counter()
+            if total:
+                file.write(', ')
+            file.write(feature)
+            if timing:
+                add_time('write', time.perf_counter() - start)
+            total += 1
+        file.write('], "type": "FeatureCollection"}')
+        if total == 0:
+            log.error("No valid Features found in data")
+        skipped = self.original_row_count - total
+        return total, skipped
+
+    def write_geojson_lines(self, file):
+        """Stream rows of CSV crime data into ``file`` as newline-delimited GeoJSON Features.
+
+        Returns the number of features written and the number of rows skipped.
+        """
+        total = 0
+        timing = self.metrics.timing
+        add_time = self.metrics.add_time
+        for feature in self.serialized_geojson_features():
+            if timing:
+                start = time.perf_counter()
+            file.write(feature)
+            file.write('\n')
+            if timing:
+                add_time('write', time.perf_counter() - start)
+            total += 1
+        if total == 0:
+            log.error("No valid Features found in data")
         skipped = self.original_row_count - total
-        return geojson.dumps(collection, sort_keys=True), total, skipped
+        return total, skipped
+
+    def write_binary(self, file):
+        """Stream rows of CSV crime data into ``file``, opened for writing in binary mode, in the
+        memory-mappable format read by `crimetools.binary.CrimeDataset`.
 
-    def to_csv(self, file, **csv_options):
-        """Convert rows of crime data into a CSV with WGS84 coordinates."""
+        Returns the number of records written and the number of rows skipped.
+        """
+        writer = BinaryWriter(file)
+        timing = self.metrics.timing
+        add_time = self.metrics.add_time
+        for crime in self.crimes():
+            if timing:
+                start = time.perf_counter()
+            writer.add(crime)
+            if timing:
+                add_time('write', time.perf_counter() - start)
+        with self.metrics.timer('write', 0):
+            writer.close()
+
+        total = writer.count
+        if total == 0:
+            log.error("No valid rows found in file")
+        skipped = self.original_row_count - total
+        return total, skipped
+
+    def to_csv(self, file, write_header=True, **csv_options):
+        """Convert rows of crime data into a CSV with WGS84 coordinates.
+
+        The column labels are written as the first row unless ``write_header`` is False.
+        """
         total = 0
         writer = csv.writer(file, **csv_options)
-        writer.writerow(self.column_labels)
-        for row in self.rows:
+        if write_header:
+            writer.writerow(self.column_labels)
+        timing = self.metrics.timing
+        add_time = self.metrics.add_time
+        rows = self.rows
+        if self.sort:
+            rows = self.sorted_values(self.sortable_rows(rows),
+                                      GEOGRAPHIC_BOUNDS if self.normalize_to_wgs84 else PROJECTED_BOUNDS)
+        for row in rows:
+            if timing:
+                start = time.perf_counter()
             writer.writerow(row)
+            if timing:
+                add_time('write', time.perf_counter() - start)
             total += 1
         if total == 0:
             log.error("No valid rows found in file")
@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""A vectorized NumPy implementation of the one projection the Portland data needs, so that
+coordinates can be transformed without GDAL.
+
+EPSG:2269, NAD83 / Oregon North (ft), is a Lambert Conformal Conic projection with two standard
+parallels on the GRS80 ellipsoid, in international feet. NAD83 and WGS84 are treated as the same
+datum, as GDAL does without a datum grid, so converting to EPSG:4326 only inverts the projection.
+The formulas are from Snyder, "Map Projections: A Working Manual" (1987), pp. 107-109.
+"""
+import math
+
+
+# The GRS80 ellipsoid.
+GRS80_SEMI_MAJOR_AXIS = 6378137.0
+GRS80_INVERSE_FLATTENING = 298.257222101
+
+# The length of an international foot in metres.
+INTERNATIONAL_FOOT = 0.3048
+
+# The latitude is found by iteration; stop once it changes by less than this many radians.
+LATITUDE_TOLERANCE = 1e-12
+MAX_ITERATIONS = 15
+
+
+class LambertConformalConic(object):
+    """A Lambert Conformal Conic projection with two standard parallels.
+
+    Angles are given in degrees, and the false easting and northing in metres. Projected
+    coordinates are in units of ``unit`` metres. `forward` and `inverse` take and return NumPy
+    arrays, or anything NumPy can turn into one, and work on every point at once.
+    """
+    def __init__(self, lat_1, lat_2, lat_0, lon_0, x_0=0.0, y_0=0.0, unit=1.0,
+                 a=GRS80_SEMI_MAJOR_AXIS, inverse_flattening=GRS80_INVERSE_FLATTENING):
+        f = 1 / inverse_flattening
+        self.a = a
+        self.e = math.sqrt(2 * f - f * f)
+        self.lon_0 = math.radians(lon_0)
+        self.x_0 = x_0
+        self.y_0 = y_0
+        self.unit = unit
+
+        phi_1, phi_2, phi_0 = math.radians(lat_1), math.radians(lat_2), math.radians(lat_0)
+        m_1, m_2 = self._m(phi_1), self._m(phi_2)
+        t_1, t_2, t_0 = self._t(phi_1), self._t(phi_2), self._t(phi_0)
+        if phi_1 == phi_2:
+            self.n = math.sin(phi_1)
+        else:
+            self.n = (math.log(m_1) - math.log(m_2)) / (math.log(t_1) - math.log(t_2))
+        self.af = a * m_1 / (self.n * t_1 ** self.n)
+        self.rho_0 = self.af * t_0 ** self.n
+
+    def _m(self, phi):
+        return math.cos(phi) / math.sqrt(1 - (self.e * math.sin(phi)) ** 2)
+
+    def _t(self, phi):
+        e_sin = self.e * math.sin(phi)
+        return math.tan(math.pi / 4 - phi / 2) / ((1 - e_sin) / (1 + e_sin)) ** (self.e / 2)
+
+    def forward(self, lng, lat):
+        """Project arrays of longitudes and latitudes, in degrees, to arrays of x and y."""
+        import numpy
+
+        phi = numpy.radians(numpy.asarray(lat, dtype=numpy.float64))
+        e_sin = self.e * numpy.sin(phi)
+        t = numpy.tan(numpy.pi / 4 - phi / 2) / ((1 - e_sin) / (1 + e_sin)) ** (self.e / 2)
+        rho = self.af * t ** self.n
+        theta = self.n * (numpy.radians(numpy.asarray(lng, dtype=numpy.float64)) - self.lon_0)
+
+        x = (self.x_0 + rho * numpy.sin(theta)) / self.unit
+        y = (self.y_0 + self.rho_0 - rho * numpy.cos(theta)) / self.unit
+        return x, y
+
+    def inverse(self, x, y):
+        """Unproject arrays of x and y to arrays of longitudes and latitudes, in degrees."""
+        import numpy
+
+        x = numpy.asarray(x, dtype=numpy.float64) * self.unit - self.x_0
+        y = self.rho_0 - (numpy.asarray(y, dtype=numpy.float64) * self.unit - self.y_0)
+        sign = math.copysign(1.0, self.n)
+        rho = sign * numpy.hypot(x, y)
+        t = (rho / self.af) ** (1 / self.n)
+        theta = numpy.arctan2(sign * x, sign * y)
+
+        half_e = self.e / 2
+        phi = numpy.pi / 2 - 2 * numpy.arctan(t)
+        for _ in range(MAX_ITERATIONS):
+            e_sin = self.e * numpy.sin(phi)
+            next_phi = numpy.pi / 2 - 2 * numpy.arctan(t * ((1 - e_sin) / (1 + e_sin)) ** half_e)
+            converged = not numpy.any(numpy.abs(next_phi - phi) > LATITUDE_TOLERANCE)
+            phi = next_phi
+            if converged:
+                break
+
+        return numpy.degrees(theta / self.n + self.lon_0), numpy.degrees(phi)
+
+
+# EPSG:2269, NAD83 / Oregon North (ft).
+OREGON_NORTH = LambertConformalConic(lat_1=46.0, lat_2=44.33333333333334, lat_0=43.66666666666666,
+                                     lon_0=-120.5, x_0=2500000.0001424, y_0=0.0,
+                                     unit=INTERNATIONAL_FOOT)
+
+# The projections this module implements, by EPSG code.
+PROJECTIONS = {
+    2269: OREGON_NORTH
+}
+
+GEOGRAPHIC_EPSG = 4326
+
+
+class Transformation(object):
+    """Transform points between a projection in `PROJECTIONS` and WGS84 longitude and latitude,
+    with the same interface as the parts of a GDAL ``CoordinateTransformation`` the converters use.
+
+    Points are (x, y) or (x, y, z) tuples and are returned as (x, y, z) tuples; z is passed through
+    unchanged.
+    """
+    def __init__(self, source_epsg, target_epsg):
+        import numpy  # noqa
+
+        if source_epsg in PROJECTIONS and target_epsg == GEOGRAPHIC_EPSG:
+            self._transform = PROJECTIONS[source_epsg].inverse
+        elif source_epsg == GEOGRAPHIC_EPSG and target_epsg in PROJECTIONS:
+            self._transform = PROJECTIONS[target_epsg].forward
+        else:
+            raise ValueError('No NumPy transformation from EPSG:{} to EPSG:{}'.format(source_epsg, target_epsg))
+
+    def TransformPoints(self, points):
+        if not len(points):
+            return []
+        xs = [point[0] for point in points]
+        ys = [point[1] for point in points]
+        zs = [point[2] if len(point) > 2 else 0.0 for point in points]
+        xs, ys = self._transform(xs, ys)
+        return list(zip(xs.tolist(), ys.tolist(), zs))
+
+    def TransformPoint(self, x, y, z=0.0):
+        return self.TransformPoints([(x, y, z)])[0]
@@ -0,0 +1,171 @@
+#!/usr/bin/env python
+# encoding: utf-8
+import array
+import sys
+
+
+# Columns of the Portland data stored as typed arrays.
+FLOAT_COLUMNS = ('X Coordinate', 'Y Coordinate')
+INT_COLUMNS = ('Record ID', 'Police District')
+
+# Repetitive columns stored as integer codes into a table of their distinct values.
+ENCODED_COLUMNS = ('Report Date', 'Report Time', 'Major Offense Type', 'Neighborhood',
+                   'Police Precinct')
+
+
+class RecordStore(object):
+    """A compact, column-oriented store of rows of CSV crime data.
+
+    Instead of keeping each row as a list of strings, the store keeps one column per CSV column:
+
+        - Coordinates are kept in arrays of floats and record IDs and police districts in arrays
+          of integers.
+        - Repetitive columns like "Neighborhood" and "Major Offense Type" are dictionary-encoded:
+          each value is stored once and rows keep an integer code into the table of values.
+        - Any other column is kept as a list of interned strings.
+
+    Column positions are resolved once from the column labels. Values that can't be stored in a
+    typed column without changing them, e.g. an X coordinate of "Bad X Coordinate" or a record ID
+    of "007", are kept as-is on the side, so rows read back out of the store are always identical
+    to the rows that were put in.
+
+    A store can be passed to the `Portland` converter in place of a list of rows:
+
+        store = RecordStore.from_rows(csv.reader(f))
+        Portland(store).to_geojson()
+    """
+    def __init__(self, column_labels):
+        self.column_labels = list(column_labels)
+        self.column_indexes = dict((label, i) for i, label in enumerate(self.column_labels))
+        self._length = 0
+        self._columns = []
+        self._dictionaries = {}
+
+        # Original values that don't survive a round trip through their typed column, keyed by
+        # (row index, column index), and rows that don't have one value for each column.
+        self._exceptions = {}
+        self._irregular_rows = {}
+
+        for label in self.column_labels:
+            if label in FLOAT_COLUMNS:
+                self._columns.append(array.array('d'))
+            elif label in INT_COLUMNS:
+                self._columns.append(array.array('q'))
+            elif label in ENCODED_COLUMNS:
+                self._columns.append(array.array('I'))
+                self._dictionaries[label] = ([], {})
+            else:
+                self._columns.append([])
+
+    @classmethod
+    def from_rows(cls, rows, column_labels=None):
+        """Build a store from ``rows``. The first row is used as column labels if none are given."""
+        rows = iter(rows)
+        if not column_labels:
+            column_labels = next(rows, [])
+        store = cls(column_labels)
+        store.extend(rows)
+        return store
+
+    def __len__(self):
+        return self._length
+
+    def __iter__(self):
+        for index in range(self._length):
+            yield self[index]
+
+    def __getitem__(self, index):
+        """Return the row at ``index`` as a new list of its original values."""
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError('RecordStore index out of range')
+
+        if index in self._irregular_rows:
+            return list(self._irregular_rows[index])
+
+        return [self._get_value(index, column) for column in range(len(self.column_labels))]
+
+    def extend(self, rows):
+        """Append each row in ``rows`` to the store."""
+        for row in rows:
+            self.append(row)
+
+    def append(self, row):
+        """Append ``row`` to the store."""
+        index = self._length
+
+        if len(row) != len(self.column_labels):
+            self._irregular_rows[index] = list(row)
+            row = (list(row) + [''] * len(self.column_labels))[:len(self.column_labels)]
+
+        for column, value in enumerate(row):
+            self._set_value(index, column, value)
+
+        self._length += 1
+
+    def column(self, header):
+        """Return the column named ``header``.
+
+        Typed columns are returned as the underlying array: floats (NaN where a value is not a
+        number) or integers (0 where a value is not an integer). Other columns are returned as a
+        list of values.
+        """
+        column = self.column_indexes[header]
+        if header in self._dictionaries:
+            values, _ = self._dictionaries[header]
+            return [values[code] for code in self._columns[column]]
+        return self._columns[column]
+
+    def get(self, index, header):
+        """Return the original value of the column named ``header`` in the row at ``index``."""
+        return self[index][self.column_indexes[header]]
+
+    def _set_value(self, index, column, value):
+        label = self.column_labels[column]
+        values = self._columns[column]
+
+        if label in FLOAT_COLUMNS:
+            try:
+                typed = float(value)
+            except (ValueError, TypeError):
+                typed = float('nan')
+            values.append(typed)
+            if repr(typed) != value:
+                self._exceptions[(index, column)] = value
+        elif label in INT_COLUMNS:
+            try:
+                typed = int(value)
+                values.append(typed)
+            except (ValueError, TypeError, OverflowError):
+                typed = 0
+                values.append(typed)
+            if str(typed) != value:
+                self._exceptions[(index, column)] = value
+        elif label in self._dictionaries:
+            table, codes = self._dictionaries[label]
+            code = codes.get(value)
+            if code is None:
+                code = codes[value] = len(table)
+                table.append(value)
+            values.append(code)
+        else:
+            if isinstance(value, str):
+                value = sys.intern(value)
+            values.append(value)
+
+    def _get_value(self, index, column):
+        if (index, column) in self._exceptions:
+            return self._exceptions[(index, column)]
+
+        label = self.column_labels[column]
+        value = self._columns[column][index]
+
+        if label in FLOAT_COLUMNS:
+            return repr(value)
+        elif label in INT_COLUMNS:
+            return str(value)
+        elif label in self._dictionaries:
+            table, _ = self._dictionaries[label]
+            return table[value]
+        return value
@@ -0,0 +1,180 @@
+#!/usr/bin/env python
+# encoding: utf-8
+import array
+
+
+# Which copy of a duplicated record to keep.
+KEEP = ('first', 'last')
+
+# IdSet pages hold 2 ** PAGE_BITS integers each, in 2 ** PAGE_BITS / 8 bytes.
+PAGE_BITS = 16
+PAGE_MASK = 2 ** PAGE_BITS - 1
+
+# Stands in for rows without an integer record ID when scanning rows.
+NO_ID = -2 ** 63
+
+
+class IdSet(object):
+    """A set of integers stored as a bitmap.
+
+    The bitmap is split into pages of 2 ** `PAGE_BITS` integers that are only allocated once an
+    integer in their range is added. Record IDs are close together, so each takes about a bit.
+    """
+    def __init__(self):
+        self._pages = {}
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def __contains__(self, value):
+        page = self._pages.get(value >> PAGE_BITS)
+        if page is None:
+            return False
+        bit = value & PAGE_MASK
+        return bool(page[bit >> 3] & (1 << (bit & 7)))
+
+    def add(self, value):
+        """Add ``value`` to the set. Returns False if it was already in the set."""
+        key = value >> PAGE_BITS
+        page = self._pages.get(key)
+        if page is None:
+            page = self._pages[key] = bytearray(2 ** PAGE_BITS // 8)
+        bit = value & PAGE_MASK
+        mask = 1 << (bit & 7)
+        if page[bit >> 3] & mask:
+            return False
+        page[bit >> 3] |= mask
+        self._count += 1
+        return True
+
+
+class Bitmap(object):
+    """A dense bitmap of row positions, counted from zero.
+
+    Position ``i`` is stored in bit ``i + offset`` of ``data``, so that a byte-aligned `slice` of
+    a bitmap can be taken without shifting every bit.
+    """
+    def __init__(self, data=b'', offset=0):
+        self.data = bytearray(data)
+        self.offset = offset
+
+    def __contains__(self, position):
+        bit = position + self.offset
+        byte = bit >> 3
+        return byte < len(self.data) and bool(self.data[byte] & (1 << (bit & 7)))
+
+    def add(self, position):
+        bit = position + self.offset
+        byte = bit >> 3
+        if byte >= len(self.data):
+            self.data.extend(bytes(max(byte + 1 - len(self.data), len(self.data))))
+        self.data[byte] |= 1 << (bit & 7)
+
+    def slice(self, start, stop):
+        """Return the positions from ``start`` up to ``stop`` as a new bitmap, counted from
+        ``start``."""
+        first = (start + self.offset) >> 3
+        last = (stop + self.offset + 7) >> 3
+        return Bitmap(self.data[first:last], (start + self.offset) & 7)
+
+
+class Deduplicator(object):
+    """Drop rows of crime data with the same "Record ID" as another row, keeping the ``keep``
+    copy, "first" or "last".
+
+    The first copy of each record can be kept in a single pass over the rows, with `filter_rows`.
+    Record IDs seen so far are kept in an `IdSet`, rather than a set of strings.
+
+    Keeping the last copy takes two passes. `scan` reads the record IDs of every row into a compact
+    array. It then walks the array backwards to find the positions of the rows to drop, which
+    `filter_rows` drops on the second pass. The positions to drop can also be found with `scan`
+    when keeping the first copy, so that separate parts of the rows can be deduplicated
+    independently, e.g. in different processes, by passing each a `Bitmap.slice` as ``drops``.
+
+    The number of rows dropped is counted in ``duplicates``. Rows without an integer record ID are
+    never dropped.
+    """
+    def __init__(self, keep='first', drops=None):
+        if keep not in KEEP:
+            raise ValueError('Bad copy of duplicated records to keep: {}'.format(keep))
+        self.keep = keep
+        self.drops = drops
+        self.duplicates = 0
+
+    def scan(self, rows, column_label='Record ID'):
+        """Find the positions of the duplicate rows in ``rows``, whose first row is the column
+        labels, and save them in ``self.drops``.
+
+        Returns ``self.drops``, a `Bitmap`.
+        """
+        rows = iter(rows)
+        column_labels = next(rows, None)
+        self.drops = drops = Bitmap()
+        if column_labels is None:
+            return drops
+        index = column_labels.index(column_label)
+
+        seen = IdSet()
+        if self.keep == 'first':
+            for position, row in enumerate(rows):
+                record_id = _record_id(row, index)
+                if record_id is not None and not seen.add(record_id):
+                    drops.add(position)
+            return drops
+
+        ids = array.array('q')
+        for row in rows:
+            record_id = _record_id(row, index)
+            ids.append(NO_ID if record_id is None else record_id)
+        for position in range(len(ids) - 1, -1, -1):
+            record_id = ids[position]
+            if record_id != NO_ID and not seen.add(record_id):
+                drops.add(position)
+        return drops
+
+    def filter_rows(self, rows, column_label='Record ID'):
+        """Yield the column labels in ``rows`` and each row that is not a duplicate."""
+        rows = iter(rows)
+        column_labels = next(rows, None)
+        if column_labels is None:
+            return
+        yield column_labels
+
+        for row in self.filter(rows, column_labels.index(column_label)):
+            yield row
+
+    def filter(self, rows, index):
+        """Yield each row in ``rows``, which has no column labels, that is not a duplicate.
+
+        ``index`` is the index of the record ID in each row.
+        """
+        drops = self.drops
+        if drops is not None:
+            for position, row in enumerate(rows):
+                if position in drops:
+                    self.duplicates += 1
+                    continue
+                yield row
+            return
+
+        if self.keep != 'first':
+            raise ValueError('The rows must be scanned first to keep the last copy of each record')
+
+        seen = IdSet()
+        for row in rows:
+            record_id = _record_id(row, index)
+            if record_id is not None and not seen.add(record_id):
+                self.duplicates += 1
+                continue
+            yield row
+
+
+def _record_id(row, index):
+    try:
+        record_id = int(row[index])
+    except (ValueError, TypeError, IndexError):
+        return None
+    if record_id == NO_ID or not NO_ID < record_id < 2 ** 63:
+        return None
+    return record_id
@@ -0,0 +1,326 @@
+#!/usr/bin/env python
+# encoding: utf-8
+import array
+import bisect
+import csv
+import hashlib
+import json
+import os
+import shutil
+import struct
+import tempfile
+
+
+MANIFEST_MAGIC = b'CRIMEMF1'
+
+GEOJSON_PREFIX = '{"features": ['
+GEOJSON_SUFFIX = '], "type": "FeatureCollection"}'
+
+# The number of characters of a FeatureCollection read at a time when streaming its Features.
+READ_SIZE = 1024 * 1024
+
+
+def row_hash(row):
+    """Return a 64-bit hash of the values in ``row``."""
+    content = '\x1f'.join(str(value) for value in row).encode('utf8')
+    return struct.unpack('<q', hashlib.blake2b(content, digest_size=8).digest())[0]
+
+
+class Manifest(object):
+    """A compact record of the rows of crime data that have already been converted.
+
+    The manifest maps each "Record ID" to a hash of the row's content, so rows that are new or
+    have changed since the last run can be told apart from rows that were already converted.
+    Record IDs and hashes are kept in two sorted arrays of 64-bit integers, in memory and in the
+    file ``filename``. Rows seen during a run are added to the manifest when it is saved, once
+    they have been converted; rows that fail to convert are looked at again in the next run.
+    """
+    def __init__(self, filename):
+        self.filename = filename
+        self.unchanged = 0
+        self.changed_ids = set()
+
+        self._ids = array.array('q')
+        self._hashes = array.array('q')
+        self._pending = {}
+
+        if os.path.exists(filename):
+            self.load()
+
+    def __len__(self):
+        return len(self._ids)
+
+    def load(self):
+        """Load the manifest from ``self.filename``."""
+        with open(self.filename, 'rb') as f:
+            magic = f.read(len(MANIFEST_MAGIC))
+            if magic != MANIFEST_MAGIC:
+                raise ValueError('Not a manifest file: {}'.format(self.filename))
+            count, = struct.unpack('<q', f.read(8))
+            self._ids = array.array('q')
+            self._ids.fromfile(f, count)
+            self._hashes = array.array('q')
+            self._hashes.fromfile(f, count)
+
+    def clear(self):
+        """Forget the rows converted by earlier runs, e.g. because their output is gone, so every
+        row is converted again."""
+        self._ids = array.array('q')
+        self._hashes = array.array('q')
+
+    def save(self, record_ids=None):
+        """Add the rows seen since the manifest was loaded and save it to ``self.filename``.
+
+        If ``record_ids`` is given, only the rows seen with those IDs are added, e.g. the rows
+        that made it into the output.
+        """
+        ids = array.array('q')
+        hashes = array.array('q')
+        pending = sorted(item for item in self._pending.items()
+                         if record_ids is None or item[0] in record_ids)
+        i = j = 0
+
+        # Merge the sorted pending rows into the sorted saved rows, replacing changed rows.
+        while i < len(self._ids) or j < len(pending):
+            if j == len(pending) or (i < len(self._ids) and self._ids[i] < pending[j][0]):
+                ids.append(self._ids[i])
+                hashes.append(self._hashes[i])
+                i += 1
+            else:
+                if i < len(self._ids) and self._ids[i] == pending[j][0]:
+                    i += 1
+                ids.append(pending[j][0])
+                hashes.append(pending[j][1])
+                j += 1
+
+        fd, temp_filename = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.filename)))
+        with open(fd, 'wb') as f:
+            f.write(MANIFEST_MAGIC)
+            f.write(struct.pack('<q', len(ids)))
+            ids.tofile(f)
+            hashes.tofile(f)
+        os.replace(temp_filename, self.filename)
+
+        self._ids = ids
+        self._hashes = hashes
+        self._pending = {}
+
+    def get(self, record_id):
+        """Return the content hash of the row with ``record_id``, or None if it hasn't been seen."""
+        if record_id in self._pending:
+            return self._pending[record_id]
+        index = bisect.bisect_left(self._ids, record_id)
+        if index < len(self._ids) and self._ids[index] == record_id:
+            return self._hashes[index]
+        return None
+
+    def filter_rows(self, rows, column_label='Record ID'):
+        """Yield the column labels in ``rows`` and each row that is new or has changed.
+
+        Unchanged rows are counted in ``self.unchanged``. The IDs of rows that have changed since
+        they were last converted are collected in ``self.changed_ids``, so their old versions can
+        be removed from the existing output. Rows without an integer record ID are always yielded.
+        """
+        rows = iter(rows)
+        column_labels = next(rows, None)
+        if column_labels is None:
+            return
+        yield column_labels
+
+        index = column_labels.index(column_label)
+
+        for row in rows:
+            try:
+                record_id = int(row[index])
+            except (ValueError, TypeError, IndexError):
+                yield row
+                continue
+
+            content_hash = row_hash(row)
+            previous_hash = self.get(record_id)
+
+            if previous_hash == content_hash:
+                self.unchanged += 1
+                continue
+
+            if previous_hash is not None and record_id not in self._pending:
+                self.changed_ids.add(record_id)
+
+            self._pending[record_id] = content_hash
+            yield row
+
+
+def merge_output(out_filename, new_filename, out_format, replaced_ids=()):
+    """Merge the converted rows in ``new_filename`` into the existing output ``out_filename``.
+
+    Records in the existing output whose IDs are in ``replaced_ids`` are dropped. If there are
+    none, the new records are appended in place; otherwise the output is rewritten.
+    """
+    if not os.path.exists(new_filename) or os.path.getsize(new_filename) == 0:
+        if replaced_ids:
+            _rewrite_output(out_filename, None, out_format, replaced_ids)
+        return
+
+    if not replaced_ids:
+        if out_format == 'geojson' and _append_geojson(out_filename, new_filename):
+            return
+        if out_format in ('csv', 'geojsonl'):
+            with open(out_filename, 'a', encoding='UTF8', newline='') as out_file:
+                with open(new_filename, 'r', encoding='UTF8', newline='') as new_file:
+                    if out_format == 'csv':
+                        new_file.readline()
+                    shutil.copyfileobj(new_file, out_file)
+            return
+
+    _rewrite_output(out_filename, new_filename, out_format, replaced_ids)
+
+
+def output_record_ids(filename, out_format):
+    """Return the set of record IDs in the output ``filename``, or an empty set if it doesn't
+    exist."""
+    record_ids = set()
+    if not os.path.exists(filename) or os.path.getsize(filename) == 0:
+        return record_ids
+
+    with open(filename, 'r', encoding='UTF8', newline='') as f:
+        if out_format == 'csv':
+            reader = csv.reader(f)
+            index = next(reader, []).index('Record ID')
+            record_ids.update(_record_id(row[index]) for row in reader)
+        elif out_format == 'geojsonl':
+            record_ids.update(json.loads(line).get('id') for line in f if line.strip())
+        else:
+            record_ids.update(record_id for record_id, _ in _geojson_features(f))
+    return record_ids
+
+
+def _geojson_features(f):
+    """Yield the record ID and text of each Feature in the FeatureCollection in the open file
+    ``f``, reading it a block at a time.
+
+    A FeatureCollection in the form `Portland.write_geojson` writes is streamed, so only one block
+    is held in memory; the text of each Feature is yielded as it was written. Any other
+    FeatureCollection is loaded whole and its Features are serialized again.
+    """
+    buffer = f.read(len(GEOJSON_PREFIX))
+    if buffer != GEOJSON_PREFIX:
+        collection = json.loads(buffer + f.read())
+        for feature in collection['features']:
+            yield feature.get('id'), json.dumps(feature, sort_keys=True)
+        return
+
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+    while True:
+        # Skip the separator between Features.
+        while position < len(buffer) and buffer[position] in ', \n':
+            position += 1
+        if buffer.startswith(']', position):
+            return
+        try:
+            feature, end = decoder.raw_decode(buffer, position)
+        except ValueError:
+            # The next Feature continues in the next block.
+            block = f.read(READ_SIZE)
+            if not block:
+                raise ValueError('Not a complete FeatureCollection: {}'.format(f.name))
+            buffer = buffer[position:] + block
+            position = 0
+            continue
+        yield feature.get('id'), buffer[position:end]
+        position = end
+
+
+def _geojson_body(filename):
+    """Return the serialized Features in a FeatureCollection written by `Portland.write_geojson`,
+    or None if the file is not in that form."""
+    with open(filename, 'r', encoding='UTF8') as f:
+        content = f.read()
+    if not content.startswith(GEOJSON_PREFIX) or not content.endswith(GEOJSON_SUFFIX):
+        return None
+    return content[len(GEOJSON_PREFIX):-len(GEOJSON_SUFFIX)]
+
+
+def _append_geojson(out_filename, new_filename):
+    """Append the Features in ``new_filename`` to the FeatureCollection in ``out_filename`` in
+    place. Returns False if either file is not in the form `Portland.write_geojson` writes."""
+    body = _geojson_body(new_filename)
+    if body is None:
+        return False
+    if not body:
+        return True
+
+    suffix = GEOJSON_SUFFIX.encode('utf8')
+    with open(out_filename, 'r+b') as out_file:
+        out_file.seek(0, os.SEEK_END)
+        end = out_file.tell() - len(suffix)
+        if end < len(GEOJSON_PREFIX):
+            return False
+        out_file.seek(end - 1)
+        last = out_file.read(1 + len(suffix))
+        if last[1:] != suffix:
+            return False
+        out_file.seek(end)
+        if last[:1] != b'[':
+            out_file.write(b', ')
+        out_file.write(body.encode('utf8'))
+        out_file.write(suffix)
+        out_file.truncate()
+    return True
+
+
+def _rewrite_output(out_filename, new_filename, out_format, replaced_ids):
+    """Rewrite ``out_filename`` without the records in ``replaced_ids``, followed by the records
+    in ``new_filename``.
+
+    The existing output is streamed, so memory use doesn't grow with its size.
+    """
+    fd, temp_filename = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(out_filename)))
+
+    with open(fd, 'w', encoding='UTF8', newline='') as merged, \
+            open(out_filename, 'r', encoding='UTF8', newline='') as existing:
+        if out_format == 'csv':
+            reader = csv.reader(existing)
+            writer = csv.writer(merged)
+            column_labels = next(reader, [])
+            writer.writerow(column_labels)
+            index = column_labels.index('Record ID')
+            for row in reader:
+                if _record_id(row[index]) not in replaced_ids:
+                    writer.writerow(row)
+            if new_filename:
+                with open(new_filename, 'r', encoding='UTF8', newline='') as new_file:
+                    new_file.readline()
+                    shutil.copyfileobj(new_file, merged)
+        elif out_format == 'geojsonl':
+            for line in existing:
+                if line.strip() and json.loads(line).get('id') not in replaced_ids:
+                    merged.write(line)
+            if new_filename:
+                with open(new_filename, 'r', encoding='UTF8', newline='') as new_file:
+                    shutil.copyfileobj(new_file, merged)
+        else:
+            merged.write(GEOJSON_PREFIX)
+            written = False
+            for record_id, feature in _geojson_features(existing):
+                if record_id not in replaced_ids:
+                    if written:
+                        merged.write(', ')
+                    merged.write(feature)
+                    written = True
+            body = _geojson_body(new_filename) if new_filename else None
+            if body:
+                if written:
+                    merged.write(', ')
+                merged.write(body)
+            merged.write(GEOJSON_SUFFIX)
+
+    os.replace(temp_filename, out_filename)
+
+
+def _record_id(value):
+    try:
+        return int(value)
+    except (ValueError, TypeError):
+        return value
@@ -0,0 +1,278 @@
+#!/usr/bin/env python
+# encoding: utf-8
+import array
+import heapq
+import math
+import mmap
+import os
+import struct
+import sys
+
+
+MAGIC = b'CRIMEIX1'
+
+# The header is the magic bytes, the record count, the grid origin and cell size in degrees and
+# the number of grid columns and rows.
+HEADER_FORMAT = '<Q4d2Q'
+HEADER_SIZE = len(MAGIC) + struct.calcsize(HEADER_FORMAT)
+
+# The average number of points to aim for in each grid cell.
+POINTS_PER_CELL = 16
+
+# The largest number of cells along each side of the grid.
+MAX_GRID_SIZE = 4096
+
+EARTH_RADIUS = 6371008.8
+
+# The length in metres of one degree of latitude.
+METRES_PER_DEGREE = math.pi * EARTH_RADIUS / 180
+
+
+def index_filename(dataset_filename):
+    """Return the name of the spatial index file kept next to ``dataset_filename``."""
+    return dataset_filename + '.idx'
+
+
+def haversine(lng1, lat1, lng2, lat2):
+    """Return the great-circle distance in metres between two WGS84 points."""
+    lng1, lat1, lng2, lat2 = map(math.radians, (lng1, lat1, lng2, lat2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + \
+        math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS * math.asin(min(1.0, math.sqrt(a)))
+
+
+def build_index(dataset, filename):
+    """Build a grid index over the points in ``dataset``, a `CrimeDataset`, and save it to
+    ``filename``.
+
+    The extent of the points is divided into a grid of cells holding about `POINTS_PER_CELL`
+    points each. The index keeps the dataset positions of the points sorted by cell, and the
+    offset of the first point of each cell.
+    """
+    count = len(dataset)
+    if count >= 2 ** 32:
+        raise ValueError('Too many records to index: {}'.format(count))
+
+    lngs = dataset.lng
+    lats = dataset.lat
+    if count:
+        min_lng, max_lng = min(lngs), max(lngs)
+        min_lat, max_lat = min(lats), max(lats)
+    else:
+        min_lng = max_lng = min_lat = max_lat = 0.0
+
+    size = max(1, min(MAX_GRID_SIZE, int(math.sqrt(count / POINTS_PER_CELL))))
+    cell_width = (max_lng - min_lng) / size or 1.0
+    cell_height = (max_lat - min_lat) / size or 1.0
+    grid = Grid(min_lng, min_lat, cell_width, cell_height, size, size)
+
+    # A counting sort of dataset positions by cell.
+    cells = array.array('I', (grid.cell(lngs[i], lats[i]) for i in range(count)))
+    offsets = array.array('Q', [0]) * (size * size + 1)
+    for cell in cells:
+        offsets[cell + 1] += 1
+    for cell in range(size * size):
+        offsets[cell + 1] += offsets[cell]
+
+    positions = array.array('Q', offsets[:-1])
+    order = array.array('I', [0]) * count
+    for i, cell in enumerate(cells):
+        order[positions[cell]] = i
+        positions[cell] += 1
+
+    temp_filename = filename + '.tmp'
+    with open(temp_filename, 'wb') as f:
+        f.write(MAGIC)
+        f.write(struct.pack(HEADER_FORMAT, count, min_lng, min_lat, cell_width, cell_height,
+                            size, size))
+        offsets.tofile(f)
+        order.tofile(f)
+    os.replace(temp_filename, filename)
+
+
+class Grid(object):
+    """A regular grid of cells over WGS84 coordinates."""
+    def __init__(self, min_lng, min_lat, cell_width, cell_height, columns, rows):
+        self.min_lng = min_lng
+        self.min_lat = min_lat
+        self.cell_width = cell_width
+        self.cell_height = cell_height
+        self.columns = columns
+        self.rows = rows
+
+    def column(self, lng):
+        return min(self.columns - 1, max(0, int((lng - self.min_lng) / self.cell_width)))
+
+    def row(self, lat):
+        return min(self.rows - 1, max(0, int((lat - self.min_lat) / self.cell_height)))
+
+    def cell(self, lng, lat):
+        return self.row(lat) * self.columns + self.column(lng)
+
+
+class SpatialIndex(object):
+    """Answer bounding box, radius and nearest neighbour queries over a `CrimeDataset`.
+
+    The index is read from ``filename`` by memory-mapping it. Queries return the positions of
+    matching records in the dataset, and can be filtered by a set of offense types and by a range
+    of report timestamps, in seconds since the epoch:
+
+        index = SpatialIndex(dataset, index_filename('crimes.bin'))
+        index.radius(-122.6647, 45.5343, 500, offenses=['Burglary'])
+    """
+    def __init__(self, dataset, filename):
+        if sys.byteorder != 'little':
+            raise RuntimeError('The crime data index is only supported on little-endian systems')
+
+        self.dataset = dataset
+        self._file = open(filename, 'rb')
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        buffer = memoryview(self._mmap)
+
+        if buffer[:len(MAGIC)] != MAGIC:
+            buffer.release()
+            self.close()
+            raise ValueError('Not a crime data index file: {}'.format(filename))
+
+        (count, min_lng, min_lat, cell_width, cell_height,
+         columns, rows) = struct.unpack_from(HEADER_FORMAT, buffer, len(MAGIC))
+        if count != len(dataset):
+            buffer.release()
+            self.close()
+            raise ValueError('Index {} does not match its dataset'.format(filename))
+
+        self.grid = Grid(min_lng, min_lat, cell_width, cell_height, columns, rows)
+        offsets_end = HEADER_SIZE + (columns * rows + 1) * 8
+        self._offsets = buffer[HEADER_SIZE:offsets_end].cast('Q')
+        self._order = buffer[offsets_end:offsets_end + count * 4].cast('I')
+        buffer.release()
+
+        # The smallest width of a grid cell in metres, anywhere in the grid.
+        max_abs_lat = max(abs(min_lat), abs(min_lat + rows * cell_height))
+        self._min_cell_size = min(cell_height * METRES_PER_DEGREE,
+                                  cell_width * METRES_PER_DEGREE * math.cos(math.radians(min(max_abs_lat, 90))))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Release the index views and unmap the file."""
+        for name in ('_offsets', '_order'):
+            view = self.__dict__.pop(name, None)
+            if view is not None:
+                view.release()
+        if getattr(self, '_mmap', None) is not None:
+            self._mmap.close()
+            self._mmap = None
+            self._file.close()
+
+    def bbox(self, min_lng, min_lat, max_lng, max_lat, offenses=None, since=None, until=None):
+        """Return the positions of the records within a bounding box."""
+        matches = self._filter(offenses, since, until)
+        lngs = self.dataset.lng
+        lats = self.dataset.lat
+        results = []
+        for i in self._candidates(min_lng, min_lat, max_lng, max_lat):
+            if min_lng <= lngs[i] <= max_lng and min_lat <= lats[i] <= max_lat and matches(i):
+                results.append(i)
+        return results
+
+    def radius(self, lng, lat, metres, offenses=None, since=None, until=None):
+        """Return the positions of the records within ``metres`` of a point, nearest first."""
+        lat_delta = metres / METRES_PER_DEGREE
+        cos_lat = math.cos(math.radians(min(89.0, abs(lat) + lat_delta)))
+        lng_delta = min(180.0, lat_delta / max(cos_lat, 1e-12))
+
+        matches = self._filter(offenses, since, until)
+        lngs = self.dataset.lng
+        lats = self.dataset.lat
+        results = []
+        for i in self._candidates(lng - lng_delta, lat - lat_delta, lng + lng_delta, lat + lat_delta):
+            distance = haversine(lng, lat, lngs[i], lats[i])
+            if distance <= metres and matches(i):
+                results.append((distance, i))
+        return [i for _, i in sorted(results)]
+
+    def nearest(self, lng, lat, k, offenses=None, since=None, until=None):
+        """Return the positions of the ``k`` records nearest to a point, nearest first."""
+        if k <= 0 or not len(self.dataset):
+            return []
+
+        matches = self._filter(offenses, since, until)
+        lngs = self.dataset.lng
+        lats = self.dataset.lat
+        grid = self.grid
+        column, row = grid.column(lng), grid.row(lat)
+        inside = grid.min_lng <= lng <= grid.min_lng + grid.columns * grid.cell_width and \
+            grid.min_lat <= lat <= grid.min_lat + grid.rows * grid.cell_height
+
+        # A max-heap of the k nearest records found so far, by negated distance.
+        heap = []
+        ring = 0
+        while True:
+            for cell in self._ring(column, row, ring):
+                for position in range(self._offsets[cell], self._offsets[cell + 1]):
+                    i = self._order[position]
+                    if not matches(i):
+                        continue
+                    item = (-haversine(lng, lat, lngs[i], lats[i]), -i)
+                    if len(heap) < k:
+                        heapq.heappush(heap, item)
+                    elif item > heap[0]:
+                        heapq.heapreplace(heap, item)
+
+            # Records in cells beyond this ring are at least ``ring`` cells away from the point.
+            done = len(heap) == k and inside and -heap[0][0] <= ring * self._min_cell_size
+            if done or ring > max(grid.columns, grid.rows):
+                break
+            ring += 1
+
+        return [-i for _, i in sorted(heap, reverse=True)]
+
+    def _candidates(self, min_lng, min_lat, max_lng, max_lat):
+        grid = self.grid
+        first_column, last_column = grid.column(min_lng), grid.column(max_lng)
+        for row in range(grid.row(min_lat), grid.row(max_lat) + 1):
+            start = self._offsets[row * grid.columns + first_column]
+            end = self._offsets[row * grid.columns + last_column + 1]
+            for position in range(start, end):
+                yield self._order[position]
+
+    def _ring(self, column, row, ring):
+        grid = self.grid
+        for r in range(row - ring, row + ring + 1):
+            if not 0 <= r < grid.rows:
+                continue
+            if r in (row - ring, row + ring):
+                columns = range(column - ring, column + ring + 1)
+            else:
+                columns = (column - ring, column + ring)
+            for c in columns:
+                if 0 <= c < grid.columns:
+                    yield r * grid.columns + c
+
+    def _filter(self, offenses, since, until):
+        """Return a function that tells whether the record at a position passes the filters."""
+        dataset = self.dataset
+        codes = None
+        if offenses:
+            codes = set(code for code, offense in enumerate(dataset.offense_types) if offense in offenses)
+
+        if codes is None and since is None and until is None:
+            return lambda i: True
+
+        offense = dataset.offense
+        timestamp = dataset.timestamp
+
+        def matches(i):
+            if codes is not None and offense[i] not in codes:
+                return False
+            if since is not None and timestamp[i] < since:
+                return False
+            if until is not None and timestamp[i] > until:
+                return False
+            return True
+        return matches
@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+# encoding: utf-8
+import collections
+import contextlib
+import time
+
+
+# The stages of a conversion that are timed.
+STAGES = ('read', 'filter', 'transform', 'parse_date', 'serialize', 'sort', 'write')
+
+# The number of example rows to keep for each reason rows are skipped.
+DEFAULT_MAX_SAMPLES = 3
+
+
+class Metrics(object):
+    """Collect timings, counters and skipped rows during a conversion.
+
+        - Time spent in each stage is added up with `add_time` or the `timer` context manager,
+          along with the number of items processed.
+        - Named counters are incremented with `count`.
+        - Skipped rows are counted by reason with `skip`, keeping only the first ``max_samples``
+          rows for each reason as examples instead of logging every one.
+
+    The collected metrics are returned as a dictionary by `report`. Library users can plug in
+    their own metrics sink with `add_sink`: a callable that `publish` calls with the report.
+
+    Stages are only timed if ``timing`` is True, since timing each row has a cost of its own.
+    Otherwise `add_time` and `timer` do nothing, and converters skip timing each row altogether,
+    as the ``timing`` attribute tells them to.
+    """
+    def __init__(self, max_samples=DEFAULT_MAX_SAMPLES, timing=False):
+        self.max_samples = max_samples
+        self.timing = timing
+        self.times = collections.defaultdict(float)
+        self.items = collections.Counter()
+        self.counters = collections.Counter()
+        self.skips = collections.Counter()
+        self.samples = collections.defaultdict(list)
+        self.sinks = []
+
+    def add_time(self, stage, seconds, items=1):
+        """Add ``seconds`` spent processing ``items`` items in ``stage``."""
+        if not self.timing:
+            return
+        self.times[stage] += seconds
+        self.items[stage] += items
+
+    @contextlib.contextmanager
+    def timer(self, stage, items=1):
+        """Time the body of a ``with`` block as ``stage``."""
+        if not self.timing:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(stage, time.perf_counter() - start, items)
+
+    def count(self, name, value=1):
+        """Increment the counter ``name`` by ``value``."""
+        self.counters[name] += value
+
+    def skip(self, reason, row):
+        """Count a row skipped because of ``reason``."""
+        self.skips[reason] += 1
+        samples = self.samples[reason]
+        if len(samples) < self.max_samples:
+            samples.append(list(row))
+
+    def merge(self, report):
+        """Add the metrics in ``report``, e.g. from another process, to these metrics."""
+        for stage, timing in report['stages'].items():
+            self.add_time(stage, timing['seconds'], timing['items'])
+        self.counters.update(report['counters'])
+        for reason, skip in report['skips'].items():
+            self.skips[reason] += skip['count']
+            samples = self.samples[reason]
+            samples.extend(skip['samples'][:self.max_samples - len(samples)])
+
+    def report(self):
+        """Return the collected metrics as a dictionary."""
+        return {
+            'stages': dict((stage, {'seconds': self.times[stage], 'items': self.items[stage]})
+                           for stage in self.times),
+            'counters': dict(self.counters),
+            'skips': dict((reason, {'count': count, 'samples': self.samples[reason]})
+                          for reason, count in self.skips.items())
+        }
+
+    def add_sink(self, sink):
+        """Add a callable to be called with the report when metrics are published."""
+        self.sinks.append(sink)
+
+    def publish(self):
+        """Call each sink with the report."""
+        report = self.report()
+        for sink in self.sinks:
+            sink(report)
+        return report
@@ -0,0 +1,267 @@
+#!/usr/bin/env python
+# encoding: utf-8
+import csv
+import io
+import locale
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+
+from crimetools.compression import open_output
+from crimetools.dedupe import Deduplicator
+from crimetools.converters import cache
+from crimetools.converters.portland import (DEFAULT_CHUNK_SIZE, DEFAULT_ENGINE, NAD83_EPSG, WGS84_EPSG,
+                                            Portland)
+from crimetools.metrics import Metrics
+
+
+# Bounds on the size of the byte range of the input file each worker converts at a time.
+MIN_RANGE_SIZE = 1024 * 1024
+MAX_RANGE_SIZE = 64 * 1024 * 1024
+
+# The number of byte ranges to aim for per worker, so that workers finishing early pick up more.
+RANGES_PER_WORKER = 4
+
+
+def read_header(in_filename):
+    """Return the column labels of ``in_filename`` and the byte offset of the first data row."""
+    with open(in_filename, 'rb') as f:
+        line = f.readline()
+        offset = f.tell()
+
+    labels = next(csv.reader(io.TextIOWrapper(io.BytesIO(line))), [])
+    return labels, offset
+
+
+def split_file(in_filename, start, workers):
+    """Split ``in_filename`` after byte ``start`` into byte ranges that each begin on a new row.
+
+    Rows are assumed not to contain newlines inside quoted values, as is the case for the
+    Portland data.
+
+    Returns a list of (start, end) tuples.
+    """
+    size = os.path.getsize(in_filename)
+    range_size = (size - start) // max(1, workers * RANGES_PER_WORKER)
+    range_size = min(MAX_RANGE_SIZE, max(MIN_RANGE_SIZE, range_size))
+
+    ranges = []
+    with open(in_filename, 'rb') as f:
+        while start < size:
+            end = start + range_size
+            if end < size:
+                # Move the end of the range forward to the start of the next row.
+                f.seek(end - 1)
+                f.readline()
+                end = f.tell()
+            else:
+                end = size
+            ranges.append((start, end))
+            start = end
+
+    return ranges
+
+
+def count_rows(in_filename, ranges):
+    """Return the number of rows in each of the byte ranges ``ranges`` of ``in_filename``.
+
+    As in `split_file`, rows are assumed not to contain newlines inside quoted values.
+    """
+    counts = []
+    with open(in_filename, 'rb') as f:
+        for start, end in ranges:
+            f.seek(start)
+            count = 0
+            last = b''
+            remaining = end - start
+            while remaining:
+                data = f.read(min(remaining, MIN_RANGE_SIZE))
+                if not data:
+                    break
+                count += data.count(b'\n')
+                last = data[-1:]
+                remaining -= len(data)
+            # The last row of the file may not end in a newline.
+            if last and last != b'\n':
+                count += 1
+            counts.append(count)
+    return counts
+
+
+def read_range(f, start, end):
+    """Yield the rows of the binary file ``f`` that begin in the byte range from ``start`` to
+    ``end``, one line at a time, decoded the way the serial path decodes the input file.
+
+    As in `split_file`, rows are assumed not to contain newlines inside quoted values.
+    """
+    encoding = locale.getpreferredencoding(False)
+    f.seek(start)
+    while f.tell() < end:
+        line = f.readline()
+        if not line:
+            break
+        yield line.decode(encoding)
+
+
+def find_duplicates(in_filename, ranges, keep):
+    """Find the duplicate rows of ``in_filename`` to drop, keeping the ``keep`` copy of each.
+
+    Returns a `Bitmap` of the rows to drop in each of the byte ranges ``ranges``, counted from
+    the first row of the range.
+    """
+    deduplicator = Deduplicator(keep)
+    with open(in_filename, 'r', newline='') as f:
+        drops = deduplicator.scan(csv.reader(f))
+
+    slices = []
+    position = 0
+    for count in count_rows(in_filename, ranges):
+        slices.append(drops.slice(position, position + count))
+        position += count
+    return slices
+
+
+def convert_range(task):
+    """Convert the rows in one byte range of an input file into a temporary part file.
+
+    Runs in a worker process, with its own `Portland` converter, transformation and in-memory
+    transform cache. A persistent transform cache is only read from; newly transformed points are
+    sent back to the parent process to be saved.
+
+    If ``drops`` is a `Bitmap` of the duplicate rows in the range, they are dropped and counted as
+    "duplicates" in the metrics.
+
+    Returns the name of the part file, the number of rows converted, the number skipped, the
+    transform cache stats, the newly transformed points and the worker's metrics report.
+    """
+    (in_filename, start, end, column_labels, out_format, part_dir, use_wgs84, chunk_size,
+     cache_size, cache_filename, precision, engine, drops, row_filter, timing) = task
+
+    metrics = Metrics(timing=timing)
+    # Rows are read as the converter consumes them, rather than reading the whole range first.
+    with open(in_filename, 'rb') as in_file:
+        rows = csv.reader(read_range(in_file, start, end))
+        deduplicator = None
+        if drops is not None:
+            deduplicator = Deduplicator(drops=drops)
+            rows = deduplicator.filter(rows, column_labels.index('Record ID'))
+        transform_cache = cache.TransformCache(NAD83_EPSG, WGS84_EPSG, size=cache_size,
+                                               filename=cache_filename, read_only=True)
+        converter = Portland(rows, column_labels=column_labels, normalize_to_wgs84=use_wgs84,
+                             chunk_size=chunk_size, transform_cache=transform_cache, metrics=metrics,
+                             precision=precision, engine=engine, row_filter=row_filter)
+
+        fd, part_filename = tempfile.mkstemp(suffix='.part', dir=part_dir)
+        with open(fd, 'w', encoding='UTF8', newline='') as part:
+            if out_format == 'csv':
+                _, total, skipped = converter.to_csv(part, write_header=False)
+            elif out_format == 'geojsonl':
+                total, skipped = converter.write_geojson_lines(part)
+            else:
+                # Features are joined the same way `Portland.write_geojson` joins them.
+                total = 0
+                for feature in converter.serialized_geojson_features():
+                    if timing:
+                        start = time.perf_counter()
+                    if total:
+                        part.write(', ')
+                    part.write(feature)
+                    if timing:
+                        metrics.add_time('write', time.perf_counter() - start)
+                    total += 1
+                skipped = converter.original_row_count - total
+
+    transform_cache.close()
+    if deduplicator is not None:
+        metrics.count('duplicates', deduplicator.duplicates)
+    return (part_filename, total, skipped, transform_cache.stats(), transform_cache.pending,
+            metrics.report())
+
+
+def convert(in_filename, out_filename, out_format, workers, use_wgs84=False,
+            chunk_size=DEFAULT_CHUNK_SIZE, transform_cache=None, metrics=None, precision=None,
+            compression=None, engine=DEFAULT_ENGINE, dedupe=None, row_filter=None):
+    """Convert ``in_filename`` to ``out_filename`` in ``out_format`` using a pool of ``workers``
+    processes.
+
+    The input is split into row-aligned byte ranges that are converted in parallel and merged
+    back into the output in their original order.
+
+    If a `TransformCache` is given as ``transform_cache``, each worker uses an in-memory cache of
+    the same size and reads from its persistent tier, if any. Points newly transformed by the
+    workers are saved to ``transform_cache``, and its stats include the workers' hits and misses.
+
+    GeoJSON coordinates are rounded to ``precision`` decimal places, if given. The output is
+    compressed in the format ``compression`` or the one its extension implies, if any. The input
+    file must not be compressed. Coordinates are transformed with the projection ``engine``.
+
+    If ``dedupe`` is "first" or "last", rows with the same record ID as another row are dropped,
+    keeping the first or last copy. The duplicates are found in one pass over the whole input
+    before the ranges are converted, so each worker can drop its own. Only rows that match
+    ``row_filter``, a `RowFilter`, are converted, if given.
+
+    If a `Metrics` object is given as ``metrics``, the metrics of every worker are merged into it.
+    The workers only time each stage if ``metrics`` does.
+
+    Returns the total number of rows converted and the number skipped.
+    """
+    column_labels, start = read_header(in_filename)
+    part_dir = os.path.dirname(os.path.abspath(out_filename))
+    cache_size = transform_cache.size if transform_cache is not None else 0
+    cache_filename = transform_cache.filename if transform_cache is not None else None
+    ranges = split_file(in_filename, start, workers)
+    timing = metrics is not None and metrics.timing
+    if dedupe:
+        drops = find_duplicates(in_filename, ranges, dedupe)
+    else:
+        drops = [None] * len(ranges)
+    tasks = [(in_filename, range_start, range_end, column_labels, out_format, part_dir,
+              use_wgs84, chunk_size, cache_size, cache_filename, precision, engine, range_drops,
+              row_filter, timing)
+             for (range_start, range_end), range_drops in zip(ranges, drops)]
+
+    total = 0
+    skipped = 0
+    pending = []
+    pool = multiprocessing.Pool(workers)
+
+    try:
+        with open_output(out_filename, compression, encoding='UTF8', newline='') as out_file:
+            if out_format == 'csv':
+                csv.writer(out_file).writerow(column_labels)
+            elif out_format == 'geojson':
+                out_file.write('{"features": [')
+
+            # Parts are merged as soon as they and every part before them are done.
+            for part_filename, part_total, part_skipped, cache_stats, part_pending, report in \
+                    pool.imap(convert_range, tasks):
+                try:
+                    if part_total:
+                        if out_format == 'geojson' and total:
+                            out_file.write(', ')
+                        with open(part_filename, 'r', encoding='UTF8', newline='') as part:
+                            shutil.copyfileobj(part, out_file)
+                finally:
+                    os.unlink(part_filename)
+                total += part_total
+                skipped += part_skipped
+                if metrics is not None:
+                    metrics.merge(report)
+
+                if transform_cache is not None:
+                    transform_cache.merge_stats(cache_stats)
+                    pending.extend(part_pending)
+
+            if out_format == 'geojson':
+                out_file.write('], "type": "FeatureCollection"}')
+    finally:
+        pool.terminate()
+        pool.join()
+
+    # The persistent tier is only written once the workers are done reading it.
+    if transform_cache is not None:
+        transform_cache.update(pending)
+
+    return total, skipped
@@ -0,0 +1,142 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""Run conversions in a long-running server process, so each job skips the cost of starting up.
+
+    crimes serve --socket /tmp/crimes.sock
+    crimes -i crimes.csv -o crimes.json -l portland -f geojson --server /tmp/crimes.sock
+
+The server listens on a local Unix socket. A client sends one job per connection as a line of
+JSON: the command line arguments of the ``crimes`` command and the client's working directory.
+The server answers with a line of JSON holding the job's exit status and everything it printed.
+
+Heavy modules are imported and the coordinate transformation is created once, when the server
+starts. Each job then runs in a process forked from the server, so it starts warm, jobs can run
+at the same time, and a job that crashes can't take the server down with it.
+"""
+import contextlib
+import io
+import json
+import os
+import socket
+import socketserver
+import sys
+import traceback
+
+
+def strip_option(argv, option):
+    """Return ``argv`` without ``option`` and its value."""
+    stripped = []
+    skip = False
+    for arg in argv:
+        if skip:
+            skip = False
+        elif arg == option:
+            skip = True
+        elif not arg.startswith(option + '='):
+            stripped.append(arg)
+    return stripped
+
+
+def run_job(argv, cwd):
+    """Run the ``crimes`` command with ``argv`` in the directory ``cwd``.
+
+    Returns the exit status and everything the command printed.
+    """
+    from crimetools import command
+
+    output = io.StringIO()
+    status = 0
+    with contextlib.redirect_stdout(output), contextlib.redirect_stderr(output):
+        try:
+            os.chdir(cwd)
+            status = command.main(argv) or 0
+        except SystemExit as e:
+            if isinstance(e.code, int) or e.code is None:
+                status = e.code or 0
+            else:
+                print(e.code)
+                status = 1
+        except Exception:
+            traceback.print_exc()
+            status = 1
+    return status, output.getvalue()
+
+
+class JobHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        line = self.rfile.readline()
+        try:
+            job = json.loads(line.decode('utf8'))
+            status, output = run_job(job['argv'], job['cwd'])
+        except (ValueError, KeyError, TypeError):
+            status, output = 1, 'Bad job: {!r}\n'.format(line)
+        self.wfile.write(json.dumps({'status': status, 'output': output}).encode('utf8') + b'\n')
+
+
+class ConversionServer(socketserver.ForkingMixIn, socketserver.UnixStreamServer):
+    """A Unix socket server that runs each job in a forked process.
+
+    Any existing file at ``socket_path`` is replaced. The socket is only accessible to the user
+    running the server, since jobs read and write files as that user.
+    """
+    def __init__(self, socket_path):
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        socketserver.UnixStreamServer.__init__(self, socket_path, JobHandler)
+        warm()
+
+    def server_bind(self):
+        # The socket is created without access for other users, rather than changed after it is
+        # bound, so there is never a moment when they can connect.
+        umask = os.umask(0o077)
+        try:
+            socketserver.UnixStreamServer.server_bind(self)
+        finally:
+            os.umask(umask)
+
+    def server_close(self):
+        socketserver.UnixStreamServer.server_close(self)
+        if os.path.exists(self.server_address):
+            os.unlink(self.server_address)
+
+
+def warm():
+    """Import the heavy dependencies and create the coordinate transformations ahead of time,
+    for each projection engine that is installed."""
+    from crimetools.converters.portland import ENGINES, NAD83_EPSG, WGS84_EPSG, get_transformation
+
+    import geojson  # noqa
+    for engine in ENGINES:
+        try:
+            get_transformation(NAD83_EPSG, WGS84_EPSG, engine)
+        except ImportError:
+            pass
+
+
+def submit(socket_path, argv, cwd=None):
+    """Send a job to the server listening on ``socket_path``.
+
+    Returns the job's exit status and everything it printed.
+    """
+    job = {'argv': list(argv), 'cwd': cwd or os.getcwd()}
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        client.connect(socket_path)
+        client.sendall(json.dumps(job).encode('utf8') + b'\n')
+        with client.makefile('rb') as f:
+            response = json.loads(f.readline().decode('utf8'))
+    finally:
+        client.close()
+    return response['status'], response['output']
+
+
+def serve(socket_path):
+    """Serve jobs on ``socket_path`` until interrupted."""
+    server = ConversionServer(socket_path)
+    print('Listening on {}'.format(socket_path), file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -0,0 +1,202 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""Order crimes along a space-filling curve, so crimes near each other are written next to each
+other, even for more crimes than fit in memory.
+
+Points are mapped onto a grid of 2 ** 32 by 2 ** 32 cells, and each cell is given its distance
+along a Hilbert curve or a Z-order (Morton) curve through the grid. A Hilbert curve never jumps
+between distant cells, so it keeps neighbours closer together; a Z-order key is cheaper to
+compute.
+"""
+import heapq
+import math
+import os
+import pickle
+import tempfile
+
+
+CURVES = ('hilbert', 'zorder')
+
+# The number of cells along each side of the grid points are mapped onto.
+GRID_BITS = 32
+GRID_SIZE = 2 ** GRID_BITS
+
+# The bounds of the grid for longitude and latitude, and for projected coordinates. Projected grid
+# cells are one unit, e.g. a foot of State Plane, on a side.
+GEOGRAPHIC_BOUNDS = (-180.0, -90.0, 180.0, 90.0)
+PROJECTED_BOUNDS = (0.0, 0.0, float(GRID_SIZE), float(GRID_SIZE))
+
+# The key of points that can't be placed on the grid, which sorts after every other key.
+NO_KEY = GRID_SIZE ** 2
+
+# The number of items an `ExternalSorter` holds in memory before it spills them to a file.
+DEFAULT_BUFFER_SIZE = 100000
+
+# The most spilled files an `ExternalSorter` merges at once.
+MAX_MERGE_FILES = 64
+
+
+def _hilbert_table():
+    """Return the table `hilbert_key` walks the curve with, four bits of each coordinate at a time.
+
+    The curve in each quadrant is the whole curve, swapped or flipped or both, so there are four
+    states. The entry for a state and four bits of x and y holds the eight bits of the key they
+    give and the state of the next four bits.
+    """
+    table = [0] * 1024
+    for state in range(4):
+        for x in range(16):
+            for y in range(16):
+                swap, flip = state >> 1, state & 1
+                digits = 0
+                for bit in range(3, -1, -1):
+                    rx = ((x >> bit) & 1) ^ flip
+                    ry = ((y >> bit) & 1) ^ flip
+                    if swap:
+                        rx, ry = ry, rx
+                    digits = (digits << 2) | ((3 * rx) ^ ry)
+                    if not ry:
+                        swap ^= 1
+                        flip ^= rx
+                table[(state << 8) | (x << 4) | y] = (digits << 2) | (swap << 1) | flip
+    return table
+
+
+_HILBERT = _hilbert_table()
+
+# Each byte with its bits spread out to every other bit, for interleaving Z-order keys.
+_SPREAD = [sum(((i >> bit) & 1) << (2 * bit) for bit in range(8)) for i in range(256)]
+
+
+def hilbert_key(x, y):
+    """Return the distance along a Hilbert curve of the grid cell (``x``, ``y``)."""
+    state = 0
+    key = 0
+    for shift in range(GRID_BITS - 4, -1, -4):
+        entry = _HILBERT[(state << 8) | (((x >> shift) & 15) << 4) | ((y >> shift) & 15)]
+        key = (key << 8) | (entry >> 2)
+        state = entry & 3
+    return key
+
+
+def zorder_key(x, y):
+    """Return the distance along a Z-order curve of the grid cell (``x``, ``y``)."""
+    key = 0
+    for shift in range(GRID_BITS - 8, -1, -8):
+        key = (key << 16) | (_SPREAD[(x >> shift) & 255] << 1) | _SPREAD[(y >> shift) & 255]
+    return key
+
+
+def time_key(report_time):
+    """Return a sortable integer for the datetime ``report_time``, or `NO_KEY` if it is None."""
+    if report_time is None:
+        return NO_KEY
+    return (report_time.toordinal() * 86400 + report_time.hour * 3600 + report_time.minute * 60 +
+            report_time.second)
+
+
+class CurveKey(object):
+    """Compute the key of points along the space-filling ``curve``, "hilbert" or "zorder", over a
+    grid covering ``bounds``, a (min_x, min_y, max_x, max_y) tuple.
+
+    Points outside the bounds are moved to their edge. Points that aren't finite numbers get
+    `NO_KEY`.
+    """
+    def __init__(self, curve, bounds=GEOGRAPHIC_BOUNDS):
+        if curve not in CURVES:
+            raise ValueError('Unknown space-filling curve: {}'.format(curve))
+        self.curve = curve
+        self.bounds = bounds
+        self._key = hilbert_key if curve == 'hilbert' else zorder_key
+        self._x_scale = GRID_SIZE / (bounds[2] - bounds[0])
+        self._y_scale = GRID_SIZE / (bounds[3] - bounds[1])
+
+    def __call__(self, x, y):
+        if math.isnan(x) or math.isnan(y) or math.isinf(x) or math.isinf(y):
+            return NO_KEY
+        min_x, min_y = self.bounds[0], self.bounds[1]
+        x = min(max(int((x - min_x) * self._x_scale), 0), GRID_SIZE - 1)
+        y = min(max(int((y - min_y) * self._y_scale), 0), GRID_SIZE - 1)
+        return self._key(x, y)
+
+
+class ExternalSorter(object):
+    """Sort values by key, holding at most ``buffer_size`` of them in memory.
+
+    Values are added with `add`. Whenever the buffer fills up, it is sorted and spilled to a
+    temporary file in ``tmp_dir``. Iterating over the sorter merges the spilled files and yields
+    the values in key order; values with equal keys keep the order they were added in. Keys and
+    values must be picklable.
+
+    The spilled files are removed once the values have been iterated over or `close` is called.
+    """
+    def __init__(self, buffer_size=DEFAULT_BUFFER_SIZE, tmp_dir=None):
+        self.buffer_size = max(1, buffer_size)
+        self.tmp_dir = tmp_dir
+        self.count = 0
+        self.filenames = []
+        self._items = []
+
+    def __len__(self):
+        return self.count
+
+    def add(self, key, value):
+        self._items.append((key, self.count, value))
+        self.count += 1
+        if len(self._items) >= self.buffer_size:
+            self.spill()
+
+    def spill(self):
+        """Sort the values in memory and write them to a new temporary file."""
+        self._items.sort()
+        self.filenames.append(self._write(self._items))
+        self._items = []
+
+    def _write(self, items):
+        fd, filename = tempfile.mkstemp(suffix='.sort', dir=self.tmp_dir)
+        with open(fd, 'wb') as f:
+            pickler = pickle.Pickler(f, pickle.HIGHEST_PROTOCOL)
+            for item in items:
+                pickler.dump(item)
+                # Each item is written on its own, so the pickler needn't remember it.
+                pickler.clear_memo()
+        return filename
+
+    def _read(self, filename):
+        with open(filename, 'rb') as f:
+            unpickler = pickle.Unpickler(f)
+            while True:
+                try:
+                    yield unpickler.load()
+                except EOFError:
+                    return
+
+    def __iter__(self):
+        try:
+            if not self.filenames:
+                self._items.sort()
+                items = self._items
+            else:
+                if self._items:
+                    self.spill()
+                # Merge the files in batches until few enough are left to merge at once.
+                while len(self.filenames) > MAX_MERGE_FILES:
+                    batch = self.filenames[:MAX_MERGE_FILES]
+                    merged = self._write(heapq.merge(*[self._read(filename) for filename in batch]))
+                    self.filenames = self.filenames[MAX_MERGE_FILES:] + [merged]
+                    for filename in batch:
+                        os.unlink(filename)
+                items = heapq.merge(*[self._read(filename) for filename in self.filenames])
+
+            for _, _, value in items:
+                yield value
+        finally:
+            self.close()
+
+    def close(self):
+        """Remove the spilled files and forget the values in memory."""
+        for filename in self.filenames:
+            if os.path.exists(filename):
+                os.unlink(filename)
+        self.filenames = []
+        self._items = []
@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+# encoding: utf-8
+import collections
+import csv
+import json
+
+from crimetools.compression import open_input
+from crimetools.converters.portland import ConversionError, Portland
+
+
+# The dimensions crimes are counted by.
+DIMENSIONS = ('neighborhood', 'precinct', 'offense', 'hour', 'week')
+
+
+class CrimeStats(object):
+    """Count crimes by neighborhood, police precinct, offense type, hour of day and ISO week.
+
+    Counts are collected in a single streaming pass over rows of crime data, so memory use only
+    depends on the number of distinct values in each dimension. Partial counts, e.g. from separate
+    files or workers, can be combined with `merge`, or saved with `to_dict` and loaded again with
+    `from_dict`.
+    """
+    def __init__(self):
+        self.total = 0
+        self.skipped = 0
+        self.counts = dict((dimension, collections.Counter()) for dimension in DIMENSIONS)
+
+    def add(self, neighborhood, precinct, offense, date):
+        """Count one crime."""
+        year, week, _ = date.isocalendar()
+        counts = self.counts
+        counts['neighborhood'][neighborhood] += 1
+        counts['precinct'][precinct] += 1
+        counts['offense'][offense] += 1
+        counts['hour']['{:02d}'.format(date.hour)] += 1
+        counts['week']['{:04d}-W{:02d}'.format(year, week)] += 1
+        self.total += 1
+
+    def add_rows(self, converter):
+        """Count the crimes in the rows of ``converter``, a `Portland` converter.
+
+        Rows whose report date can't be parsed are counted as skipped. Coordinates are not
+        needed, so they are never transformed.
+        """
+        for row in converter.rows:
+            try:
+                date = converter.parse_date(row)
+            except ConversionError:
+                self.skipped += 1
+                continue
+            self.add(converter.get_csv_column(row, 'Neighborhood'),
+                     converter.get_csv_column(row, 'Police Precinct'),
+                     converter.get_csv_column(row, 'Major Offense Type'),
+                     date)
+
+    def merge(self, other):
+        """Add the counts of ``other``, another `CrimeStats`, to these counts."""
+        self.total += other.total
+        self.skipped += other.skipped
+        for dimension in DIMENSIONS:
+            self.counts[dimension].update(other.counts[dimension])
+
+    def to_dict(self):
+        return {
+            'total': self.total,
+            'skipped': self.skipped,
+            'counts': dict((dimension, dict(sorted(counts.items())))
+                           for dimension, counts in self.counts.items())
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        stats = cls()
+        stats.total = data['total']
+        stats.skipped = data['skipped']
+        for dimension in DIMENSIONS:
+            stats.counts[dimension].update(data['counts'].get(dimension, {}))
+        return stats
+
+    def write_json(self, file):
+        json.dump(self.to_dict(), file, indent=2, sort_keys=True)
+        file.write('\n')
+
+    def write_csv(self, file):
+        """Write one row per dimension and value, with its count."""
+        writer = csv.writer(file)
+        writer.writerow(['dimension', 'value', 'count'])
+        for dimension in DIMENSIONS:
+            for value, count in sorted(self.counts[dimension].items()):
+                writer.writerow([dimension, value, count])
+
+
+def collect(in_filename):
+    """Count the crimes in the CSV file ``in_filename``, which may be compressed.
+
+    Returns a dictionary of the counts, as `CrimeStats.to_dict` does.
+    """
+    stats = CrimeStats()
+    with open_input(in_filename) as f:
+        stats.add_rows(Portland(csv.reader(f)))
+    return stats.to_dict()
@@ -0,0 +1,185 @@
+#!/usr/bin/env python
+# encoding: utf-8
+import collections
+import json
+import math
+import os
+import struct
+
+
+DEFAULT_MIN_ZOOM = 0
+DEFAULT_MAX_ZOOM = 16
+
+# Each tile divides its area into a grid of 2 ** BIN_BITS by 2 ** BIN_BITS heatmap bins.
+BIN_BITS = 4
+
+# The latitude limit of the Web Mercator projection used by slippy maps.
+MAX_LATITUDE = 85.0511287798
+
+ARCHIVE_MAGIC = b'CRIMETL1'
+
+
+def tile_pixel(lng, lat, zoom):
+    """Return the integer (x, y) position of a WGS84 point on the 2 ** zoom by 2 ** zoom grid of
+    Web Mercator tiles at ``zoom``."""
+    lat = max(-MAX_LATITUDE, min(MAX_LATITUDE, lat))
+    scale = 2 ** zoom
+    x = (lng + 180.0) / 360.0 * scale
+    sin_lat = math.sin(math.radians(lat))
+    y = (0.5 - math.log((1 + sin_lat) / (1 - sin_lat)) / (4 * math.pi)) * scale
+    return min(scale - 1, max(0, int(x))), min(scale - 1, max(0, int(y)))
+
+
+class Tile(object):
+    """The number of crimes in one map tile, by offense type and by heatmap bin."""
+    __slots__ = ('count', 'offenses', 'bins')
+
+    def __init__(self):
+        self.count = 0
+        self.offenses = collections.Counter()
+        self.bins = collections.Counter()
+
+    def add_child(self, child, x, y, bin_bits=BIN_BITS):
+        """Add the counts of ``child``, the tile at (x, y) one zoom level below this tile."""
+        size = 2 ** bin_bits
+        x_offset = (x & 1) * size
+        y_offset = (y & 1) * size
+        self.count += child.count
+        self.offenses.update(child.offenses)
+        for (bin_x, bin_y), count in child.bins.items():
+            self.bins[((x_offset + bin_x) >> 1, (y_offset + bin_y) >> 1)] += count
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'offenses': dict(self.offenses),
+            'bins': [[bin_x, bin_y, count] for (bin_x, bin_y), count in sorted(self.bins.items())]
+        }
+
+
+class TilePyramid(object):
+    """Bin crimes into a pyramid of map tiles from ``min_zoom`` to ``max_zoom``.
+
+    Points are only binned once, into tiles at ``max_zoom``. Each lower zoom level is derived by
+    combining the four tiles below each tile, so memory use depends on the number of tiles with
+    crimes in them at ``max_zoom`` rather than on the number of crimes.
+    """
+    def __init__(self, min_zoom=DEFAULT_MIN_ZOOM, max_zoom=DEFAULT_MAX_ZOOM, bin_bits=BIN_BITS):
+        if not 0 <= min_zoom <= max_zoom:
+            raise ValueError('Bad zoom levels: {} to {}'.format(min_zoom, max_zoom))
+        self.min_zoom = min_zoom
+        self.max_zoom = max_zoom
+        self.bin_bits = bin_bits
+        self.count = 0
+        self.tiles = {}
+
+    def add(self, lng, lat, offense):
+        """Bin one crime at a WGS84 point."""
+        pixel_x, pixel_y = tile_pixel(lng, lat, self.max_zoom + self.bin_bits)
+        key = (pixel_x >> self.bin_bits, pixel_y >> self.bin_bits)
+        tile = self.tiles.get(key)
+        if tile is None:
+            tile = self.tiles[key] = Tile()
+
+        mask = 2 ** self.bin_bits - 1
+        tile.count += 1
+        tile.offenses[offense] += 1
+        tile.bins[(pixel_x & mask, pixel_y & mask)] += 1
+        self.count += 1
+
+    def levels(self):
+        """Yield (zoom, tiles) for each zoom level from ``max_zoom`` down to ``min_zoom``, where
+        ``tiles`` is a dictionary of `Tile` objects keyed by their (x, y) position."""
+        tiles = self.tiles
+        for zoom in range(self.max_zoom, self.min_zoom - 1, -1):
+            yield zoom, tiles
+            if zoom > self.min_zoom:
+                parents = {}
+                for (x, y), tile in tiles.items():
+                    parent = parents.get((x >> 1, y >> 1))
+                    if parent is None:
+                        parent = parents[(x >> 1, y >> 1)] = Tile()
+                    parent.add_child(tile, x, y, self.bin_bits)
+                tiles = parents
+
+    def serialized_tiles(self):
+        """Yield (zoom, x, y, data) for each tile, where ``data`` is the tile serialized as JSON."""
+        for zoom, tiles in self.levels():
+            for (x, y), tile in sorted(tiles.items()):
+                yield zoom, x, y, json.dumps(tile.to_dict(), sort_keys=True)
+
+    def write_directory(self, directory):
+        """Write each tile to ``directory`` as ``{zoom}/{x}/{y}.json``.
+
+        Returns the number of tiles written.
+        """
+        written = 0
+        for zoom, x, y, data in self.serialized_tiles():
+            tile_directory = os.path.join(directory, str(zoom), str(x))
+            if not os.path.isdir(tile_directory):
+                os.makedirs(tile_directory)
+            with open(os.path.join(tile_directory, '{}.json'.format(y)), 'w') as f:
+                f.write(data)
+            written += 1
+        return written
+
+    def write_archive(self, file):
+        """Write every tile to ``file``, opened for writing in binary mode, as a single packed
+        archive that can be read with `TileArchive`.
+
+        The archive is the magic bytes, each tile's JSON, then an index of a uint64 zoom, x, y,
+        offset and length for each tile, and finally the uint64 offset and count of the index.
+
+        Returns the number of tiles written.
+        """
+        index = []
+        offset = len(ARCHIVE_MAGIC)
+        file.write(ARCHIVE_MAGIC)
+        for zoom, x, y, data in self.serialized_tiles():
+            data = data.encode('utf8')
+            file.write(data)
+            index.append((zoom, x, y, offset, len(data)))
+            offset += len(data)
+
+        for entry in index:
+            file.write(struct.pack('<5Q', *entry))
+        file.write(struct.pack('<2Q', offset, len(index)))
+        return len(index)
+
+
+class TileArchive(object):
+    """Read tiles from a packed archive written by `TilePyramid.write_archive`."""
+    def __init__(self, filename):
+        self._file = open(filename, 'rb')
+        if self._file.read(len(ARCHIVE_MAGIC)) != ARCHIVE_MAGIC:
+            self._file.close()
+            raise ValueError('Not a tile archive: {}'.format(filename))
+
+        self._file.seek(-16, os.SEEK_END)
+        index_offset, count = struct.unpack('<2Q', self._file.read(16))
+        self._file.seek(index_offset)
+        self.index = {}
+        for _ in range(count):
+            zoom, x, y, offset, length = struct.unpack('<5Q', self._file.read(40))
+            self.index[(zoom, x, y)] = (offset, length)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return len(self.index)
+
+    def get(self, zoom, x, y):
+        """Return the serialized JSON of the tile at (zoom, x, y), or None if it has no crimes."""
+        entry = self.index.get((zoom, x, y))
+        if entry is None:
+            return None
+        offset, length = entry
+        self._file.seek(offset)
+        return self._file.read(length).decode('utf8')
+
+    def close(self):
+        self._file.close()
@@ -17,10 +17,13 @@ setup(
     version='0.2',
     packages=['crimetools'],
     install_requires=[
-        'geojson==1.0.5',
-        'GDAL == 1.10.0',
         'geojson == 1.0.5'
     ],
+    # Coordinates are transformed with GDAL by default, or with NumPy using --engine numpy.
+    extras_require={
+        'gdal': ['GDAL == 1.10.0'],
+        'numpy': ['numpy']
+    },
     entry_points={
         'console_scripts': [
             'crimes = crimetools.command:main',
@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+# encoding: utf-8
+import contextlib
+import csv
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from crimetools import batch, command
+
+from tests.test_parallel import ROWS
+from tests.test_portland import COLUMN_LABELS
+
+
+class TestBatch(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        for name in ('2011', '2012'):
+            with open(os.path.join(self.dir, name + '.csv'), 'w', newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow(COLUMN_LABELS)
+                writer.writerows(ROWS)
+
+        # A file without the columns the converter needs.
+        with open(os.path.join(self.dir, 'broken.csv'), 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['Record ID'])
+            writer.writerow(['1'])
+
+        with open(os.path.join(self.dir, 'notes.txt'), 'w') as f:
+            f.write('Not crime data')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_find_inputs(self):
+        """Directories should expand to their CSV files, and glob patterns to their matches"""
+        self.assertEqual([os.path.join(self.dir, name) for name in ('2011.csv', '2012.csv', 'broken.csv')],
+                         batch.find_inputs([self.dir]))
+        self.assertEqual([os.path.join(self.dir, '2012.csv'), os.path.join(self.dir, 'notes.txt')],
+                         batch.find_inputs([os.path.join(self.dir, '2012.*'),
+                                            os.path.join(self.dir, 'notes.txt'),
+                                            os.path.join(self.dir, '2012.csv')]))
+
+    def test_output_filename(self):
+        """Output file names should be filled in from the template"""
+        self.assertEqual('data/2011.converted.json',
+                         batch.output_filename(batch.DEFAULT_TEMPLATE, 'data/2011.csv', 'geojson'))
+        self.assertEqual('out/2011-wgs84.csv', batch.output_filename('out/{name}-wgs84.{ext}', '2011.csv', 'csv'))
+
+    def run_batch(self, *argv):
+        report_filename = os.path.join(self.dir, 'report.json')
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            try:
+                command.main(['batch', '--report', report_filename, '--workers', '2'] + list(argv))
+                status = 0
+            except SystemExit as e:
+                status = e.code
+        with open(report_filename, 'r') as f:
+            return status, output.getvalue(), json.load(f)
+
+    def test_converts_files(self):
+        """Each file should be converted, carrying on past a file that fails"""
+        status, output, report = self.run_batch(self.dir, '-l', 'portland', '-f', 'geojsonl',
+                                                '-o', '{dir}/{name}-out.{ext}')
+
+        self.assertEqual(1, status)
+        self.assertIn('2 files converted, 1 failed', output)
+        self.assertIn('4 records converted', output)
+
+        files = report['files']
+        self.assertEqual(['2011.csv', '2012.csv', 'broken.csv'],
+                         [os.path.basename(result['input']) for result in files])
+        for result in files[:2]:
+            self.assertIsNone(result['error'])
+            self.assertEqual(2, result['total'])
+            self.assertEqual(1, result['skipped'])
+            self.assertEqual({'bad_date': 1}, result['skips'])
+            with open(result['output'], 'r') as f:
+                self.assertEqual(2, len(f.readlines()))
+        self.assertIn('KeyError', files[2]['error'])
+
+    def test_csv_default_template(self):
+        """CSV output with the default template should not overwrite the input files"""
+        with open(os.path.join(self.dir, '2011.csv'), 'rb') as f:
+            original = f.read()
+
+        status, output, report = self.run_batch(os.path.join(self.dir, '2011.csv'), '-l', 'portland', '-f', 'csv')
+
+        self.assertEqual(0, status)
+        self.assertEqual(os.path.join(self.dir, '2011.converted.csv'), report['files'][0]['output'])
+        with open(os.path.join(self.dir, '2011.csv'), 'rb') as f:
+            self.assertEqual(original, f.read())
+
+    def test_output_is_input(self):
+        """A file whose output would overwrite it should fail and be left alone"""
+        with open(os.path.join(self.dir, '2011.csv'), 'rb') as f:
+            original = f.read()
+
+        status, output, report = self.run_batch(os.path.join(self.dir, '2011.csv'), '-l', 'portland', '-f', 'csv',
+                                                '-o', '{dir}/{name}.{ext}')
+
+        self.assertEqual(1, status)
+        self.assertIn('0 files converted, 1 failed', output)
+        self.assertIn('output file is the input file', report['files'][0]['error'])
+        with open(os.path.join(self.dir, '2011.csv'), 'rb') as f:
+            self.assertEqual(original, f.read())
@@ -0,0 +1,52 @@
+#!/usr/bin/env python
+# encoding: utf-8
+import csv
+import io
+import unittest
+
+from benchmarks import portland
+from benchmarks.synthetic import COLUMN_LABELS, SyntheticCrimes
+
+
+def result(rows, rows_per_second):
+    return {'rows': rows, 'stages': {'read': {'rows_per_second': rows_per_second}}}
+
+
+class TestSyntheticCrimes(unittest.TestCase):
+    def test_write(self):
+        """Rows should be written after the column labels"""
+        out = io.StringIO()
+        SyntheticCrimes().write(out, 100)
+        rows = list(csv.reader(io.StringIO(out.getvalue())))
+
+        self.assertEqual(COLUMN_LABELS, rows[0])
+        self.assertEqual(101, len(rows))
+        self.assertTrue(all(len(row) == len(COLUMN_LABELS) for row in rows))
+
+    def test_seed(self):
+        """The same seed should generate the same rows"""
+        self.assertEqual(list(SyntheticCrimes(seed=1).rows(50)), list(SyntheticCrimes(seed=1).rows(50)))
+        self.assertNotEqual(list(SyntheticCrimes(seed=1).rows(50)), list(SyntheticCrimes(seed=2).rows(50)))
+
+    def test_bad_rate(self):
+        """Some rows should be corrupted at a bad rate, and none without one"""
+        def bad(row):
+            return not row[8] or row[1] == 'Bad Date' or row[2] == 'Bad Time'
+
+        self.assertFalse(any(bad(row) for row in SyntheticCrimes().rows(1000)))
+        bad_rows = sum(1 for row in SyntheticCrimes(bad_rate=0.1).rows(1000) if bad(row))
+        self.assertTrue(50 < bad_rows < 150)
+
+
+class TestCompare(unittest.TestCase):
+    def test_regression(self):
+        """Stages slower than the baseline by more than the tolerance should be reported"""
+        baseline = {'results': [result(1000, 100.0)]}
+        self.assertEqual([], portland.compare({'results': [result(1000, 95.0)]}, baseline, 0.1))
+        self.assertEqual(['read (1000 rows): 80 rows/sec, was 100'],
+                         portland.compare({'results': [result(1000, 80.0)]}, baseline, 0.1))
+
+    def test_different_sizes(self):
+        """Results for sizes missing from the baseline should be ignored"""
+        baseline = {'results': [result(1000, 100.0)]}
+        self.assertEqual([], portland.compare({'results': [result(2000, 10.0)]}, baseline, 0.1))
@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+# encoding: utf-8
+import datetime
+import os
+import shutil
+import tempfile
+import unittest
+
+import crimetools.converters
+from crimetools import binary
+
+from tests.test_portland import COLUMN_LABELS
+
+
+ROWS = [
+    ["13807517", "12/01/2011", "01:00:00", "Liquor Laws",
+     "NE WEIDLER ST and NE 1ST AVE, PORTLAND, OR 97232", "LLOYD", "PORTLAND PREC NO", "690",
+     "7647471.01608", "688344.45013"],
+    ["13716403", "07/07/2011", "Bad Time", "Liquor Laws",
+     "NE SCHUYLER ST and NE 1ST AVE, PORTLAND, OR 97212", "ELIOT", "PORTLAND PREC NO",
+     "590", "7647488.15584", "688869.34843"],
+    ["13716404", "07/07/2011", "18:30:00", "Vandalism",
+     "NE SCHUYLER ST and NE 1ST AVE, PORTLAND, OR 97212", "ELIOT", "PORTLAND PREC NO",
+     "590", "7647488.15584", "688869.34843"],
+]
+
+
+class TestBinaryFormat(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.dir, 'crimes.bin')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_round_trips_crimes(self):
+        """Crimes written in the binary format should be read back as column views"""
+        converter = crimetools.converters.Portland([COLUMN_LABELS] + [list(row) for row in ROWS])
+        with open(self.filename, 'wb') as f:
+            total, skipped = converter.write_binary(f)
+        self.assertEqual((2, 1), (total, skipped))
+
+        crimes = list(crimetools.converters.Portland([COLUMN_LABELS] + [list(row) for row in ROWS]).crimes())
+
+        with binary.CrimeDataset(self.filename) as dataset:
+            self.assertEqual(2, len(dataset))
+            self.assertEqual([crime.lng for crime in crimes], list(dataset.lng))
+            self.assertEqual([crime.lat for crime in crimes], list(dataset.lat))
+            self.assertEqual([13807517, 13716404], list(dataset.record_id))
+            self.assertEqual([690, 590], list(dataset.district))
+            self.assertEqual(datetime.datetime(2011, 7, 7, 18, 30),
+                             datetime.datetime.utcfromtimestamp(dataset.timestamp[1]))
+            self.assertEqual(['Liquor Laws', 'Vandalism'],
+                             [dataset.offense_types[code] for code in dataset.offense])
+            self.assertEqual(['LLOYD', 'ELIOT'], [dataset.neighborhoods[code] for code in dataset.neighborhood])
+            self.assertEqual(['PORTLAND PREC NO'], dataset.precincts)
+            self.assertEqual(ROWS[2][4], dataset.address(1))
+
+    def test_columns_are_spilled(self):
+        """Columns flushed to temporary files should be assembled in order"""
+        crimes = list(crimetools.converters.Portland([COLUMN_LABELS, list(ROWS[0])]).crimes())
+        flush_size = binary.FLUSH_SIZE
+        binary.FLUSH_SIZE = 2
+        try:
+            with open(self.filename, 'wb') as f:
+                writer = binary.BinaryWriter(f)
+                for i in range(5):
+                    writer.add(crimes[0]._replace(record_id=i, address=str(i)))
+                writer.close()
+        finally:
+            binary.FLUSH_SIZE = flush_size
+
+        with binary.CrimeDataset(self.filename) as dataset:
+            self.assertEqual(list(range(5)), list(dataset.record_id))
+            self.assertEqual([str(i) for i in range(5)], [dataset.address(i) for i in range(5)])
+
+    def test_rejects_other_files(self):
+        """The reader should refuse files that are not in the binary format"""
+        with open(self.filename, 'wb') as f:
+            f.write(b'{"features": []}')
+        self.assertRaises(ValueError, binary.CrimeDataset, self.filename)
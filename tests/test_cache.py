@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+# encoding: utf-8
+import os
+import shutil
+import tempfile
+import unittest
+
+import crimetools.converters
+from crimetools.converters.cache import TransformCache
+
+from tests.test_portland import COLUMN_LABELS, CountingTransformation
+
+
+ROW = ["13807517", "12/01/2011", "01:00:00", "Liquor Laws",
+       "NE WEIDLER ST and NE 1ST AVE, PORTLAND, OR 97232", "LLOYD", "PORTLAND PREC NO", "690",
+       "7647471.01608", "688344.45013"]
+
+
+class TestTransformCache(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.dir, 'transforms')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_memory_tier_is_bounded(self):
+        """The cache should evict the least recently used points"""
+        cache = TransformCache(2269, 4326, size=2)
+        cache.set((1.0, 1.0), (10.0, 10.0))
+        cache.set((2.0, 2.0), (20.0, 20.0))
+        self.assertEqual((10.0, 10.0), cache.get((1.0, 1.0)))
+        cache.set((3.0, 3.0), (30.0, 30.0))
+
+        self.assertIsNone(cache.get((2.0, 2.0)))
+        self.assertEqual((30.0, 30.0), cache.get((3.0, 3.0)))
+        self.assertEqual({'hits': 2, 'persistent_hits': 0, 'misses': 1}, cache.stats())
+
+    def test_persistent_tier_is_reused(self):
+        """Points saved to the persistent tier should be found by a later cache"""
+        cache = TransformCache(2269, 4326, filename=self.filename)
+        cache.set((1.0, 1.0), (10.0, 10.0))
+        cache.close()
+
+        cache = TransformCache(2269, 4326, filename=self.filename)
+        self.assertEqual((10.0, 10.0), cache.get((1.0, 1.0)))
+        self.assertEqual(1, cache.persistent_hits)
+        cache.close()
+
+        cache = TransformCache(2913, 4326, filename=self.filename)
+        self.assertIsNone(cache.get((1.0, 1.0)))
+        cache.close()
+
+    def test_read_only_tier_collects_pending_points(self):
+        """A read-only cache should collect new points instead of writing them"""
+        cache = TransformCache(2269, 4326, filename=self.filename, read_only=True)
+        cache.set((1.0, 1.0), (10.0, 10.0))
+        self.assertEqual([((1.0, 1.0), (10.0, 10.0))], cache.pending)
+        cache.close()
+
+    def test_converter_skips_cached_points(self):
+        """The Converter should only transform points that are not cached"""
+        cache = TransformCache(2269, 4326, filename=self.filename)
+        rows = [COLUMN_LABELS] + [list(ROW) for _ in range(3)]
+
+        expected = crimetools.converters.Portland([list(row) for row in rows]).to_geojson()
+
+        converter = crimetools.converters.Portland([list(row) for row in rows], transform_cache=cache)
+        converter.transformation = CountingTransformation(converter.transformation)
+        self.assertEqual(expected, converter.to_geojson())
+        self.assertEqual([3], converter.transformation.calls)
+
+        converter = crimetools.converters.Portland([list(row) for row in rows], transform_cache=cache)
+        converter.transformation = CountingTransformation(converter.transformation)
+        self.assertEqual(expected, converter.to_geojson())
+        self.assertEqual([], converter.transformation.calls)
+        cache.close()
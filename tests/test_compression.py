@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+# encoding: utf-8
+import bz2
+import contextlib
+import csv
+import gzip
+import io
+import lzma
+import os
+import shutil
+import tempfile
+import unittest
+import zipfile
+
+from crimetools import command, compression
+
+from tests.test_parallel import ROWS
+from tests.test_portland import COLUMN_LABELS
+
+
+DATA = u'Record ID,Address\n1,NE WEIDLER ST\n2,Caf\xe9\n'
+
+
+class TestCompression(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def path(self, filename):
+        return os.path.join(self.dir, filename)
+
+    def test_compression_of(self):
+        """The compression format should be recognized from the file extension"""
+        self.assertEqual('gzip', compression.compression_of('crimes.csv.gz'))
+        self.assertEqual('zip', compression.compression_of('crimes.ZIP'))
+        self.assertIsNone(compression.compression_of('crimes.csv'))
+        self.assertEqual('crimes.csv', compression.strip_extension('crimes.csv.xz'))
+
+    def test_reads_compressed_input(self):
+        """Compressed input files should be decompressed as they are read"""
+        data = DATA.encode('utf8')
+        for filename, open_file in (('in.csv.gz', gzip.open), ('in.csv.bz2', bz2.open),
+                                    ('in.csv.xz', lzma.open), ('in.csv', open)):
+            with open_file(self.path(filename), 'wb') as f:
+                f.write(data)
+            with compression.open_input(self.path(filename), encoding='UTF8') as f:
+                self.assertEqual(DATA, f.read())
+
+    def test_reads_single_file_zip(self):
+        """A zip file holding a single file should be read as that file"""
+        with zipfile.ZipFile(self.path('in.zip'), 'w') as archive:
+            archive.writestr('in.csv', DATA.encode('utf8'))
+        with compression.open_input(self.path('in.zip'), encoding='UTF8') as f:
+            self.assertEqual(DATA, f.read())
+
+    def test_rejects_zip_with_several_files(self):
+        """A zip file holding more than one file should be rejected"""
+        with zipfile.ZipFile(self.path('in.zip'), 'w') as archive:
+            archive.writestr('a.csv', DATA)
+            archive.writestr('b.csv', DATA)
+        self.assertRaises(ValueError, compression.open_input, self.path('in.zip'))
+
+    def test_writes_compressed_output(self):
+        """Output should be compressed by file extension, or by the format given"""
+        with compression.open_output(self.path('out.csv.bz2'), encoding='UTF8') as f:
+            f.write(DATA)
+        with bz2.open(self.path('out.csv.bz2'), 'rt', encoding='UTF8') as f:
+            self.assertEqual(DATA, f.read())
+
+        with compression.open_output(self.path('out.csv'), 'gzip', encoding='UTF8') as f:
+            f.write(DATA)
+        with gzip.open(self.path('out.csv'), 'rt', encoding='UTF8') as f:
+            self.assertEqual(DATA, f.read())
+
+        self.assertRaises(ValueError, compression.open_output, self.path('out.zip'))
+
+
+class TestCompressedConversion(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.in_filename = os.path.join(self.dir, 'in.csv')
+        with open(self.in_filename, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(COLUMN_LABELS)
+            writer.writerows(ROWS)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_converts_compressed_files(self):
+        """Converting a compressed file to a compressed file should give the same output as
+        converting the uncompressed file"""
+        with open(self.in_filename, 'rb') as f:
+            data = f.read()
+        compressed_filename = os.path.join(self.dir, 'in.csv.gz')
+        with gzip.open(compressed_filename, 'wb') as f:
+            f.write(data)
+
+        plain_filename = os.path.join(self.dir, 'out.json')
+        out_filename = os.path.join(self.dir, 'out.json.xz')
+        with contextlib.redirect_stdout(io.StringIO()):
+            command.main(['-i', self.in_filename, '-o', plain_filename, '-l', 'portland', '-f', 'geojsonl'])
+            command.main(['-i', compressed_filename, '-o', out_filename, '-l', 'portland', '-f', 'geojsonl'])
+
+        with open(plain_filename, 'rb') as f, lzma.open(out_filename, 'rb') as compressed:
+            expected = f.read()
+            self.assertEqual(2, len(expected.splitlines()))
+            self.assertEqual(expected, compressed.read())
+
+    def test_rejects_compressed_binary_output(self):
+        """Compressing binary output should be reported as an argument error"""
+        stderr = io.StringIO()
+        with contextlib.redirect_stderr(stderr):
+            with self.assertRaises(SystemExit) as context:
+                command.main(['-i', self.in_filename, '-o', os.path.join(self.dir, 'out.bin.gz'),
+                              '-l', 'portland', '-f', 'binary'])
+        self.assertEqual(2, context.exception.code)
+        self.assertIn('Compression is not supported for binary output', stderr.getvalue())
+
+    def test_rejects_zip_output(self):
+        """Zip output should be reported as an argument error"""
+        stderr = io.StringIO()
+        with contextlib.redirect_stderr(stderr):
+            with self.assertRaises(SystemExit) as context:
+                command.main(['-i', self.in_filename, '-o', os.path.join(self.dir, 'out.zip'),
+                              '-l', 'portland', '-f', 'csv'])
+        self.assertEqual(2, context.exception.code)
+        self.assertIn('Output can not be compressed as zip', stderr.getvalue())
@@ -0,0 +1,49 @@
+#!/usr/bin/env python
+# encoding: utf-8
+import datetime
+import unittest
+
+from crimetools.converters.dates import ReportDateParser
+
+
+def strptime(date_string, time_string):
+    return datetime.datetime.strptime('{} {}'.format(date_string, time_string), '%m/%d/%Y %H:%M:%S')
+
+
+class TestReportDateParser(unittest.TestCase):
+    values = [
+        ("12/01/2011", "01:00:00"), ("07/07/2011", "18:30:00"), ("7/7/2011", "18:30:00"),
+        ("07/07/2011", "1:30:00"), ("12/01/2011 ", "01:00:00"), ("02/29/2012", "23:59:59"),
+        ("Bad Date", "01:00:00"), ("12/01/2011", "Bad Time"), ("02/29/2011", "01:00:00"),
+        ("12/01/2011", "24:00:00"), ("12/01/2011", "01:60:00"), ("12/01/2011", "01:00:60"),
+        ("12/01/2011", "01:00:61"), ("13/01/2011", "01:00:00"), ("12/01/2011", ""),
+        ("", ""), ("12/01/2011", "01:00:0x"), ("12/01/2011", "01-00-00"),
+    ]
+
+    def test_matches_strptime(self):
+        """The parser should accept and reject exactly the values strptime does"""
+        parser = ReportDateParser()
+        for date_string, time_string in self.values * 2:
+            try:
+                expected = strptime(date_string, time_string)
+            except ValueError:
+                self.assertRaises(ValueError, parser.parse, date_string, time_string)
+            else:
+                actual = parser.parse(date_string, time_string)
+                self.assertEqual(expected, actual)
+                self.assertEqual(expected.isoformat(), actual.isoformat())
+
+    def test_parse_many(self):
+        """The parser should parse a chunk of values, with None for bad values"""
+        parser = ReportDateParser()
+        self.assertEqual([datetime.datetime(2011, 12, 1, 1), None],
+                         parser.parse_many([("12/01/2011", "01:00:00"), ("Bad Date", "01:00:00")]))
+
+    def test_cache_is_bounded(self):
+        """The parser should evict the least recently used dates"""
+        parser = ReportDateParser(cache_size=2)
+        parser.parse("12/01/2011", "01:00:00")
+        parser.parse("12/02/2011", "01:00:00")
+        parser.parse("12/01/2011", "01:00:00")
+        parser.parse("12/03/2011", "01:00:00")
+        self.assertEqual(["12/01/2011", "12/03/2011"], list(parser._dates))
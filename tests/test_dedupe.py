@@ -0,0 +1,154 @@
+#!/usr/bin/env python
+# encoding: utf-8
+import csv
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+import crimetools.converters
+from crimetools import dedupe, parallel
+from crimetools.metrics import Metrics
+
+from tests.test_parallel import ROWS
+from tests.test_portland import COLUMN_LABELS
+
+
+def with_offense(row, offense):
+    row = list(row)
+    row[3] = offense
+    return row
+
+
+class TestIdSet(unittest.TestCase):
+    def test_add(self):
+        """Adding an integer should report whether it was new"""
+        ids = dedupe.IdSet()
+        self.assertTrue(ids.add(13807517))
+        self.assertFalse(ids.add(13807517))
+        self.assertTrue(ids.add(13807518))
+        self.assertTrue(ids.add(0))
+        self.assertTrue(ids.add(-5))
+
+        self.assertEqual(4, len(ids))
+        self.assertIn(13807518, ids)
+        self.assertIn(-5, ids)
+        self.assertNotIn(13807519, ids)
+        self.assertNotIn(2 ** 40, ids)
+
+
+class TestBitmap(unittest.TestCase):
+    def test_slice(self):
+        """A slice of a bitmap should count positions from the start of the slice"""
+        bitmap = dedupe.Bitmap()
+        positions = [0, 3, 9, 10, 17, 30]
+        for position in positions:
+            bitmap.add(position)
+
+        part = bitmap.slice(9, 20)
+        self.assertEqual([0, 1, 8], [p for p in range(11) if p in part])
+        self.assertEqual([0], [p for p in range(2) if p in part.slice(8, 10)])
+        self.assertEqual(positions, [p for p in range(40) if p in bitmap])
+
+
+class TestDeduplicator(unittest.TestCase):
+    def setUp(self):
+        self.rows = [
+            COLUMN_LABELS,
+            ROWS[0],
+            with_offense(ROWS[0], 'Vandalism'),
+            ROWS[2],
+            with_offense(ROWS[0], 'Arson'),
+            with_offense(ROWS[2], 'Vandalism'),
+        ]
+
+    def test_keeps_first(self):
+        """The first copy of each record should be kept"""
+        deduplicator = dedupe.Deduplicator('first')
+        rows = list(deduplicator.filter_rows(self.rows))
+
+        self.assertEqual([COLUMN_LABELS, ROWS[0], ROWS[2]], rows)
+        self.assertEqual(3, deduplicator.duplicates)
+
+    def test_keeps_last(self):
+        """The last copy of each record should be kept, after scanning the rows"""
+        deduplicator = dedupe.Deduplicator('last')
+        self.assertRaises(ValueError, list, deduplicator.filter_rows(self.rows))
+
+        deduplicator.scan(self.rows)
+        rows = list(deduplicator.filter_rows(self.rows))
+
+        self.assertEqual([COLUMN_LABELS, with_offense(ROWS[0], 'Arson'), with_offense(ROWS[2], 'Vandalism')],
+                         rows)
+        self.assertEqual(3, deduplicator.duplicates)
+
+    def test_scan_matches_single_pass(self):
+        """Keeping the first copy should drop the same rows with or without a scan"""
+        deduplicator = dedupe.Deduplicator('first')
+        deduplicator.scan(self.rows)
+
+        self.assertEqual(list(dedupe.Deduplicator('first').filter_rows(self.rows)),
+                         list(deduplicator.filter_rows(self.rows)))
+
+    def test_keeps_rows_without_record_ids(self):
+        """Rows without an integer record ID should never be dropped"""
+        bad = with_offense(ROWS[0], 'Arson')
+        bad[0] = 'Bad ID'
+        rows = [COLUMN_LABELS, bad, bad, ROWS[0]]
+
+        self.assertEqual(rows, list(dedupe.Deduplicator('first').filter_rows(rows)))
+        deduplicator = dedupe.Deduplicator('last')
+        deduplicator.scan(rows)
+        self.assertEqual(rows, list(deduplicator.filter_rows(rows)))
+
+    def test_bad_keep(self):
+        self.assertRaises(ValueError, dedupe.Deduplicator, 'middle')
+
+
+class TestParallelDedupe(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.in_filename = os.path.join(self.dir, 'in.csv')
+        self.rows = []
+        for i in range(300):
+            row = with_offense(ROWS[i % len(ROWS)], 'Offense {}'.format(i))
+            row[0] = str(i % 50)
+            self.rows.append(row)
+        with open(self.in_filename, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(COLUMN_LABELS)
+            writer.writerows(self.rows)
+
+        # Use tiny byte ranges so the file is split between several workers.
+        self.min_range_size = parallel.MIN_RANGE_SIZE
+        parallel.MIN_RANGE_SIZE = 1024
+
+    def tearDown(self):
+        parallel.MIN_RANGE_SIZE = self.min_range_size
+        shutil.rmtree(self.dir)
+
+    def assert_matches_serial(self, keep):
+        out_filename = os.path.join(self.dir, 'out.csv')
+        metrics = Metrics()
+        total, skipped = parallel.convert(self.in_filename, out_filename, 'csv', 2, metrics=metrics,
+                                          dedupe=keep)
+
+        rows = [COLUMN_LABELS] + self.rows
+        deduplicator = dedupe.Deduplicator(keep)
+        deduplicator.scan(rows)
+        expected = io.StringIO()
+        crimetools.converters.Portland(deduplicator.filter_rows(rows)).to_csv(expected)
+
+        with open(out_filename, newline='') as f:
+            self.assertEqual(expected.getvalue(), f.read())
+        self.assertEqual((50, 0), (total, skipped))
+        self.assertEqual(250, metrics.counters['duplicates'])
+
+    def test_keeps_first(self):
+        """Parallel conversion should keep the first copy of each record, like a serial one"""
+        self.assert_matches_serial('first')
+
+    def test_keeps_last(self):
+        """Parallel conversion should keep the last copy of each record, like a serial one"""
+        self.assert_matches_serial('last')
@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+# encoding: utf-8
+import datetime
+import unittest
+
+import geojson
+
+import crimetools.converters
+from crimetools.converters.features import FeatureSerializer
+from crimetools.converters.portland import Crime
+
+from tests.test_portland import COLUMN_LABELS
+
+
+CRIME = Crime(record_id=13807517, lng=-122.66469510763777, lat=45.53435699129174,
+              report_time=datetime.datetime(2011, 12, 1, 1, 0, 0), offense='Liquor Laws',
+              address=u'NE WEIDLER ST and "1ST" AVE, PORTLAND, OR 97232 – Caf\xe9',
+              neighborhood='LLOYD', precinct='PORTLAND PREC NO', district=690)
+
+
+def dumps(crime):
+    feature = geojson.Feature(geometry=geojson.Point((crime.lng, crime.lat)),
+                              id=crime.record_id,
+                              properties={
+                                  'crimeType': crime.offense,
+                                  'address': crime.address,
+                                  'neighborhood': crime.neighborhood,
+                                  'policePrecinct': crime.precinct,
+                                  'policeDistrict': crime.district,
+                                  'reportTime': crime.report_time.isoformat()
+                              })
+    return geojson.dumps(feature, sort_keys=True)
+
+
+class TestFeatureSerializer(unittest.TestCase):
+    def test_matches_geojson_dumps(self):
+        """Features should be serialized exactly as geojson.dumps serializes them"""
+        self.assertEqual(dumps(CRIME), FeatureSerializer().serialize(CRIME))
+
+    def test_matches_geojson_dumps_for_whole_coordinates(self):
+        """Coordinates without a fractional part should be serialized as geojson.dumps does"""
+        crime = CRIME._replace(lng=-122.0, lat=45.0)
+        self.assertEqual(dumps(crime), FeatureSerializer().serialize(crime))
+
+    def test_rounds_coordinates(self):
+        """Coordinates should be rounded to the given precision"""
+        serialized = FeatureSerializer(precision=6).serialize(CRIME)
+
+        self.assertIn('"coordinates": [-122.664695, 45.534357]', serialized)
+        self.assertEqual(dumps(CRIME._replace(lng=-122.664695, lat=45.534357)), serialized)
+
+
+class TestPortlandPrecision(unittest.TestCase):
+    ROW = ["13807517", "12/01/2011", "01:00:00", "Liquor Laws",
+           "NE WEIDLER ST and NE 1ST AVE PORTLAND, OR 97232", "LLOYD", "PORTLAND PREC NO",
+           "690", "7647471.01608", "688344.45013"]
+
+    def test_rounds_coordinates(self):
+        """The Converter should round coordinates to the given precision"""
+        converter = crimetools.converters.Portland([COLUMN_LABELS, self.ROW], precision=5)
+        feature = geojson.loads(next(converter.serialized_geojson_features()))
+
+        self.assertEqual([-122.6647, 45.53436], feature['geometry']['coordinates'])
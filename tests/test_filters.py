@@ -0,0 +1,137 @@
+#!/usr/bin/env python
+# encoding: utf-8
+import argparse
+import contextlib
+import csv
+import datetime
+import io
+import json
+import os
+import random
+import shutil
+import tempfile
+import unittest
+
+import crimetools.converters
+from crimetools import command
+from crimetools.converters import projection
+from crimetools.converters.filters import RowFilter
+from crimetools.metrics import Metrics
+
+from tests.test_portland import COLUMN_LABELS
+
+
+ROWS = [
+    ["1", "12/01/2011", "01:00:00", "Liquor Laws", "A", "LLOYD", "PORTLAND PREC NO", "690",
+     "7647471.01608", "688344.45013"],
+    ["2", "07/07/2011", "18:30:00", "Vandalism", "B", "ELIOT", "PORTLAND PREC NO", "590",
+     "7647488.15584", "688869.34843"],
+    ["3", "07/08/2011", "18:30:00", "Liquor Laws", "C", "ELIOT", "PORTLAND PREC NE", "590",
+     "7647488.15584", "688869.34843"],
+    ["4", "07/08/2011", "Bad Time", "Liquor Laws", "D", "ELIOT", "PORTLAND PREC NE", "590",
+     "7647488.15584", "688869.34843"],
+]
+
+
+class TestRowFilter(unittest.TestCase):
+    def convert(self, row_filter):
+        metrics = Metrics()
+        converter = crimetools.converters.Portland([COLUMN_LABELS] + [list(row) for row in ROWS],
+                                                   metrics=metrics, row_filter=row_filter)
+        record_ids = [crime.record_id for crime in converter.crimes()]
+        return record_ids, converter, metrics
+
+    def test_empty(self):
+        """A filter without criteria should match every row"""
+        self.assertFalse(RowFilter())
+        record_ids, converter, _ = self.convert(RowFilter())
+        self.assertEqual([1, 2, 3], record_ids)
+        self.assertEqual(0, converter.filtered)
+
+    def test_columns(self):
+        """Rows should be filtered by offense type, precinct and neighborhood"""
+        record_ids, converter, metrics = self.convert(RowFilter(offenses=['Liquor Laws'],
+                                                                precincts=['PORTLAND PREC NE']))
+        self.assertEqual([3], record_ids)
+        self.assertEqual(2, converter.filtered)
+        self.assertEqual(2, metrics.counters['filtered'])
+
+        record_ids, _, _ = self.convert(RowFilter(neighborhoods=['LLOYD', 'Nowhere']))
+        self.assertEqual([1], record_ids)
+
+    def test_dates(self):
+        """Rows should be filtered by report time, passing rows with bad dates through"""
+        record_ids, converter, metrics = self.convert(
+            RowFilter(since=datetime.datetime(2011, 7, 7, 19), until=datetime.datetime(2011, 7, 31)))
+        self.assertEqual([3], record_ids)
+        self.assertEqual(2, converter.filtered)
+
+        # The row with a bad date is skipped, not filtered out.
+        self.assertEqual(1, converter.original_row_count - len(record_ids))
+        self.assertEqual(1, metrics.skips['bad_date'])
+
+    def test_bbox(self):
+        """Rows should be filtered by the bounding box their coordinates are in"""
+        record_ids, converter, _ = self.convert(RowFilter(bbox=(-122.67, 45.53, -122.66, 45.54)))
+        self.assertEqual([1, 2, 3], record_ids)
+        self.assertEqual(0, converter.filtered)
+
+        record_ids, converter, _ = self.convert(RowFilter(bbox=(-122.67, 45.53, -122.66, 45.535)))
+        self.assertEqual([1], record_ids)
+        self.assertEqual(3, converter.filtered)
+
+    def test_project_bbox(self):
+        """Points inside the inner envelope should be in the bounding box, and points outside the
+        outer envelope should not be"""
+        row_filter = RowFilter(bbox=(-122.8, 45.4, -122.5, 45.6))
+        outer, inner = row_filter.project_bbox(projection.Transformation(4326, 2269))
+        self.assertTrue(outer[0] < inner[0] < inner[2] < outer[2])
+        self.assertTrue(outer[1] < inner[1] < inner[3] < outer[3])
+
+        random.seed(1)
+        points = [(random.uniform(outer[0] - 5000, outer[2] + 5000),
+                   random.uniform(outer[1] - 5000, outer[3] + 5000)) for _ in range(10000)]
+        coords = projection.Transformation(2269, 4326).TransformPoints(points)
+        for (x, y), (lng, lat, _) in zip(points, coords):
+            if inner[0] <= x <= inner[2] and inner[1] <= y <= inner[3]:
+                self.assertTrue(row_filter.contains(lng, lat))
+            if not (outer[0] <= x <= outer[2] and outer[1] <= y <= outer[3]):
+                self.assertFalse(row_filter.contains(lng, lat))
+
+
+class TestFilterArguments(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.in_filename = os.path.join(self.dir, 'in.csv')
+        self.out_filename = os.path.join(self.dir, 'out.json')
+        with open(self.in_filename, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(COLUMN_LABELS)
+            writer.writerows(ROWS)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_bbox(self):
+        """A bounding box with negative longitudes should be accepted as separate values"""
+        with contextlib.redirect_stdout(io.StringIO()):
+            command.main(['-i', self.in_filename, '-o', self.out_filename, '-l', 'portland', '-f', 'geojsonl',
+                          '--bbox', '-122.67', '45.53', '-122.66', '45.535'])
+        with open(self.out_filename) as f:
+            self.assertEqual([1], [json.loads(line)['id'] for line in f])
+
+
+class TestDateArguments(unittest.TestCase):
+    def test_parses_dates(self):
+        """Dates alone should mean the start or end of the day"""
+        self.assertEqual(datetime.datetime(2011, 12, 1), command.datetimes()('2011-12-01'))
+        self.assertEqual(datetime.datetime(2011, 12, 1, 23, 59, 59),
+                         command.datetimes(end_of_day=True)('2011-12-01'))
+        self.assertEqual(datetime.datetime(2011, 12, 1, 1), command.datetimes(end_of_day=True)('2011-12-01T01:00:00'))
+
+    def test_bad_dates(self):
+        """Bad dates should be reported as argument errors"""
+        self.assertRaises(argparse.ArgumentTypeError, command.datetimes(), '2011-13-01')
+        with contextlib.redirect_stderr(io.StringIO()):
+            self.assertRaises(SystemExit, command.main,
+                              ['-i', 'in.csv', '-o', 'out.csv', '-l', 'portland', '-f', 'csv', '--since', '2011-13-01'])
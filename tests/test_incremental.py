@@ -0,0 +1,175 @@
+#!/usr/bin/env python
+# encoding: utf-8
+import contextlib
+import csv
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+import crimetools.converters
+from crimetools import command, incremental
+
+from tests.test_portland import COLUMN_LABELS
+
+
+ROWS = [
+    ["1", "12/01/2011", "01:00:00", "Liquor Laws", "A", "LLOYD", "PORTLAND PREC NO", "690",
+     "7647471.01608", "688344.45013"],
+    ["2", "07/07/2011", "18:30:00", "Liquor Laws", "B", "ELIOT", "PORTLAND PREC NO", "590",
+     "7647488.15584", "688869.34843"],
+    ["3", "07/08/2011", "18:30:00", "Liquor Laws", "C", "ELIOT", "PORTLAND PREC NO", "590",
+     "7647488.15584", "688869.34843"],
+]
+
+CHANGED_ROW = ["2", "07/07/2011", "18:30:00", "Vandalism", "B", "ELIOT", "PORTLAND PREC NO", "590",
+               "7647488.15584", "688869.34843"]
+
+
+class TestManifest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.dir, 'manifest')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_filters_unchanged_rows(self):
+        """Only new and changed rows should be converted after the first run"""
+        manifest = incremental.Manifest(self.filename)
+        self.assertEqual([COLUMN_LABELS] + ROWS[:2], list(manifest.filter_rows([COLUMN_LABELS] + ROWS[:2])))
+        manifest.save()
+
+        manifest = incremental.Manifest(self.filename)
+        self.assertEqual(2, len(manifest))
+        rows = list(manifest.filter_rows([COLUMN_LABELS, ROWS[0], CHANGED_ROW, ROWS[2]]))
+
+        self.assertEqual([COLUMN_LABELS, CHANGED_ROW, ROWS[2]], rows)
+        self.assertEqual(1, manifest.unchanged)
+        self.assertEqual(set([2]), manifest.changed_ids)
+
+        manifest.save()
+        self.assertEqual(3, len(incremental.Manifest(self.filename)))
+
+
+    def test_saves_converted_rows(self):
+        """Only the rows with the given record IDs should be saved"""
+        manifest = incremental.Manifest(self.filename)
+        list(manifest.filter_rows([COLUMN_LABELS] + ROWS))
+        manifest.save(set([1, 3]))
+
+        manifest = incremental.Manifest(self.filename)
+        self.assertEqual(2, len(manifest))
+        self.assertEqual([COLUMN_LABELS, ROWS[1]], list(manifest.filter_rows([COLUMN_LABELS] + ROWS)))
+
+
+class TestIncrementalCommand(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.in_filename = os.path.join(self.dir, 'in.csv')
+        self.out_filename = os.path.join(self.dir, 'out.json')
+        self.manifest_filename = os.path.join(self.dir, 'manifest')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def run_command(self, rows):
+        with open(self.in_filename, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(COLUMN_LABELS)
+            writer.writerows(rows)
+        with contextlib.redirect_stdout(io.StringIO()):
+            command.main(['-i', self.in_filename, '-o', self.out_filename, '-l', 'portland',
+                          '-f', 'geojsonl', '--incremental', self.manifest_filename])
+        with open(self.out_filename) as f:
+            return sorted(json.loads(line)['id'] for line in f)
+
+    def test_retries_bad_rows(self):
+        """Rows that fail to convert should be tried again in the next run"""
+        bad_row = list(ROWS[1])
+        bad_row[1] = 'Bad Date'
+        self.assertEqual([1, 3], self.run_command([ROWS[0], bad_row, ROWS[2]]))
+        self.assertEqual(2, len(incremental.Manifest(self.manifest_filename)))
+
+        # A run that fails the same row again leaves the manifest as it was.
+        self.assertEqual([1, 3], self.run_command([ROWS[0], bad_row, ROWS[2]]))
+        self.assertEqual(2, len(incremental.Manifest(self.manifest_filename)))
+
+    def test_missing_output(self):
+        """Every row should be converted again if the output is missing"""
+        self.assertEqual([1, 2, 3], self.run_command(ROWS))
+        os.unlink(self.out_filename)
+        self.assertEqual([1, 2, 3], self.run_command(ROWS))
+
+
+class TestMergeOutput(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.out_filename = os.path.join(self.dir, 'out')
+        self.new_filename = os.path.join(self.dir, 'new')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def write_geojson(self, filename, rows):
+        with open(filename, 'w') as f:
+            crimetools.converters.Portland([COLUMN_LABELS] + [list(row) for row in rows]).write_geojson(f)
+
+    def write_csv(self, filename, rows):
+        with open(filename, 'w', newline='') as f:
+            crimetools.converters.Portland([COLUMN_LABELS] + [list(row) for row in rows]).to_csv(f)
+
+    def test_appends_geojson(self):
+        """New Features should be appended to an existing FeatureCollection"""
+        self.write_geojson(self.out_filename, ROWS[:2])
+        self.write_geojson(self.new_filename, ROWS[2:])
+        incremental.merge_output(self.out_filename, self.new_filename, 'geojson')
+
+        expected = io.StringIO()
+        crimetools.converters.Portland([COLUMN_LABELS] + [list(row) for row in ROWS]).write_geojson(expected)
+        with open(self.out_filename) as f:
+            self.assertEqual(expected.getvalue(), f.read())
+
+    def test_replaces_changed_geojson(self):
+        """Changed Features should replace their old versions"""
+        self.write_geojson(self.out_filename, ROWS)
+        self.write_geojson(self.new_filename, [CHANGED_ROW])
+        incremental.merge_output(self.out_filename, self.new_filename, 'geojson', set([2]))
+
+        with open(self.out_filename) as f:
+            features = json.load(f)['features']
+        self.assertEqual([1, 3, 2], [feature['id'] for feature in features])
+        self.assertEqual('Vandalism', features[-1]['properties']['crimeType'])
+
+    def test_streams_geojson(self):
+        """Features should be streamed across blocks, keeping their text as written"""
+        rows = [list(row) for row in ROWS]
+        rows[0][4] = 'A], "type": "FeatureCollection"}, {'
+        self.write_geojson(self.out_filename, rows)
+        self.write_geojson(self.new_filename, [CHANGED_ROW])
+        with open(self.out_filename) as f:
+            expected = json.load(f)['features']
+
+        read_size = incremental.READ_SIZE
+        incremental.READ_SIZE = 7
+        try:
+            incremental.merge_output(self.out_filename, self.new_filename, 'geojson', set([2]))
+        finally:
+            incremental.READ_SIZE = read_size
+
+        with open(self.out_filename) as f:
+            features = json.load(f)['features']
+        self.assertEqual([expected[0], expected[2]], features[:2])
+        self.assertEqual([1, 3, 2], [feature['id'] for feature in features])
+        self.assertEqual(set([1, 2, 3]), incremental.output_record_ids(self.out_filename, 'geojson'))
+
+    def test_replaces_changed_csv(self):
+        """Changed CSV rows should replace their old versions"""
+        self.write_csv(self.out_filename, ROWS)
+        self.write_csv(self.new_filename, [CHANGED_ROW])
+        incremental.merge_output(self.out_filename, self.new_filename, 'csv', set([2]))
+
+        with open(self.out_filename, newline='') as f:
+            self.assertEqual([COLUMN_LABELS, ROWS[0], ROWS[2], CHANGED_ROW], list(csv.reader(f)))
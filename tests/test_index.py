@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+# encoding: utf-8
+import contextlib
+import datetime
+import io
+import json
+import os
+import random
+import shutil
+import tempfile
+import unittest
+
+from crimetools import binary, command, index
+from crimetools.converters.portland import Crime
+
+
+OFFENSES = ['Burglary', 'Larceny', 'Vandalism']
+
+
+class TestSpatialIndex(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.dir, 'crimes.bin')
+
+        rand = random.Random(1)
+        start = datetime.datetime(2011, 1, 1)
+        with open(self.filename, 'wb') as f:
+            writer = binary.BinaryWriter(f)
+            for i in range(2000):
+                writer.add(Crime(record_id=i,
+                                 lng=rand.uniform(-122.8, -122.5),
+                                 lat=rand.uniform(45.4, 45.65),
+                                 report_time=start + datetime.timedelta(hours=i),
+                                 offense=rand.choice(OFFENSES),
+                                 address='{} NE 1ST AVE'.format(i),
+                                 neighborhood='LLOYD',
+                                 precinct='PORTLAND PREC NO',
+                                 district=690))
+            writer.close()
+
+        self.dataset = binary.CrimeDataset(self.filename)
+        index.build_index(self.dataset, index.index_filename(self.filename))
+        self.index = index.SpatialIndex(self.dataset, index.index_filename(self.filename))
+
+    def tearDown(self):
+        self.index.close()
+        self.dataset.close()
+        shutil.rmtree(self.dir)
+
+    def distances(self, lng, lat):
+        return sorted((index.haversine(lng, lat, self.dataset.lng[i], self.dataset.lat[i]), i)
+                      for i in range(len(self.dataset)))
+
+    def test_bbox(self):
+        """A bounding box query should find the same records as a scan"""
+        expected = [i for i in range(len(self.dataset))
+                    if -122.7 <= self.dataset.lng[i] <= -122.6 and 45.5 <= self.dataset.lat[i] <= 45.55]
+        self.assertEqual(expected, sorted(self.index.bbox(-122.7, 45.5, -122.6, 45.55)))
+
+    def test_radius(self):
+        """A radius query should find the same records as a scan, nearest first"""
+        expected = [i for distance, i in self.distances(-122.65, 45.52) if distance <= 1000]
+        self.assertTrue(expected)
+        self.assertEqual(expected, self.index.radius(-122.65, 45.52, 1000))
+
+    def test_nearest(self):
+        """A nearest neighbour query should find the same records as a scan"""
+        expected = [i for _, i in self.distances(-122.65, 45.52)[:10]]
+        self.assertEqual(expected, self.index.nearest(-122.65, 45.52, 10))
+
+        expected = [i for _, i in self.distances(-123.5, 46.0)[:3]]
+        self.assertEqual(expected, self.index.nearest(-123.5, 46.0, 3))
+
+    def test_filters(self):
+        """Queries should only find records of the given offense types and dates"""
+        since = binary.calendar.timegm(datetime.datetime(2011, 2, 1).timetuple())
+        results = self.index.bbox(-180, -90, 180, 90, offenses=['Burglary'], since=since)
+
+        expected = [i for i in range(len(self.dataset))
+                    if self.dataset.offense_types[self.dataset.offense[i]] == 'Burglary'
+                    and self.dataset.timestamp[i] >= since]
+        self.assertEqual(expected, sorted(results))
+
+    def query(self, *argv):
+        out_filename = os.path.join(self.dir, 'out.json')
+        with contextlib.redirect_stderr(io.StringIO()):
+            command.main(['query', '-d', self.filename, '-o', out_filename] + list(argv))
+        with open(out_filename) as f:
+            return [json.loads(line)['id'] for line in f]
+
+    def test_query_command(self):
+        """Queries with negative longitudes should be accepted on the command line"""
+        self.assertEqual(sorted(self.index.bbox(-122.7, 45.5, -122.6, 45.55)),
+                         sorted(self.query('--bbox', '-122.7', '45.5', '-122.6', '45.55')))
+        self.assertEqual(list(self.index.radius(-122.65, 45.52, 1000)),
+                         self.query('--radius', '-122.65', '45.52', '1000'))
+        self.assertEqual(list(self.index.nearest(-122.65, 45.52, 5)),
+                         self.query('--nearest', '-122.65', '45.52', '5'))
@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+# encoding: utf-8
+import io
+import unittest
+
+import crimetools.converters
+from crimetools.metrics import Metrics
+
+from tests.test_portland import COLUMN_LABELS
+
+
+ROWS = [
+    ["1", "12/01/2011", "01:00:00", "Liquor Laws", "A", "LLOYD", "PORTLAND PREC NO", "690",
+     "7647471.01608", "688344.45013"],
+    ["2", "07/07/2011", "18:30:00", "Liquor Laws", "B", "ELIOT", "PORTLAND PREC NO", "590",
+     "Bad X Coordinate", "688869.34843"],
+    ["3", "07/08/2011", "Bad Time", "Vandalism", "C", "ELIOT", "PORTLAND PREC NO", "590",
+     "7647488.15584", "688869.34843"],
+    ["4", "07/08/2011", "Bad Time", "Vandalism", "C", "ELIOT", "PORTLAND PREC NO", "590",
+     "7647488.15584", "688869.34843"],
+]
+
+
+class TestMetrics(unittest.TestCase):
+    def test_keeps_samples_of_skipped_rows(self):
+        """Skipped rows should be counted by reason, keeping only a few sample rows"""
+        metrics = Metrics(max_samples=1)
+        metrics.skip('bad_date', ['1'])
+        metrics.skip('bad_date', ['2'])
+
+        report = metrics.report()
+        self.assertEqual({'bad_date': {'count': 2, 'samples': [['1']]}}, report['skips'])
+
+    def test_merge(self):
+        """Reports from other metrics should be added to the metrics"""
+        metrics = Metrics(timing=True)
+        metrics.add_time('read', 1.0, 10)
+        metrics.skip('bad_date', ['1'])
+        other = Metrics(timing=True)
+        other.add_time('read', 0.5, 5)
+        other.count('converted', 3)
+        other.skip('bad_date', ['2'])
+
+        metrics.merge(other.report())
+
+        report = metrics.report()
+        self.assertEqual({'seconds': 1.5, 'items': 15}, report['stages']['read'])
+        self.assertEqual({'converted': 3}, report['counters'])
+        self.assertEqual({'count': 2, 'samples': [['1'], ['2']]}, report['skips']['bad_date'])
+
+    def test_publish_calls_sinks(self):
+        """Published reports should be passed to every sink"""
+        metrics = Metrics()
+        metrics.count('converted')
+        reports = []
+        metrics.add_sink(reports.append)
+
+        metrics.publish()
+
+        self.assertEqual([metrics.report()], reports)
+
+
+class TestPortlandMetrics(unittest.TestCase):
+    def convert(self, normalize_to_wgs84=False, timing=True):
+        metrics = Metrics(timing=timing)
+        converter = crimetools.converters.Portland([COLUMN_LABELS] + ROWS, metrics=metrics,
+                                                   normalize_to_wgs84=normalize_to_wgs84)
+        total, skipped = converter.write_geojson_lines(io.StringIO())
+        return metrics.report(), total, skipped
+
+    def test_counts_skip_reasons(self):
+        """Rows should be skipped by reason"""
+        report, total, skipped = self.convert()
+
+        self.assertEqual(1, total)
+        self.assertEqual(3, skipped)
+        self.assertEqual(1, report['skips']['bad_coordinates']['count'])
+        self.assertEqual(2, report['skips']['bad_date']['count'])
+        self.assertEqual([ROWS[2], ROWS[3]], report['skips']['bad_date']['samples'])
+
+    def test_counts_bad_districts(self):
+        """Rows with a bad police district should be skipped by reason"""
+        row = list(ROWS[0])
+        row[7] = 'Bad District'
+        metrics = Metrics()
+        converter = crimetools.converters.Portland([COLUMN_LABELS, row], metrics=metrics)
+
+        self.assertEqual([], list(converter.crimes()))
+        self.assertEqual(1, metrics.skips['bad_record_id_or_district'])
+
+    def test_times_stages(self):
+        """Time spent reading, transforming, parsing dates, serializing and writing should be
+        recorded"""
+        report, total, skipped = self.convert()
+
+        stages = report['stages']
+        self.assertEqual(4, stages['read']['items'])
+        self.assertEqual(1, stages['serialize']['items'])
+        self.assertEqual(1, stages['write']['items'])
+        for stage in ('read', 'transform', 'parse_date', 'serialize', 'write'):
+            self.assertIn(stage, stages)
+
+    def test_no_timing_by_default(self):
+        """Stages should only be timed when a caller asks for it"""
+        converter = crimetools.converters.Portland([COLUMN_LABELS] + ROWS)
+        converter.write_geojson_lines(io.StringIO())
+        self.assertFalse(converter.metrics.timing)
+        self.assertEqual({}, converter.metrics.report()['stages'])
+
+    def test_timing_off(self):
+        """Without timing, no stages should be timed but rows should still be counted"""
+        report, total, skipped = self.convert(timing=False)
+
+        self.assertEqual({}, report['stages'])
+        self.assertEqual((1, 3), (total, skipped))
+        self.assertEqual(2, report['skips']['bad_date']['count'])
+
+    def test_counts_skip_reasons_when_normalizing(self):
+        """Rows with bad coordinates should be counted once when normalizing to WGS84"""
+        report, total, skipped = self.convert(normalize_to_wgs84=True)
+
+        self.assertEqual(1, total)
+        self.assertEqual(1, report['skips']['bad_coordinates']['count'])
@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+# encoding: utf-8
+import contextlib
+import csv
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+import crimetools.converters
+from crimetools import command, parallel
+from crimetools.converters.cache import TransformCache
+
+from tests.test_portland import COLUMN_LABELS
+
+
+ROWS = [
+    ["13807517", "12/01/2011", "01:00:00", "Liquor Laws",
+     "NE WEIDLER ST and NE 1ST AVE, PORTLAND, OR 97232", "LLOYD", "PORTLAND PREC NO", "690",
+     "7647471.01608", "688344.45013"],
+    ["13716403", "07/07/2011", "Bad Time", "Liquor Laws",
+     "NE SCHUYLER ST and NE 1ST AVE, PORTLAND, OR 97212", "ELIOT", "PORTLAND PREC NO",
+     "590", "7647488.15584", "688869.34843"],
+    ["13716404", "07/07/2011", "18:30:00", "Liquor Laws",
+     "NE SCHUYLER ST and NE 1ST AVE, PORTLAND, OR 97212", "ELIOT", "PORTLAND PREC NO",
+     "590", "7647488.15584", "688869.34843"],
+]
+
+
+class TestParallelConvert(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.in_filename = os.path.join(self.dir, 'in.csv')
+        self.rows = [ROWS[i % len(ROWS)] for i in range(300)]
+        with open(self.in_filename, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(COLUMN_LABELS)
+            writer.writerows(self.rows)
+
+        # Use tiny byte ranges so the file is split between several workers.
+        self.min_range_size = parallel.MIN_RANGE_SIZE
+        parallel.MIN_RANGE_SIZE = 1024
+
+    def tearDown(self):
+        parallel.MIN_RANGE_SIZE = self.min_range_size
+        shutil.rmtree(self.dir)
+
+    def test_split_file_aligns_ranges_to_rows(self):
+        """Byte ranges should cover the file after the header and each start on a new row"""
+        labels, start = parallel.read_header(self.in_filename)
+        ranges = parallel.split_file(self.in_filename, start, 2)
+
+        self.assertEqual(COLUMN_LABELS, labels)
+        self.assertTrue(len(ranges) > 1)
+        with open(self.in_filename, 'rb') as f:
+            data = f.read()
+        self.assertEqual(start, ranges[0][0])
+        self.assertEqual(len(data), ranges[-1][1])
+        for (_, end), (next_start, _) in zip(ranges, ranges[1:]):
+            self.assertEqual(end, next_start)
+            self.assertEqual(b'\n', data[end - 1:end])
+
+    def test_read_range(self):
+        """Reading each byte range should give the rows that begin in it"""
+        _, start = parallel.read_header(self.in_filename)
+        rows = []
+        with open(self.in_filename, 'rb') as f:
+            for range_start, range_end in parallel.split_file(self.in_filename, start, 2):
+                rows.extend(csv.reader(parallel.read_range(f, range_start, range_end)))
+        self.assertEqual(self.rows, rows)
+
+    def test_geojson_matches_serial(self):
+        """Parallel GeoJSON output should match the serial output"""
+        out_filename = os.path.join(self.dir, 'out.json')
+        total, skipped = parallel.convert(self.in_filename, out_filename, 'geojson', 2)
+
+        expected = io.StringIO()
+        expected_counts = crimetools.converters.Portland(
+            [COLUMN_LABELS] + [list(row) for row in self.rows]).write_geojson(expected)
+
+        with open(out_filename) as f:
+            self.assertEqual(expected.getvalue(), f.read())
+        self.assertEqual(expected_counts, (total, skipped))
+        self.assertEqual((200, 100), (total, skipped))
+
+    def test_csv_matches_serial(self):
+        """Parallel CSV output should match the serial output"""
+        out_filename = os.path.join(self.dir, 'out.csv')
+        total, skipped = parallel.convert(self.in_filename, out_filename, 'csv', 2, use_wgs84=True)
+
+        expected = io.StringIO()
+        crimetools.converters.Portland([COLUMN_LABELS] + [list(row) for row in self.rows],
+                                       normalize_to_wgs84=True).to_csv(expected)
+
+        with open(out_filename, newline='') as f:
+            self.assertEqual(expected.getvalue(), f.read())
+        self.assertEqual((300, 0), (total, skipped))
+
+    def test_first_run_creates_persistent_cache(self):
+        """Points transformed by workers should be saved to a persistent cache that doesn't exist
+        yet, so a second run reads them from disk"""
+        out_filename = os.path.join(self.dir, 'out.csv')
+        cache_filename = os.path.join(self.dir, 'transforms')
+
+        cache = TransformCache(2269, 4326, filename=cache_filename)
+        parallel.convert(self.in_filename, out_filename, 'csv', 2, use_wgs84=True, transform_cache=cache)
+        cache.close()
+        self.assertEqual(0, cache.persistent_hits)
+        self.assertTrue(cache.misses)
+
+        cache = TransformCache(2269, 4326, filename=cache_filename)
+        parallel.convert(self.in_filename, out_filename, 'csv', 2, use_wgs84=True, transform_cache=cache)
+        cache.close()
+        self.assertTrue(cache.persistent_hits)
+        self.assertEqual(0, cache.misses)
+
+    def test_empty_csv_result_is_removed(self):
+        """An empty CSV result should be removed, as it is when converting serially"""
+        out_filename = os.path.join(self.dir, 'out.csv')
+        open(out_filename, 'w').close()
+        with contextlib.redirect_stdout(io.StringIO()):
+            command.main(['-i', self.in_filename, '-o', out_filename, '-l', 'portland', '-f', 'csv',
+                          '--workers', '2', '--offense', 'Nothing'])
+        self.assertFalse(os.path.exists(out_filename))
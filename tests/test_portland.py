@@ -252,3 +252,95 @@ class TestPortlandToCsv(unittest.TestCase):
             self.assertEqual(expected, [line for line in reader])
 
         os.unlink(temp.name)
+
+
+class PortlandRowsTestCase(unittest.TestCase):
+    """Provide a few rows of test data, one of them bad"""
+    rows = [
+        ["13807517", "12/01/2011", "01:00:00", "Liquor Laws",
+         "NE WEIDLER ST and NE 1ST AVE, PORTLAND, OR 97232", "LLOYD", "PORTLAND PREC NO", "690",
+         7647471.0160800004, 688344.45013000001],
+        ["13716403", "07/07/2011", "Bad Time", "Liquor Laws",
+         "NE SCHUYLER ST and NE 1ST AVE, PORTLAND, OR 97212", "ELIOT", "PORTLAND PREC NO",
+         "590", 7647488.1558400001, 688869.34843000001],
+        ["13716403", "07/07/2011", "18:30:00", "Liquor Laws",
+         "NE SCHUYLER ST and NE 1ST AVE, PORTLAND, OR 97212", "ELIOT", "PORTLAND PREC NO",
+         "590", 7647488.1558400001, 688869.34843000001]
+    ]
+
+    def stream(self):
+        """Return the test rows as a one-shot iterator, like a csv.reader"""
+        return iter([COLUMN_LABELS] + [list(row) for row in self.rows])
+
+
+class TestPortlandStreaming(PortlandRowsTestCase):
+
+    def test_write_geojson_matches_to_geojson(self):
+        """Streaming GeoJSON output should be identical to the in-memory output"""
+        expected, expected_total, expected_skipped = crimetools.converters.Portland(
+            list(self.stream())).to_geojson()
+
+        out = io.StringIO()
+        total, skipped = crimetools.converters.Portland(self.stream()).write_geojson(out)
+
+        self.assertEqual(expected, out.getvalue())
+        self.assertEqual((expected_total, expected_skipped), (total, skipped))
+        self.assertEqual((2, 1), (total, skipped))
+
+    def test_write_geojson_lines(self):
+        """The Converter should write one Feature per line"""
+        out = io.StringIO()
+        total, skipped = crimetools.converters.Portland(self.stream()).write_geojson_lines(out)
+
+        lines = out.getvalue().splitlines()
+        self.assertEqual(2, len(lines))
+        self.assertEqual([13807517, 13716403], [geojson.loads(line)['id'] for line in lines])
+        self.assertEqual((2, 1), (total, skipped))
+
+    def test_write_geojson_empty(self):
+        """Streaming output with no valid rows should still be a valid FeatureCollection"""
+        out = io.StringIO()
+        total, skipped = crimetools.converters.Portland(iter([COLUMN_LABELS, self.rows[1]])).write_geojson(out)
+
+        self.assertEqual({"features": [], "type": "FeatureCollection"}, geojson.loads(out.getvalue()))
+        self.assertEqual((0, 1), (total, skipped))
+
+
+class CountingTransformation(object):
+    """Wrap a CoordinateTransformation and count calls to TransformPoints"""
+    def __init__(self, transformation):
+        self.transformation = transformation
+        self.calls = []
+
+    def TransformPoint(self, *args):
+        return self.transformation.TransformPoint(*args)
+
+    def TransformPoints(self, points):
+        self.calls.append(len(points))
+        return self.transformation.TransformPoints(points)
+
+
+class TestPortlandBatchTransform(PortlandRowsTestCase):
+    def test_transforms_points_in_chunks(self):
+        """The Converter should transform each chunk of rows in one call"""
+        rows = [COLUMN_LABELS] + [list(self.rows[0]) for _ in range(5)]
+        rows[3][8] = "Bad X Coordinate"
+        converter = crimetools.converters.Portland(rows, chunk_size=2)
+        converter.transformation = CountingTransformation(converter.transformation)
+
+        result, total, skipped = converter.to_geojson()
+
+        self.assertEqual([2, 1, 1], converter.transformation.calls)
+        self.assertEqual((4, 1), (total, skipped))
+
+    def test_chunk_size_does_not_change_output(self):
+        """The Converter should produce the same output for any chunk size"""
+        expected = crimetools.converters.Portland(self.stream(), chunk_size=1).to_geojson()
+        actual = crimetools.converters.Portland(self.stream(), chunk_size=100).to_geojson()
+        self.assertEqual(expected, actual)
+
+    def test_chunked_points_match_single_points(self):
+        """Chunked transformation should match transforming one point at a time"""
+        converter = crimetools.converters.Portland(self.stream(), chunk_size=2)
+        for row, point in converter.wgs84_points(converter.rows):
+            self.assertEqual(converter.get_wgs84_point(row), point)
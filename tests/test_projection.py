@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+# encoding: utf-8
+import unittest
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+try:
+    import ogr
+except ImportError:
+    ogr = None
+
+import crimetools.converters
+from crimetools.converters import projection
+from crimetools.converters.portland import NAD83_EPSG, WGS84_EPSG, get_transformation
+
+from tests.test_portland import COLUMN_LABELS
+
+
+# About a millimetre, in degrees of latitude.
+TOLERANCE = 1e-8
+
+
+def grid(count=50):
+    """Return points covering the extent of Oregon North, in feet."""
+    xs = numpy.linspace(4.5e6, 9.5e6, count)
+    ys = numpy.linspace(-2.0e5, 1.0e6, count)
+    return [(float(x), float(y)) for x in xs for y in ys]
+
+
+@unittest.skipIf(numpy is None, 'NumPy is not installed')
+class TestLambertConformalConic(unittest.TestCase):
+    def test_inverse(self):
+        """Oregon North coordinates should be unprojected to the expected longitude and latitude"""
+        lng, lat = projection.OREGON_NORTH.inverse([7647471.0160800004], [688344.45013000001])
+
+        self.assertAlmostEqual(-122.66469510763777, lng[0], delta=TOLERANCE)
+        self.assertAlmostEqual(45.53435699129174, lat[0], delta=TOLERANCE)
+
+    def test_origin(self):
+        """The false origin should unproject to the latitude of origin and central meridian"""
+        lng, lat = projection.OREGON_NORTH.inverse([2500000.0001424 / projection.INTERNATIONAL_FOOT], [0.0])
+
+        self.assertAlmostEqual(-120.5, lng[0], places=10)
+        self.assertAlmostEqual(43.66666666666666, lat[0], places=10)
+
+    def test_forward_inverts_inverse(self):
+        """Projecting unprojected coordinates should give back the original coordinates"""
+        xs, ys = zip(*grid())
+        lng, lat = projection.OREGON_NORTH.inverse(xs, ys)
+        x, y = projection.OREGON_NORTH.forward(lng, lat)
+
+        # A thousandth of a foot.
+        self.assertLess(numpy.max(numpy.abs(x - xs)), 1e-3)
+        self.assertLess(numpy.max(numpy.abs(y - ys)), 1e-3)
+
+    def test_transformation(self):
+        """The transformation should work like a GDAL CoordinateTransformation"""
+        transformation = projection.Transformation(NAD83_EPSG, WGS84_EPSG)
+        points = transformation.TransformPoints([(7647471.01608, 688344.45013), (7647488.15584, 688869.34843, 5.0)])
+
+        self.assertEqual(2, len(points))
+        self.assertEqual(5.0, points[1][2])
+        self.assertEqual(points[0], transformation.TransformPoint(7647471.01608, 688344.45013))
+        self.assertEqual([], transformation.TransformPoints([]))
+        self.assertRaises(ValueError, projection.Transformation, 2913, WGS84_EPSG)
+
+    def test_converter_engine(self):
+        """The converter should transform coordinates with the NumPy engine when asked to"""
+        row = ["13807517", "12/01/2011", "01:00:00", "Liquor Laws", "A", "LLOYD",
+               "PORTLAND PREC NO", "690", "7647471.01608", "688344.45013"]
+        converter = crimetools.converters.Portland([COLUMN_LABELS, row], engine='numpy')
+        crime, = converter.crimes()
+
+        self.assertIsInstance(converter.transformation, projection.Transformation)
+        self.assertAlmostEqual(-122.66469510763777, crime.lng, delta=TOLERANCE)
+        self.assertAlmostEqual(45.53435699129174, crime.lat, delta=TOLERANCE)
+
+
+@unittest.skipIf(numpy is None or ogr is None, 'NumPy or GDAL is not installed')
+class TestAgainstGdal(unittest.TestCase):
+    def test_matches_gdal(self):
+        """The NumPy engine should agree with GDAL to within a millimetre"""
+        points = grid()
+        expected = get_transformation(NAD83_EPSG, WGS84_EPSG, 'gdal').TransformPoints(points)
+        actual = get_transformation(NAD83_EPSG, WGS84_EPSG, 'numpy').TransformPoints(points)
+
+        for (expected_lng, expected_lat, _), (lng, lat, _) in zip(expected, actual):
+            self.assertAlmostEqual(expected_lng, lng, delta=TOLERANCE)
+            self.assertAlmostEqual(expected_lat, lat, delta=TOLERANCE)
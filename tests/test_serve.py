@@ -0,0 +1,77 @@
+#!/usr/bin/env python
+# encoding: utf-8
+import csv
+import os
+import shutil
+import stat
+import tempfile
+import threading
+import unittest
+
+from crimetools import serve
+
+from tests.test_portland import COLUMN_LABELS
+
+
+ROWS = [
+    ["1", "12/01/2011", "01:00:00", "Liquor Laws", "A", "LLOYD", "PORTLAND PREC NO", "690",
+     "7647471.01608", "688344.45013"],
+    ["2", "07/07/2011", "18:30:00", "Liquor Laws", "B", "ELIOT", "PORTLAND PREC NO", "590",
+     "Bad X Coordinate", "688869.34843"],
+]
+
+
+class TestStripOption(unittest.TestCase):
+    def test_strips_option_and_value(self):
+        """An option should be removed along with its value, in either form"""
+        argv = ['-i', 'in.csv', '--server', 'a.sock', '-f', 'csv', '--server=b.sock']
+        self.assertEqual(['-i', 'in.csv', '-f', 'csv'], serve.strip_option(argv, '--server'))
+
+
+@unittest.skipUnless(hasattr(os, 'fork'), 'The conversion server requires fork')
+class TestConversionServer(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        with open(os.path.join(self.directory, 'in.csv'), 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(COLUMN_LABELS)
+            writer.writerows(ROWS)
+
+        self.socket_path = os.path.join(self.directory, 'crimes.sock')
+        self.server = serve.ConversionServer(self.socket_path)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.thread.join()
+        self.server.server_close()
+        shutil.rmtree(self.directory)
+
+    def test_socket_is_private(self):
+        """Only the user running the server should have access to the socket"""
+        self.assertEqual(0, stat.S_IMODE(os.stat(self.socket_path).st_mode) & 0o077)
+
+    def test_runs_job(self):
+        """The server should run a conversion relative to the client's directory"""
+        status, output = serve.submit(self.socket_path,
+                                      ['-i', 'in.csv', '-o', 'out.json', '-l', 'portland', '-f', 'geojsonl'],
+                                      cwd=self.directory)
+
+        self.assertEqual(0, status)
+        self.assertIn('1 records converted', output)
+        self.assertIn('1 records skipped due to bad data', output)
+        with open(os.path.join(self.directory, 'out.json'), 'r') as f:
+            self.assertEqual(1, len(f.readlines()))
+
+    def test_reports_bad_arguments(self):
+        """A job with bad arguments should fail without stopping the server"""
+        status, output = serve.submit(self.socket_path, ['-i', 'in.csv'], cwd=self.directory)
+        self.assertEqual(2, status)
+        self.assertIn('required', output)
+
+        status, output = serve.submit(self.socket_path, ['-i', 'missing.csv', '-o', 'out.csv',
+                                                         '-l', 'portland', '-f', 'csv'],
+                                      cwd=self.directory)
+        self.assertEqual(1, status)
+        self.assertIn('missing.csv', output)
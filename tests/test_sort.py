@@ -0,0 +1,154 @@
+#!/usr/bin/env python
+# encoding: utf-8
+import csv
+import io
+import json
+import os
+import random
+import shutil
+import tempfile
+import unittest
+
+import crimetools.converters
+from crimetools import sort
+
+from tests.test_filters import ROWS
+from tests.test_portland import COLUMN_LABELS
+
+
+def xy2d(n, x, y):
+    """The usual bit-at-a-time Hilbert curve distance of (x, y) on an n by n grid."""
+    d = 0
+    s = n // 2
+    while s > 0:
+        rx = 1 if x & s else 0
+        ry = 1 if y & s else 0
+        d += s * s * ((3 * rx) ^ ry)
+        if ry == 0:
+            if rx == 1:
+                x = n - 1 - x
+                y = n - 1 - y
+            x, y = y, x
+        s //= 2
+    return d
+
+
+class TestCurves(unittest.TestCase):
+    def test_hilbert_key(self):
+        """Hilbert keys should match the usual algorithm"""
+        random.seed(1)
+        for _ in range(1000):
+            x, y = random.randrange(sort.GRID_SIZE), random.randrange(sort.GRID_SIZE)
+            self.assertEqual(xy2d(sort.GRID_SIZE, x, y), sort.hilbert_key(x, y))
+
+    def test_hilbert_neighbours(self):
+        """Consecutive Hilbert keys should be neighbouring cells"""
+        cells = sorted((sort.hilbert_key(x, y), x, y) for x in range(64) for y in range(64))
+        self.assertEqual(list(range(64 * 64)), [key for key, _, _ in cells])
+        for (_, x1, y1), (_, x2, y2) in zip(cells, cells[1:]):
+            self.assertEqual(1, abs(x1 - x2) + abs(y1 - y2))
+
+    def test_zorder_key(self):
+        """Z-order keys should interleave the bits of x and y"""
+        random.seed(1)
+        for _ in range(1000):
+            x, y = random.randrange(sort.GRID_SIZE), random.randrange(sort.GRID_SIZE)
+            expected = 0
+            for bit in range(sort.GRID_BITS):
+                expected |= ((x >> bit) & 1) << (2 * bit + 1) | ((y >> bit) & 1) << (2 * bit)
+            self.assertEqual(expected, sort.zorder_key(x, y))
+
+    def test_curve_key(self):
+        """Points should be placed on the grid over the bounds, and bad points last"""
+        key = sort.CurveKey('zorder')
+        self.assertEqual(0, key(-180.0, -90.0))
+        self.assertEqual(0, key(-200.0, -100.0))
+        self.assertEqual(sort.GRID_SIZE ** 2 - 1, key(180.0, 90.0))
+        self.assertEqual(sort.NO_KEY, key(float('nan'), 45.0))
+        self.assertRaises(ValueError, sort.CurveKey, 'peano')
+
+
+class TestExternalSorter(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.max_merge_files = sort.MAX_MERGE_FILES
+        sort.MAX_MERGE_FILES = 3
+
+    def tearDown(self):
+        sort.MAX_MERGE_FILES = self.max_merge_files
+        shutil.rmtree(self.dir)
+
+    def test_sorts(self):
+        """Values should be sorted by key, keeping the order of equal keys, across spilled files"""
+        random.seed(1)
+        items = [(random.randrange(20), 'value {}'.format(i)) for i in range(1000)]
+        sorter = sort.ExternalSorter(buffer_size=50, tmp_dir=self.dir)
+        for key, value in items:
+            sorter.add(key, value)
+
+        self.assertEqual(20, len(os.listdir(self.dir)))
+        self.assertEqual([value for _, value in sorted(items, key=lambda item: item[0])], list(sorter))
+        self.assertEqual([], os.listdir(self.dir))
+
+    def test_sorts_in_memory(self):
+        """Values that fit in memory should be sorted without spilling"""
+        sorter = sort.ExternalSorter(tmp_dir=self.dir)
+        for key, value in [(2, 'b'), (1, 'a'), (2, 'c')]:
+            sorter.add(key, value)
+        self.assertEqual(['a', 'b', 'c'], list(sorter))
+        self.assertEqual([], os.listdir(self.dir))
+
+
+class TestPortlandSort(unittest.TestCase):
+    def setUp(self):
+        random.seed(2)
+        self.rows = []
+        for i in range(500):
+            row = list(ROWS[i % 3])
+            row[0] = str(i)
+            row[8] = '{:.5f}'.format(random.uniform(7600000, 7700000))
+            row[9] = '{:.5f}'.format(random.uniform(650000, 730000))
+            self.rows.append(row)
+
+    def convert(self, **kwargs):
+        converter = crimetools.converters.Portland([COLUMN_LABELS] + [list(row) for row in self.rows],
+                                                   sort_buffer_size=64, **kwargs)
+        out = io.StringIO()
+        total, skipped = converter.write_geojson_lines(out)
+        return [json.loads(line) for line in out.getvalue().splitlines()], total, skipped
+
+    def test_sorts_geojson(self):
+        """Features should be written in order along the curve"""
+        unsorted, total, skipped = self.convert()
+        features, sorted_total, sorted_skipped = self.convert(sort='hilbert')
+
+        self.assertEqual((total, skipped), (sorted_total, sorted_skipped))
+        self.assertEqual(sorted(feature['id'] for feature in unsorted),
+                         sorted(feature['id'] for feature in features))
+        key = sort.CurveKey('hilbert')
+        keys = [key(*feature['geometry']['coordinates']) for feature in features]
+        self.assertEqual(sorted(keys), keys)
+
+    def test_sorts_by_time(self):
+        """Features in the same place should be sorted by report time"""
+        for row in self.rows:
+            row[8], row[9] = '7647471.01608', '688344.45013'
+        features, _, _ = self.convert(sort='zorder', sort_by_time=True)
+
+        times = [feature['properties']['reportTime'] for feature in features]
+        self.assertEqual(sorted(times), times)
+
+    def test_sorts_csv(self):
+        """CSV rows should be sorted by their own coordinates, keeping rows with bad ones last"""
+        self.rows[0][8] = 'Bad X'
+        converter = crimetools.converters.Portland([COLUMN_LABELS] + [list(row) for row in self.rows],
+                                                   sort='hilbert', sort_buffer_size=64)
+        out = io.StringIO()
+        _, total, skipped = converter.to_csv(out)
+
+        rows = list(csv.reader(io.StringIO(out.getvalue())))[1:]
+        self.assertEqual((500, 0), (total, skipped))
+        self.assertEqual(self.rows[0], rows[-1])
+        key = sort.CurveKey('hilbert', sort.PROJECTED_BOUNDS)
+        keys = [key(float(row[8]), float(row[9])) for row in rows[:-1]]
+        self.assertEqual(sorted(keys), keys)
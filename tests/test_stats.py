@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+# encoding: utf-8
+import csv
+import io
+import json
+import unittest
+
+import crimetools.converters
+from crimetools import stats
+
+from tests.test_portland import COLUMN_LABELS
+
+
+ROWS = [
+    ["1", "12/01/2011", "01:00:00", "Liquor Laws", "A", "LLOYD", "PORTLAND PREC NO", "690",
+     "7647471.01608", "688344.45013"],
+    ["2", "07/07/2011", "18:30:00", "Liquor Laws", "B", "ELIOT", "PORTLAND PREC NO", "590",
+     "Bad X Coordinate", "688869.34843"],
+    ["3", "07/08/2011", "Bad Time", "Vandalism", "C", "ELIOT", "PORTLAND PREC NO", "590",
+     "7647488.15584", "688869.34843"],
+    ["4", "07/08/2011", "18:45:00", "Vandalism", "C", "ELIOT", "PORTLAND PREC NO", "590",
+     "7647488.15584", "688869.34843"],
+]
+
+
+def collect(rows):
+    result = stats.CrimeStats()
+    result.add_rows(crimetools.converters.Portland([COLUMN_LABELS] + [list(row) for row in rows]))
+    return result
+
+
+class TestCrimeStats(unittest.TestCase):
+    def test_counts_rows(self):
+        """Crimes should be counted by each dimension, skipping rows with bad dates"""
+        result = collect(ROWS).to_dict()
+
+        self.assertEqual(3, result['total'])
+        self.assertEqual(1, result['skipped'])
+        self.assertEqual({'ELIOT': 2, 'LLOYD': 1}, result['counts']['neighborhood'])
+        self.assertEqual({'Liquor Laws': 2, 'Vandalism': 1}, result['counts']['offense'])
+        self.assertEqual({'01': 1, '18': 2}, result['counts']['hour'])
+        self.assertEqual({'2011-W27': 2, '2011-W48': 1}, result['counts']['week'])
+
+    def test_merge(self):
+        """Merged partial counts should equal counts over all the rows"""
+        merged = collect(ROWS[:2])
+        partial = json.loads(json.dumps(collect(ROWS[2:]).to_dict()))
+        merged.merge(stats.CrimeStats.from_dict(partial))
+
+        self.assertEqual(collect(ROWS).to_dict(), merged.to_dict())
+
+    def test_write_csv(self):
+        """Counts should be written as one CSV row per dimension and value"""
+        out = io.StringIO()
+        collect(ROWS).write_csv(out)
+        rows = list(csv.reader(io.StringIO(out.getvalue())))
+
+        self.assertEqual(['dimension', 'value', 'count'], rows[0])
+        self.assertIn(['precinct', 'PORTLAND PREC NO', '3'], rows)
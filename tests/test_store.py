@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+# encoding: utf-8
+import array
+import io
+import math
+import unittest
+
+import crimetools.converters
+from crimetools.converters.store import RecordStore
+
+from tests.test_portland import COLUMN_LABELS
+
+
+ROWS = [
+    ["13807517", "12/01/2011", "01:00:00", "Liquor Laws",
+     "NE WEIDLER ST and NE 1ST AVE, PORTLAND, OR 97232", "LLOYD", "PORTLAND PREC NO", "690",
+     "7647471.01608", "688344.45013"],
+    ["13716403", "07/07/2011", "18:30:00", "Liquor Laws",
+     "NE SCHUYLER ST and NE 1ST AVE, PORTLAND, OR 97212", "ELIOT", "PORTLAND PREC NO",
+     "590", "7647488.15584", "688869.34843"],
+    ["0013716404", "07/07/2011", "18:30:00", "Vandalism",
+     "NE SCHUYLER ST and NE 1ST AVE, PORTLAND, OR 97212", "ELIOT", "PORTLAND PREC NO",
+     "", "Bad X Coordinate", "688869.34843000001"],
+]
+
+
+class TestRecordStore(unittest.TestCase):
+    def test_round_trips_rows(self):
+        """Rows read from the store should be identical to the rows put in"""
+        store = RecordStore.from_rows([COLUMN_LABELS] + ROWS)
+        self.assertEqual(3, len(store))
+        self.assertEqual(ROWS, list(store))
+        self.assertEqual(ROWS[-1], store[-1])
+
+    def test_round_trips_irregular_rows(self):
+        """Rows without a value for every column should be stored as-is"""
+        store = RecordStore.from_rows([COLUMN_LABELS, ["1", "2"]] + ROWS)
+        self.assertEqual([["1", "2"]] + ROWS, list(store))
+
+    def test_typed_columns(self):
+        """Coordinates and IDs should be kept in typed arrays"""
+        store = RecordStore.from_rows([COLUMN_LABELS] + ROWS)
+
+        x = store.column('X Coordinate')
+        self.assertIsInstance(x, array.array)
+        self.assertEqual([7647471.01608, 7647488.15584], list(x[:2]))
+        self.assertTrue(math.isnan(x[2]))
+        self.assertEqual([13807517, 13716403, 13716404], list(store.column('Record ID')))
+
+    def test_dictionary_encoded_columns(self):
+        """Repetitive columns should store each distinct value once"""
+        store = RecordStore.from_rows([COLUMN_LABELS] + ROWS)
+        self.assertEqual(['LLOYD', 'ELIOT', 'ELIOT'], store.column('Neighborhood'))
+        self.assertEqual(['LLOYD', 'ELIOT'], store._dictionaries['Neighborhood'][0])
+        self.assertEqual('Vandalism', store.get(2, 'Major Offense Type'))
+
+    def test_converter_uses_store(self):
+        """The Converter should produce the same output from a store as from a list of rows"""
+        store = RecordStore.from_rows([COLUMN_LABELS] + ROWS)
+
+        expected = crimetools.converters.Portland([COLUMN_LABELS] + [list(row) for row in ROWS]).to_geojson()
+        self.assertEqual(expected, crimetools.converters.Portland(store).to_geojson())
+
+        expected = io.StringIO()
+        crimetools.converters.Portland([COLUMN_LABELS] + [list(row) for row in ROWS],
+                                       normalize_to_wgs84=True).to_csv(expected)
+        actual = io.StringIO()
+        crimetools.converters.Portland(store, normalize_to_wgs84=True).to_csv(actual)
+        self.assertEqual(expected.getvalue(), actual.getvalue())
+        self.assertEqual(ROWS, list(store))
@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+# encoding: utf-8
+import contextlib
+import io
+import json
+import os
+import random
+import shutil
+import tempfile
+import unittest
+
+from crimetools import command, tiles
+
+
+class TestTilePyramid(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        rand = random.Random(1)
+        self.points = [(rand.uniform(-122.8, -122.5), rand.uniform(45.4, 45.65), rand.choice(['A', 'B']))
+                       for _ in range(500)]
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_tile_pixel(self):
+        """Points should be placed on the usual slippy map tiles"""
+        self.assertEqual((0, 0), tiles.tile_pixel(-122.66, 45.53, 0))
+        self.assertEqual((2609, 5859), tiles.tile_pixel(-122.66, 45.53, 14))
+
+    def test_levels_match_binning_each_level(self):
+        """Tiles derived from the level below should match binning points at each level"""
+        pyramid = tiles.TilePyramid(8, 12)
+        for lng, lat, offense in self.points:
+            pyramid.add(lng, lat, offense)
+
+        for zoom, level in pyramid.levels():
+            expected = tiles.TilePyramid(zoom, zoom)
+            for lng, lat, offense in self.points:
+                expected.add(lng, lat, offense)
+            self.assertEqual(dict((key, tile.to_dict()) for key, tile in expected.tiles.items()),
+                             dict((key, tile.to_dict()) for key, tile in level.items()))
+            self.assertEqual(500, sum(tile.count for tile in level.values()))
+
+    def test_write_archive(self):
+        """Tiles in a packed archive should match tiles written to a directory"""
+        pyramid = tiles.TilePyramid(0, 10)
+        for lng, lat, offense in self.points:
+            pyramid.add(lng, lat, offense)
+
+        directory = os.path.join(self.dir, 'tiles')
+        written = pyramid.write_directory(directory)
+        filename = os.path.join(self.dir, 'crimes.tiles')
+        with open(filename, 'wb') as f:
+            self.assertEqual(written, pyramid.write_archive(f))
+
+        with tiles.TileArchive(filename) as archive:
+            self.assertEqual(written, len(archive))
+            with open(os.path.join(directory, '0', '0', '0.json')) as f:
+                self.assertEqual(f.read(), archive.get(0, 0, 0))
+            self.assertEqual(500, json.loads(archive.get(0, 0, 0))['count'])
+            self.assertIsNone(archive.get(1, 1, 1))
+
+    def test_rejects_bad_zoom_levels(self):
+        """A minimum zoom level above the maximum should be reported as an argument error"""
+        stderr = io.StringIO()
+        with contextlib.redirect_stderr(stderr):
+            with self.assertRaises(SystemExit) as context:
+                command.main(['-i', 'in.csv', '-o', 'out.tiles', '-l', 'portland', '-f', 'tiles',
+                              '--min-zoom', '5', '--max-zoom', '3'])
+        self.assertEqual(2, context.exception.code)
+        self.assertIn('Bad zoom levels: 5 to 3', stderr.getvalue())